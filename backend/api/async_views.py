@@ -0,0 +1,175 @@
+"""Async variants of the hot read views, under /api/async/, to be served by
+an ASGI server, see `backend.asgi`.
+
+A view sets up its sync viewset for the request as DRF would, & reuses its
+queryset, filters, paginator, serializer & response rendering, so that the
+output is the same. It only does the I/O itself, with the async ORM: the
+token is checked with aget(), the rows come off `async for`, & the per-user
+flags & the recipe cards are loaded up front, for the serializers to run
+with no query left to make. Building a filterset may query, e.g. for the
+tag choices, so it goes to a thread. The conditional GETs are answered as
+by the sync views, with the same validators.
+"""
+
+from abc import ABC, abstractmethod
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework.authentication import get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
+
+from .cards import CONTEXT_KEY as CARDS_CONTEXT_KEY
+from .cards import aload_cards
+from .conditional import ConditionalGetMixin
+from .fastpath import Runtime, compile_serializer
+from .flags import get_recipe_flags
+from .serializers import SubscriptionSerializer
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UsersViewSet
+
+
+async def authenticate(request):
+    """Return the user & the token of TokenAuthentication, the api's own."""
+    header = get_authorization_header(request).split()
+    if not header or header[0].lower() != b"token":
+        return AnonymousUser(), None
+    if len(header) != 2:
+        raise AuthenticationFailed(_("Invalid token header."))
+    try:
+        token = await Token.objects.select_related("user").aget(
+            key=header[1].decode()
+        )
+    except (Token.DoesNotExist, UnicodeError):
+        raise AuthenticationFailed(_("Invalid token."))
+    if not token.user.is_active:
+        raise AuthenticationFailed(_("User inactive or deleted."))
+    return token.user, token
+
+
+class AsyncReadView(View, ABC):
+    """Serve a viewset action, GET only, the I/O done in `read()`."""
+
+    viewset: type
+    action = "list"
+
+    async def get(self, request, *args, **kwargs):
+        handler = getattr(self.viewset, self.action)
+        view = self.viewset(
+            action_map={"get": self.action},
+            args=args,
+            kwargs=kwargs,
+            # The @action's own, e.g. its permission_classes
+            **getattr(handler, "kwargs", {}),
+        )
+        view.headers = view.default_response_headers
+        request = view.request = view.initialize_request(request)
+        try:
+            request.user, request.auth = await authenticate(request)
+            view.initial(request, *args, **kwargs)
+            if isinstance(view, ConditionalGetMixin):
+                # Validated as at the sync view's url
+                path = request.get_full_path().replace("/async/", "/", 1)
+                response = await view.aconditional(
+                    partial(self.read, view), request, path, **kwargs
+                )
+            else:
+                response = await self.read(view, request, **kwargs)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        response = view.finalize_response(request, response, *args, **kwargs)
+        if not isinstance(response, Response):
+            # E.g. a 304
+            return response
+        if response.accepted_renderer.format == "api":
+            # The browsable api renders forms, off the db
+            return await sync_to_async(response.render)()
+        return response.render()
+
+    @abstractmethod
+    async def read(self, view, request, **kwargs) -> Response:
+        """Make the action's response, the I/O done async."""
+
+    async def filter_queryset(self, view):
+        return await sync_to_async(view.filter_queryset)(view.get_queryset())
+
+
+class AsyncRowsView(AsyncReadView):
+    """List a plain serializer's rows off values_list(), see api.fastpath."""
+
+    async def read(self, view, request, **kwargs):
+        queryset = await self.filter_queryset(view)
+        plan = compile_serializer(view.get_serializer_class())
+        if plan.columns:
+            rows = [row async for row in queryset.values_list(*plan.columns)]
+            return Response(plan.render_rows(rows))
+        runtime = Runtime(view.get_serializer_context())
+        return Response([plan.render(obj, runtime) async for obj in queryset])
+
+
+async def serialize_recipes(view, recipes, many=True):
+    """Render recipe cards, the flags & the cards they need loaded first."""
+    context = view.get_serializer_context()
+    await get_recipe_flags(context).aload()
+    serializer = view.get_serializer(recipes, many=many, context=context)
+    if getattr(serializer, "child", serializer).uses_cards:
+        context[CARDS_CONTEXT_KEY] = await aload_cards(
+            recipes if many else (recipes,)
+        )
+    return serializer.data
+
+
+class AsyncRecipeList(AsyncReadView):
+    viewset = RecipeViewSet
+
+    async def read(self, view, request, **kwargs):
+        queryset = await self.filter_queryset(view)
+        page = await view.paginator.apaginate_queryset(queryset, request, view)
+        return view.paginator.get_paginated_response(
+            await serialize_recipes(view, page)
+        )
+
+
+class AsyncRecipeDetail(AsyncReadView):
+    viewset = RecipeViewSet
+    action = "retrieve"
+
+    async def read(self, view, request, pk):
+        queryset = view.get_queryset()
+        try:
+            recipe = await queryset.aget(pk=pk)
+        except ObjectDoesNotExist:
+            # As get_object_or_404() says it
+            raise Http404(
+                f"No {queryset.model._meta.object_name} matches the given "
+                "query."
+            )
+        return Response(await serialize_recipes(view, recipe, many=False))
+
+
+class AsyncTagList(AsyncRowsView):
+    viewset = TagViewSet
+
+
+class AsyncIngredientList(AsyncRowsView):
+    viewset = IngredientViewSet
+
+
+class AsyncSubscriptionList(AsyncReadView):
+    viewset = UsersViewSet
+    action = "subscriptions"
+
+    async def read(self, view, request, **kwargs):
+        page = await view.paginator.apaginate_queryset(
+            view.get_subscriptions(), request, view
+        )
+        context = {"request": request}
+        await get_recipe_flags(context).aload()
+        return view.paginator.get_paginated_response(
+            SubscriptionSerializer(page, many=True, context=context).data
+        )
@@ -0,0 +1,121 @@
+"""The recipe "card" read model.
+
+A card holds the user-independent JSON of a recipe as RecipeSerializer
+renders it: the image url is relative & the per-user flags are False. It is
+rebuilt by RecipeWriteSerializer on write, dropped by the signals in
+`api.signals` when a tag, an ingredient or an author changes, and rebuilt
+lazily on the next read, so list & retrieve come down to one select plus
+`overlay_card()`.
+"""
+
+import json
+import threading
+from collections.abc import Iterable
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
+from recipes.models import Recipe, RecipeCard
+from recipes.renditions import absolute_srcset
+
+from .flags import get_recipe_flags
+
+CONTEXT_KEY = "recipe_cards"
+
+_pending = threading.local()
+
+
+def rebuild_cards(recipe_ids: Iterable[int]) -> dict[int, dict]:
+    """Render & store the cards, for the recipes given by their ids."""
+    from .serializers import RecipeSerializer
+
+    recipes = (
+        Recipe.objects.filter(id__in=list(recipe_ids))
+        .select_related("author")
+        .prefetch_related("tags", "recipe_ingredient__ingredient")
+    )
+    texts = {
+        card["id"]: json.dumps(card, ensure_ascii=False)
+        for card in RecipeSerializer(recipes, many=True).data
+    }
+    RecipeCard.objects.bulk_create(
+        (RecipeCard(recipe_id=pk, data=text) for pk, text in texts.items()),
+        update_conflicts=True,
+        unique_fields=("recipe",),
+        update_fields=("data",),
+    )
+    return {pk: json.loads(text) for pk, text in texts.items()}
+
+
+def invalidate_cards(recipes) -> None:
+    """Drop the cards of a Recipe queryset, or of a list of recipe ids."""
+    pending = getattr(_pending, "ids", None)
+    if pending is not None and not isinstance(recipes, QuerySet):
+        pending.update(recipes)
+        return
+    RecipeCard.objects.filter(recipe__in=recipes).delete()
+
+
+@contextmanager
+def batch_invalidation():
+    """Drop the cards invalidated by id within in one go, on the way out.
+
+    Writing a recipe fires a signal per ingredient row, which would be a
+    DELETE each otherwise.
+    """
+    if getattr(_pending, "ids", None) is not None:
+        yield
+        return
+    _pending.ids = set()
+    try:
+        yield
+    finally:
+        ids, _pending.ids = _pending.ids, None
+        if ids:
+            RecipeCard.objects.filter(recipe__in=ids).delete()
+
+
+def read_cards(recipes: Iterable[Recipe]) -> tuple[dict[int, dict], list]:
+    """Return the cards found on the recipes & the ids of those with none."""
+    cards, missing = {}, []
+    for recipe in recipes:
+        try:
+            cards[recipe.id] = json.loads(recipe.card.data)
+        except RecipeCard.DoesNotExist:
+            missing.append(recipe.id)
+    return cards, missing
+
+
+def load_cards(recipes: Iterable[Recipe]) -> dict[int, dict]:
+    """Read the cards off recipes fetched with select_related("card")."""
+    cards, missing = read_cards(recipes)
+    if missing:
+        cards.update(rebuild_cards(missing))
+    return cards
+
+
+async def aload_cards(recipes: Iterable[Recipe]) -> dict[int, dict]:
+    """As load_cards(), for an async view."""
+    cards, missing = read_cards(recipes)
+    if missing:
+        cards.update(await sync_to_async(rebuild_cards)(missing))
+    return cards
+
+
+def overlay_card(card: dict, context: dict) -> dict:
+    """Add whatever depends on the user & the request to a card."""
+    flags = get_recipe_flags(context)
+    request = context.get("request")
+    data = dict(card)
+    data["author"] = dict(
+        card["author"], is_subscribed=flags.is_subscribed(card["author"]["id"])
+    )
+    data["is_favorited"] = flags.is_favorited(card["id"])
+    data["is_in_shopping_cart"] = flags.is_in_shopping_cart(card["id"])
+    if request is not None and card["image"]:
+        data["image"] = request.build_absolute_uri(card["image"])
+    if request is not None:
+        data["image_srcset"] = absolute_srcset(
+            card["image_srcset"], request.build_absolute_uri
+        )
+    return data
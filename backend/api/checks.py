@@ -0,0 +1,30 @@
+"""System checks of the settings the api relies upon.
+
+The versions, see `api.versions`, are bumped by the worker & the management
+commands as well as by the web processes, so a cache local to a process
+would have the ETags of the others go stale.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs) -> list[Error]:
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f"The versions are kept in {backend}, which no other process "
+            "sees.",
+            hint="Set CACHE_BACKEND & CACHE_LOCATION to a shared cache, "
+            "e.g. django.core.cache.backends.redis.RedisCache.",
+            id="api.E001",
+        )
+    ]
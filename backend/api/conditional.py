@@ -0,0 +1,96 @@
+"""Conditional GET for the read-only views.
+
+The validators come off the content versions in `api.versions`, bumped by
+the signals in `api.signals`, so a `304 Not Modified` is answered from the
+cache alone, with no rows fetched & no serializer run.
+"""
+
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from .flags import FLAG_SOURCES, version_key
+from .versions import aget_versions, content_key, get_versions
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match/If-Modified-Since on list & retrieve."""
+
+    # The content scopes a view renders, see `api.versions.content_key()`
+    conditional_scopes: tuple[str, ...] = ()
+    # Whether the output depends on the user's favourites, cart, etc.
+    conditional_user_flags = False
+
+    def get_conditional_scopes(self):
+        return self.conditional_scopes
+
+    def get_validator_keys(self, request):
+        keys = [content_key(scope) for scope in self.get_conditional_scopes()]
+        user = request.user
+        if self.conditional_user_flags and user.is_authenticated:
+            keys += [version_key(kind, user.id) for kind in FLAG_SOURCES]
+        return keys
+
+    def get_validators(self, request, path=None):
+        versions = get_versions(self.get_validator_keys(request))
+        return self.make_validators(request, versions, path)
+
+    async def aget_validators(self, request, path=None):
+        versions = await aget_versions(self.get_validator_keys(request))
+        return self.make_validators(request, versions, path)
+
+    def make_validators(self, request, versions, path=None):
+        """The ETag & Last-Modified, of the path given or the request's."""
+        fingerprint = "|".join(
+            (
+                path or request.get_full_path(),
+                request.META.get("HTTP_ACCEPT", ""),
+                request.META.get("HTTP_ACCEPT_LANGUAGE", ""),
+                str(request.user.id) if self.conditional_user_flags else "",
+                *map(str, versions),
+            )
+        )
+        etag = f'"{hashlib.md5(fingerprint.encode()).hexdigest()}"'
+        return etag, max(versions) // 10**9 if versions else None
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return self.set_validators(request, response, etag, last_modified)
+
+    async def aconditional(self, handler, request, path, **kwargs):
+        """As conditional(), for an async view, the handler a coroutine
+        function & the path the one of the sync view it stands in for."""
+        etag, last_modified = await self.aget_validators(request, path)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = await handler(request, **kwargs)
+        return self.set_validators(request, response, etag, last_modified)
+
+    def set_validators(self, request, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            if self.conditional_user_flags:
+                patch_vary_headers(response, ("Authorization",))
+            audience = "private" if request.user.is_authenticated else "public"
+            patch_cache_control(response, no_cache=True, **{audience: True})
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
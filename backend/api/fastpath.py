@@ -0,0 +1,211 @@
+"""A read-only rendering engine for the plain ModelSerializers.
+
+`compile_serializer()` walks a serializer's fields once & turns each into a
+small accessor: an attrgetter plus the int/str/... the DRF field would have
+converted the value with, a compiled plan for a nested serializer, or the
+bound method for a SerializerMethodField. Rendering then skips the DRF
+field objects altogether & gives the same data, hence the same JSON.
+
+Any other field falls back to its own DRF to_representation(). The engine
+is opt-in via `settings.API_FAST_SERIALIZERS`, through FastListSerializer.
+"""
+
+from collections.abc import Mapping
+from functools import cache
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.manager import BaseManager
+from rest_framework import fields, serializers
+
+CONVERTERS = {
+    fields.IntegerField.to_representation: int,
+    fields.FloatField.to_representation: float,
+    fields.CharField.to_representation: str,
+    fields.BooleanField.to_representation: bool,
+    fields.ReadOnlyField.to_representation: None,
+}
+MISSING = object()
+
+
+class Runtime:
+    """The per-render state: the context & the serializers bound to it."""
+
+    def __init__(self, context):
+        self.context = context
+        self.request = context.get("request")
+        self._serializers = {}
+
+    def serializer(self, serializer_class):
+        if serializer_class not in self._serializers:
+            self._serializers[serializer_class] = serializer_class(
+                context=self.context
+            )
+        return self._serializers[serializer_class]
+
+
+class Plan:
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.names = []
+        self.accessors = []
+        columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            accessor, column = compile_field(serializer_class, name, field)
+            self.names.append(name)
+            self.accessors.append(accessor)
+            columns.append(column)
+        # All plain columns: render straight off values_list() rows
+        self.columns = tuple(columns) if None not in columns else None
+        self.converters = (
+            tuple(accessor.converter for accessor in self.accessors)
+            if self.columns
+            else None
+        )
+
+    def render(self, obj, runtime):
+        data = {}
+        for name, accessor in zip(self.names, self.accessors):
+            value = accessor(obj, runtime)
+            if value is not MISSING:
+                data[name] = value
+        return data
+
+    def render_many(self, data, runtime, rows=True):
+        """Render a list; a top-level plain queryset via values_list()."""
+        if isinstance(data, BaseManager):
+            data = data.all()
+        if rows and self.columns and isinstance(data, QuerySet):
+            return self.render_rows(data.values_list(*self.columns))
+        return [self.render(obj, runtime) for obj in data]
+
+    def render_rows(self, rows):
+        names, converters = self.names, self.converters
+        return [
+            {
+                name: (
+                    value
+                    if convert is None or value is None
+                    else convert(value)
+                )
+                for name, convert, value in zip(names, converters, row)
+            }
+            for row in rows
+        ]
+
+
+@cache
+def compile_serializer(serializer_class) -> Plan:
+    return Plan(serializer_class)
+
+
+def compile_field(serializer_class, name, field):
+    """Return an accessor(obj, runtime) & its column, if a plain one."""
+    if isinstance(field, serializers.SerializerMethodField):
+        method_name = field.method_name
+
+        def method_accessor(obj, runtime):
+            serializer = runtime.serializer(serializer_class)
+            return getattr(serializer, method_name)(obj)
+
+        return method_accessor, None
+
+    get = getter(field.source_attrs)
+    if type(field) in (serializers.ListSerializer, FastListSerializer):
+        child = compile_serializer(type(field.child))
+
+        def many_accessor(obj, runtime):
+            value = get(obj)
+            if value is None:
+                return None
+            # Nested relations come prefetched, keep off values_list()
+            return child.render_many(value, runtime, rows=False)
+
+        return many_accessor, None
+
+    if isinstance(field, serializers.Serializer):
+        nested = compile_serializer(type(field))
+
+        def nested_accessor(obj, runtime):
+            value = get(obj)
+            return None if value is None else nested.render(value, runtime)
+
+        return nested_accessor, None
+
+    if isinstance(field, fields.FileField) and not getattr(
+        field, "represent_in_base64", False
+    ):
+        use_url = getattr(field, "use_url", True)
+
+        def file_accessor(obj, runtime):
+            value = get(obj)
+            if not value:
+                return None
+            if not use_url:
+                return value.name
+            url = value.url
+            if runtime.request is not None:
+                return runtime.request.build_absolute_uri(url)
+            return url
+
+        return file_accessor, None
+
+    representation = type(field).to_representation
+    if representation in CONVERTERS:
+        convert = CONVERTERS[representation]
+
+        def value_accessor(obj, runtime):
+            value = get(obj)
+            if value is None or convert is None:
+                return value
+            return convert(value)
+
+        value_accessor.converter = convert  # type: ignore[attr-defined]
+        column = field.source if len(field.source_attrs) == 1 else None
+        return value_accessor, column
+
+    def field_accessor(obj, runtime):
+        bound = runtime.serializer(serializer_class).fields[name]
+        try:
+            value = bound.get_attribute(obj)
+        except fields.SkipField:
+            return MISSING
+        return None if value is None else bound.to_representation(value)
+
+    return field_accessor, None
+
+
+def getter(source_attrs):
+    if not source_attrs:
+        return lambda obj: obj
+    get = attrgetter(".".join(source_attrs))
+
+    def get_value(obj):
+        if isinstance(obj, Mapping):
+            for attr in source_attrs:
+                obj = obj[attr]
+            return obj
+        return get(obj)
+
+    return get_value
+
+
+def render(serializer_class, data, context=None, many=False):
+    """Render like serializer_class(data, many=many).data, only faster."""
+    runtime = Runtime(context if context is not None else {})
+    plan = compile_serializer(serializer_class)
+    if many:
+        return plan.render_many(data, runtime)
+    return plan.render(data, runtime)
+
+
+class FastListSerializer(serializers.ListSerializer):
+    """Use the compiled plan when `settings.API_FAST_SERIALIZERS` is on."""
+
+    def to_representation(self, data):
+        if not settings.API_FAST_SERIALIZERS:
+            return super().to_representation(data)
+        return render(type(self.child), data, self.context, many=True)
@@ -0,0 +1,100 @@
+"""The feed of the recipes by the authors a user subscribes to.
+
+A recipe is written onto the timelines of its author's subscribers as it is
+published, as FeedEntry rows, so that reading a feed walks one index rather
+than joining the subscriptions to the recipes & sorting. An author of more
+than FEED_FANOUT_MAX_FOLLOWERS subscribers is not fanned out, the recipes
+being pulled in on read instead & merged in, see `feed_sources()`.
+
+A new subscription backfills the author's latest recipes. The recipes of an
+author who had been pulled in only show up on the timelines again once they
+are published or subscribed to anew.
+"""
+
+from django.db.models import Exists, OuterRef
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+from backend.constants import FEED_BACKFILL_RECIPES, FEED_FANOUT_MAX_FOLLOWERS
+
+from .paginations import MergedKeysetPagination
+
+
+class FeedPagination(MergedKeysetPagination):
+    ordering = ("-pub_date", "-id")
+
+
+def followers_beyond_fanout(author):
+    """Whether an author has too many followers to fan out to; the author
+    may be an OuterRef. Counts no further than the limit."""
+    return Exists(
+        Subscription.objects.filter(author=author).values("pk")[
+            FEED_FANOUT_MAX_FOLLOWERS:
+        ]
+    )
+
+
+def is_pulled(author_id: int) -> bool:
+    return Subscription.objects.filter(author_id=author_id)[
+        FEED_FANOUT_MAX_FOLLOWERS:
+    ].exists()
+
+
+def fan_out(recipe: Recipe) -> None:
+    """Put a new recipe on the timelines of its author's subscribers."""
+    if is_pulled(recipe.author_id):
+        return
+    subscribers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list("user_id", flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.id,
+                author_id=recipe.author_id,
+                pub_date=recipe.pub_date,
+            )
+            for user_id in subscribers
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id: int, author_id: int) -> None:
+    """Put an author's latest recipes on a new subscriber's timeline."""
+    if is_pulled(author_id):
+        return
+    recipes = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-id")
+        .values_list("id", "pub_date")[:FEED_BACKFILL_RECIPES]
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for recipe_id, pub_date in recipes
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(user_id: int, author_id: int) -> None:
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def feed_sources(user):
+    """The user's timeline & the recipes of the authors pulled in, as the
+    (queryset, ordering) pairs for FeedPagination to merge."""
+    pulled = Subscription.objects.filter(
+        followers_beyond_fanout(OuterRef("author")), user=user
+    ).values("author")
+    return (
+        (FeedEntry.objects.filter(user=user), ("-pub_date", "-recipe_id")),
+        (Recipe.objects.filter(author__in=pulled), ("-pub_date", "-id")),
+    )
@@ -0,0 +1,50 @@
+"""Sparse fieldsets: `?fields=id,name` renders only those fields of a
+recipe & `?omit=text,ingredients` all but those.
+
+The view works the fieldset out once, see `get_fieldset()`, & hands it to
+the serializer in the context, so that it can prune its queryset with the
+same fields it's going to render.
+"""
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+CONTEXT_KEY = "fieldset"
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def parse(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def get_fieldset(request, available) -> tuple[str, ...] | None:
+    """Return the fields asked for, in the serializer's order, else None."""
+    params = request.query_params
+    if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+        return None
+    fields = parse(params.get(FIELDS_PARAM, "")) or list(available)
+    omit = parse(params.get(OMIT_PARAM, ""))
+    unknown = set(fields + omit) - set(available)
+    if unknown:
+        raise ValidationError(
+            {
+                FIELDS_PARAM: [
+                    _("Unknown fields: {}.").format(", ".join(sorted(unknown)))
+                ]
+            }
+        )
+    return tuple(
+        name for name in available if name in fields and name not in omit
+    )
+
+
+class SparseFieldsetMixin:
+    """Keep only the fields of the fieldset in the context, if any."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get(CONTEXT_KEY)
+        if fieldset is not None:
+            for name in set(self.fields) - set(fieldset):
+                self.fields.pop(name)
@@ -1,7 +1,23 @@
 import django_filters
+import numpy as np
 from django_filters import CharFilter, FilterSet, rest_framework
 from recipes.models import Ingredient, Recipe
 
+from .flags import UserRecipeFlags
+from .ingredient_index import id_in, ingredient_index
+from .search import search_recipes
+from .tags import get_tag_ids, tag_choices
+
+
+# The orderings on offer, each ending on the pk for a keyset to page on
+ORDERINGS = {
+    "popular": ("-favorites_count", "-pub_date", "-id"),
+}
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
 
 class IngredientFilter(FilterSet):
     name = CharFilter(lookup_expr="startswith")
@@ -12,10 +28,16 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.AllValuesMultipleFilter(
-        field_name="tags__slug",
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices, method="filter_tags"
     )
 
+    ingredients = NumberInFilter(method="filter_ingredients")
+    exclude_ingredients = NumberInFilter(method="filter_ingredients")
+    search = CharFilter(method="search_by_text")
+    ordering = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in ORDERINGS], method="order_recipes"
+    )
     is_in_shopping_cart = django_filters.filters.NumberFilter(
         method="is_recipe_in_shoppingcart"
     )
@@ -23,16 +45,48 @@ class RecipeFilter(django_filters.FilterSet):
         method="is_recipe_in_favorites"
     )
 
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = get_tag_ids()
+        # A semi-join on the m2m table, neither joining tags nor DISTINCT
+        return queryset.filter(
+            id__in=Recipe.tags.through.objects.filter(
+                tag_id__in=[tag_ids[slug] for slug in value]
+            ).values("recipe_id")
+        )
+
+    def filter_ingredients(self, queryset, name, value):
+        # Both params are handled at once, off the inverted index, by the
+        # includes' filter, unless empty: django-filter skips it then
+        contains = self.form.cleaned_data.get("ingredients")
+        if name == "exclude_ingredients" and contains:
+            return queryset
+        excludes = self.form.cleaned_data.get("exclude_ingredients")
+        excluded = ingredient_index.containing_any(map(int, excludes or ()))
+        if contains:
+            found = ingredient_index.containing_all(map(int, contains))
+            return queryset.filter(id_in(np.setdiff1d(found, excluded)))
+        if len(excluded):
+            return queryset.exclude(id_in(excluded))
+        return queryset
+
+    def search_by_text(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def order_recipes(self, queryset, name, value):
+        return queryset.order_by(*ORDERINGS[value])
+
     def is_recipe_in_favorites(self, queryset, name, value):
         if value:
-            user = self.request.user
-            return queryset.filter(favorite__user_id=user.id)
+            flags = UserRecipeFlags(self.request.user)
+            return queryset.filter(id__in=flags.favorites)
         return queryset
 
     def is_recipe_in_shoppingcart(self, queryset, name, value):
         if value:
-            user = self.request.user
-            return queryset.filter(shoppingcart__user_id=user.id)
+            flags = UserRecipeFlags(self.request.user)
+            return queryset.filter(id__in=flags.shopping_cart)
         return queryset
 
     class Meta:
@@ -42,4 +96,8 @@ class RecipeFilter(django_filters.FilterSet):
             "tags",
             "is_favorited",
             "is_in_shopping_cart",
+            "ingredients",
+            "exclude_ingredients",
+            "search",
+            "ordering",
         )
@@ -0,0 +1,113 @@
+"""Per-user recipe flags, i.e. favourites & shopping cart recipe ids, plus
+the ids of the authors the user is subscribed to.
+
+The ids are loaded once per user & kept in the cache under a per-user
+version, bumped by the Favorite/ShoppingCart/Subscription signals in
+`api.signals`, so the recipe list query itself no longer depends on who is
+asking.
+"""
+
+from django.core.cache import cache
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+from backend.constants import USER_FLAGS_CACHE_TIMEOUT
+
+from .versions import aget_versions, bump_version, get_version
+
+FLAG_SOURCES = {
+    "favorite": (Favorite, "recipe_id"),
+    "shopping_cart": (ShoppingCart, "recipe_id"),
+    "subscription": (Subscription, "author_id"),
+}
+CONTEXT_KEY = "recipe_flags"
+
+
+def version_key(kind: str, user_id: int) -> str:
+    return f"flags:{kind}:{user_id}:version"
+
+
+def bump_flags(kind: str, user_id: int) -> int:
+    return bump_version(version_key(kind, user_id))
+
+
+class UserRecipeFlags:
+    """Resolve the is_favorited/is_in_shopping_cart flags for one user."""
+
+    def __init__(self, user=None):
+        self.user_id = (
+            user.id if user is not None and user.is_authenticated else None
+        )
+        self._ids: dict[str, frozenset[int]] = {}
+
+    def ids(self, kind: str) -> frozenset[int]:
+        if kind not in self._ids:
+            self._ids[kind] = self._load(kind)
+        return self._ids[kind]
+
+    @property
+    def favorites(self) -> frozenset[int]:
+        return self.ids("favorite")
+
+    @property
+    def shopping_cart(self) -> frozenset[int]:
+        return self.ids("shopping_cart")
+
+    def is_favorited(self, recipe_id: int) -> bool:
+        return recipe_id in self.favorites
+
+    def is_in_shopping_cart(self, recipe_id: int) -> bool:
+        return recipe_id in self.shopping_cart
+
+    def is_subscribed(self, author_id: int) -> bool:
+        return author_id in self.ids("subscription")
+
+    async def aload(self) -> "UserRecipeFlags":
+        """Load all the flags up front, for an async view to use after."""
+        kinds = [kind for kind in FLAG_SOURCES if kind not in self._ids]
+        if self.user_id is None:
+            self._ids.update(dict.fromkeys(kinds, frozenset()))
+            return self
+        versions = await aget_versions(
+            [version_key(kind, self.user_id) for kind in kinds]
+        )
+        for kind, version in zip(kinds, versions):
+            key = f"flags:{kind}:{self.user_id}:{version}"
+            ids = await cache.aget(key)
+            if ids is None:
+                model, field = FLAG_SOURCES[kind]
+                ids = frozenset(
+                    [
+                        pk
+                        async for pk in model.objects.filter(
+                            user_id=self.user_id
+                        ).values_list(field, flat=True)
+                    ]
+                )
+                await cache.aset(key, ids, timeout=USER_FLAGS_CACHE_TIMEOUT)
+            self._ids[kind] = ids
+        return self
+
+    def _load(self, kind: str) -> frozenset[int]:
+        if self.user_id is None:
+            return frozenset()
+        version = get_version(version_key(kind, self.user_id))
+        key = f"flags:{kind}:{self.user_id}:{version}"
+        ids = cache.get(key)
+        if ids is None:
+            model, field = FLAG_SOURCES[kind]
+            ids = frozenset(
+                model.objects.filter(user_id=self.user_id).values_list(
+                    field, flat=True
+                )
+            )
+            cache.set(key, ids, timeout=USER_FLAGS_CACHE_TIMEOUT)
+        return ids
+
+
+def get_recipe_flags(context: dict) -> UserRecipeFlags:
+    """Share one resolver across a serializer tree via its context."""
+    if CONTEXT_KEY not in context:
+        request = context.get("request")
+        context[CONTEXT_KEY] = UserRecipeFlags(getattr(request, "user", None))
+    return context[CONTEXT_KEY]
@@ -0,0 +1,181 @@
+"""An inverted index of the ingredients, to their sorted recipe ids.
+
+A must-contain filter is then an intersection of the postings of the
+ingredients asked for, the shortest first, & an allergen-free one a union
+to take away, all in numpy, rather than a join or NOT EXISTS per ingredient.
+
+The index is loaded once per process & kept under its content version: a
+process that writes a recipe's ingredients updates its own copy in place,
+the others reload on seeing the version move. A deleted recipe is taken out
+the same way, so that no index counts it. `RecipeIndex` is the base for the
+other such in-memory indexes, e.g. `api.pantry`.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import chain
+from threading import Lock, local
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from recipes.models import Recipe, RecipeIngredient
+
+from .versions import bump_version, content_key, get_version
+
+EMPTY = np.empty(0, dtype=np.int64)
+INDEXES: list["RecipeIndex"] = []
+
+_writing = local()
+
+
+class RecipeIndex(ABC):
+    """An in-memory index over the (ingredient_id, recipe_id) pairs."""
+
+    scope: str
+
+    def __init__(self):
+        self.version_key = content_key(self.scope)
+        self.version = None
+        self.lock = Lock()
+        INDEXES.append(self)
+
+    @abstractmethod
+    def build(self, pairs: np.ndarray):
+        """Index the pairs, in place of whatever was indexed."""
+
+    @abstractmethod
+    def change(self, recipe_id: int, ingredient_ids: frozenset[int]):
+        """Re-index a recipe, with no ingredients for one deleted."""
+
+    def load(self):
+        version = get_version(self.version_key)
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            rows = RecipeIngredient.objects.values_list(
+                "ingredient_id", "recipe_id"
+            )
+            self.build(
+                np.fromiter(
+                    chain.from_iterable(rows.iterator(chunk_size=10000)),
+                    dtype=np.int64,
+                ).reshape(-1, 2)
+            )
+            self.version = version
+
+    def apply(self, recipe_id, ingredient_ids):
+        with self.lock:
+            known = self.version == get_version(self.version_key)
+            version = bump_version(self.version_key)
+            if known:
+                self.change(recipe_id, ingredient_ids)
+                self.version = version
+
+    def invalidate(self):
+        bump_version(self.version_key)
+
+
+class IngredientIndex(RecipeIndex):
+    scope = "ingredient-index"
+
+    def __init__(self):
+        super().__init__()
+        self.postings: dict[int, np.ndarray] = {}
+
+    def build(self, pairs):
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        ingredients, starts = np.unique(pairs[:, 0], return_index=True)
+        self.postings = {
+            int(ingredient): np.unique(recipes)
+            for ingredient, recipes in zip(
+                ingredients, np.split(pairs[:, 1], starts[1:])
+            )
+        }
+
+    def change(self, recipe_id, ingredient_ids):
+        for ingredient_id, recipes in self.postings.items():
+            if ingredient_id in ingredient_ids:
+                continue
+            position = np.searchsorted(recipes, recipe_id)
+            if position < len(recipes) and recipes[position] == recipe_id:
+                self.postings[ingredient_id] = np.delete(recipes, position)
+        for ingredient_id in ingredient_ids:
+            recipes = self.recipes_with(ingredient_id)
+            position = np.searchsorted(recipes, recipe_id)
+            if position == len(recipes) or recipes[position] != recipe_id:
+                self.postings[ingredient_id] = np.insert(
+                    recipes, position, recipe_id
+                )
+
+    def recipes_with(self, ingredient_id: int) -> np.ndarray:
+        return self.postings.get(ingredient_id, EMPTY)
+
+    def containing_all(self, ingredient_ids) -> np.ndarray:
+        self.load()
+        postings = sorted(map(self.recipes_with, set(ingredient_ids)), key=len)
+        if not postings:
+            return EMPTY
+        found = postings[0]
+        for recipes in postings[1:]:
+            found = np.intersect1d(found, recipes, assume_unique=True)
+        return found
+
+    def containing_any(self, ingredient_ids) -> np.ndarray:
+        self.load()
+        postings = [self.recipes_with(pk) for pk in set(ingredient_ids)]
+        return np.unique(np.concatenate(postings)) if postings else EMPTY
+
+
+def update_indexes(recipe_id: int, ingredient_ids):
+    """Re-index a recipe, once its ingredients are committed, or take it
+    out, given none."""
+    ingredient_ids = frozenset(ingredient_ids)
+
+    def apply():
+        for index in INDEXES:
+            index.apply(recipe_id, ingredient_ids)
+
+    transaction.on_commit(apply)
+
+
+def invalidate_indexes():
+    """Make each process reload the indexes, e.g. on an admin edit, but
+    for a write re-indexing its recipe in place, see `indexed_write()`."""
+    if getattr(_writing, "active", False):
+        return
+    for index in INDEXES:
+        index.invalidate()
+
+
+@contextmanager
+def indexed_write():
+    """Mark a recipe write that calls update_indexes() itself, for the
+    ingredient rows it deletes on the way not to invalidate the indexes."""
+    active, _writing.active = getattr(_writing, "active", False), True
+    try:
+        yield
+    finally:
+        _writing.active = active
+
+
+def id_in(ids: np.ndarray):
+    """A `recipes.id IN ids` condition, with the ids as one parameter."""
+    column = f'"{Recipe._meta.db_table}"."id"'
+    if connection.vendor == "postgresql":
+        return RawSQL(
+            f"{column} = ANY(%s)", (ids.tolist(),), output_field=BooleanField()
+        )
+    if connection.vendor == "sqlite":
+        return RawSQL(
+            f"{column} IN (SELECT value FROM json_each(%s))",
+            (f"[{','.join(map(str, ids.tolist()))}]",),
+            output_field=BooleanField(),
+        )
+    return Q(id__in=ids.tolist())
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,732 @@
+"""This file is used to benchmark the api hot paths. Run in your virtual env
+`python manage.py benchmark <target>`, with a target of your choice.
+
+The data to measure on is made up in a transaction that is rolled back in
+the end, so the command is safe to run against a dev database. The async
+target serves requests off other threads, which can't see into it, so its
+data is committed, & deleted in the end instead.
+
+"""
+
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.test import Client, override_settings
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeNeighbor,
+    ShoppingCart,
+    Tag,
+)
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.rl_config import TTFSearchPath  # type: ignore[import-untyped]
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from users.models import Subscription
+
+from api import fastpath
+from api.flags import bump_flags
+from api.ingredient_index import id_in, ingredient_index
+from api.pantry import pantry_matrix
+from api.pdf import shopping_list_pdf
+from api.renderers import FastJSONParser, FastJSONRenderer
+from api.search import search_recipes
+from api.serializers import (
+    AbridgedRecipeSerializer,
+    IngredientSerializer,
+    RecipeSerializer,
+    TagSerializer,
+)
+from api.similar import build_neighbors
+from backend.constants import SIMILAR_RECIPES
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the api hot paths on made-up data."
+    targets = (
+        "serializers",
+        "search",
+        "ingredients",
+        "pantry",
+        "json",
+        "similar",
+        "async",
+        "pdf",
+    )
+    # Served off other threads, with the data committed
+    committed_targets = ("async",)
+
+    def add_arguments(self, parser):
+        parser.add_argument("target", choices=self.targets)
+        parser.add_argument("--recipes", type=int, default=200)
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument("--per-recipe", type=int, default=8)
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=16)
+
+    def handle(self, *args, **options):
+        if options["target"] in self.committed_targets:
+            with override_settings(ALLOWED_HOSTS=["*"]):
+                self.populate(options)
+                try:
+                    getattr(self, f"bench_{options['target']}")(options)
+                finally:
+                    self.depopulate()
+            return
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=["*"]):
+                self.populate(options)
+                getattr(self, f"bench_{options['target']}")(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, options):
+        self.author = User.objects.create_user(
+            email="bench@example.org",
+            username="bench",
+            first_name="Bench",
+            last_name="Mark",
+            password="bench-Mark_1",
+        )
+        self.users = [self.author]
+        self.tags = Tag.objects.bulk_create(
+            Tag(name=f"bench{i}", color=f"#00000{i}", slug=f"bench{i}")
+            for i in range(3)
+        )
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"bench ingredient {i}", measurement_unit="g")
+            for i in range(options["ingredients"])
+        )
+        self.recipes = Recipe.objects.bulk_create(
+            Recipe(
+                name=f"bench recipe {i}",
+                image="recipes/bench.jpg",
+                text="Cook it. " * 50,
+                cooking_time=i % 120 + 1,
+                author=self.author,
+            )
+            for i in range(options["recipes"])
+        )
+        per_recipe = options["per_recipe"]
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=self.ingredients[
+                    (i * per_recipe + j) % len(self.ingredients)
+                ],
+                amount=j + 1,
+            )
+            for i, recipe in enumerate(self.recipes)
+            for j in range(per_recipe)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=self.tags[i % 3])
+            for i, recipe in enumerate(self.recipes)
+        )
+
+    def depopulate(self):
+        User.objects.filter(pk__in=[user.pk for user in self.users]).delete()
+        Tag.objects.filter(pk__in=[tag.pk for tag in self.tags]).delete()
+        Ingredient.objects.filter(
+            pk__in=[ingredient.pk for ingredient in self.ingredients]
+        ).delete()
+
+    def timeit(self, func, rounds):
+        """Return the per-call timings of func, in seconds."""
+        func()  # Warm up
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    def report(self, label, timings):
+        mean = statistics.fmean(timings)
+        self.stdout.write(
+            f"{label:<44} {1 / mean:>10.1f}/s "
+            f"mean {mean * 1000:8.3f} ms  "
+            f"p99 {sorted(timings)[int(len(timings) * 0.99)] * 1000:8.3f} ms"
+        )
+        return mean
+
+    def compare(self, label, before, after, rounds):
+        base = self.report(f"{label}, before", self.timeit(before, rounds))
+        new = self.report(f"{label}, after", self.timeit(after, rounds))
+        self.stdout.write(self.style.SUCCESS(f"  x{base / new:.2f}\n"))
+
+    def bench_serializers(self, options):
+        """DRF vs api.fastpath, on a page of --limit recipes & full lists."""
+        request = APIRequestFactory().get("/api/recipes/")
+        request.user = self.author
+        page = list(
+            Recipe.objects.select_related("author").prefetch_related(
+                "tags", "recipe_ingredient__ingredient"
+            )[: options["limit"]]
+        )
+        cases = (
+            (RecipeSerializer, page),
+            (AbridgedRecipeSerializer, page),
+            (TagSerializer, Tag.objects.all()),
+            (IngredientSerializer, Ingredient.objects.all()),
+        )
+        for serializer_class, data in cases:
+
+            def drf():
+                return json.dumps(
+                    serializer_class(
+                        data, many=True, context={"request": request}
+                    ).data,
+                    ensure_ascii=False,
+                )
+
+            def fast():
+                return json.dumps(
+                    fastpath.render(
+                        serializer_class,
+                        data,
+                        {"request": request},
+                        many=True,
+                    ),
+                    ensure_ascii=False,
+                )
+
+            assert drf() == fast(), f"{serializer_class.__name__} differs"
+            self.compare(
+                serializer_class.__name__, drf, fast, options["rounds"]
+            )
+
+        client = Client()
+        for url in ("/api/tags/", "/api/ingredients/"):
+            responses = {}
+            for enabled in (False, True):
+                with override_settings(API_FAST_SERIALIZERS=enabled):
+                    responses[enabled] = client.get(url).content
+                    self.report(
+                        f"GET {url}, fast path {enabled}",
+                        self.timeit(
+                            lambda: client.get(url), options["rounds"]
+                        ),
+                    )
+            assert responses[False] == responses[True], f"{url} differs"
+        self.stdout.write(
+            f"API_FAST_SERIALIZERS is {settings.API_FAST_SERIALIZERS}.\n"
+        )
+
+    def bench_search(self, options):
+        """api.search vs an icontains scan, over --recipes recipes."""
+        recipes = Recipe.objects.all()
+        for terms in ("recipe 7", "cook", "nothing like it"):
+
+            def scan():
+                return list(
+                    recipes.filter(
+                        Q(name__icontains=terms) | Q(text__icontains=terms)
+                    ).values_list("id", flat=True)[: options["limit"]]
+                )
+
+            def search():
+                return list(
+                    search_recipes(recipes, terms).values_list(
+                        "id", flat=True
+                    )[: options["limit"]]
+                )
+
+            self.compare(f"search {terms!r}", scan, search, options["rounds"])
+
+    def bench_ingredients(self, options):
+        """SQL vs api.ingredient_index, on must-have & allergen filters."""
+        limit = options["limit"]
+        first, second, third = (
+            ingredient.id for ingredient in self.ingredients[:3]
+        )
+        recipes = Recipe.objects.order_by("-pub_date", "-id")
+
+        def sql_contains():
+            queryset = recipes
+            for pk in (first, second):
+                queryset = queryset.filter(
+                    Exists(
+                        RecipeIngredient.objects.filter(
+                            recipe=OuterRef("pk"), ingredient_id=pk
+                        )
+                    )
+                )
+            return list(queryset.values_list("id", flat=True)[:limit])
+
+        def index_contains():
+            found = ingredient_index.containing_all((first, second))
+            return list(
+                recipes.filter(id_in(found)).values_list("id", flat=True)[
+                    :limit
+                ]
+            )
+
+        def sql_excludes():
+            return list(
+                recipes.exclude(
+                    Exists(
+                        RecipeIngredient.objects.filter(
+                            recipe=OuterRef("pk"),
+                            ingredient_id__in=(first, second, third),
+                        )
+                    )
+                ).values_list("id", flat=True)[:limit]
+            )
+
+        def index_excludes():
+            excluded = ingredient_index.containing_any((first, second, third))
+            return list(
+                recipes.exclude(id_in(excluded)).values_list("id", flat=True)[
+                    :limit
+                ]
+            )
+
+        start = time.perf_counter()
+        ingredient_index.load()
+        self.stdout.write(
+            f"index loaded in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        for label, sql, index in (
+            ("contains 2 ingredients", sql_contains, index_contains),
+            ("excludes 3 ingredients", sql_excludes, index_excludes),
+        ):
+            assert sql() == index(), f"{label} differs"
+            self.compare(label, sql, index, options["rounds"])
+
+    def bench_pantry(self, options):
+        """api.pantry, scoring all of the recipes for a pantry."""
+        start = time.perf_counter()
+        pantry_matrix.load()
+        self.stdout.write(
+            f"matrix loaded in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        for size in (5, 20, 100):
+            pantry = [ingredient.id for ingredient in self.ingredients[:size]]
+            self.report(
+                f"rank for a pantry of {size}",
+                self.timeit(
+                    lambda: pantry_matrix.rank(pantry), options["rounds"]
+                ),
+            )
+        pantry_matrix.change(self.recipes[0].id, frozenset(pantry[:3]))
+        start = time.perf_counter()
+        pantry_matrix.fold()
+        self.stdout.write(
+            f"a change folded in {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+    def bench_json(self, options):
+        """DRF's JSONRenderer/JSONParser vs api.renderers, on a page."""
+        request = APIRequestFactory().get("/api/recipes/")
+        request.user = self.author
+        data = {
+            "count": len(self.recipes),
+            "next": None,
+            "previous": None,
+            "results": RecipeSerializer(
+                Recipe.objects.select_related("author").prefetch_related(
+                    "tags", "recipe_ingredient__ingredient"
+                )[: options["limit"]],
+                many=True,
+                context={"request": request},
+            ).data,
+        }
+        drf, fast = JSONRenderer(), FastJSONRenderer()
+        assert drf.render(data) == fast.render(data), "rendering differs"
+        self.compare(
+            f"render a page of {options['limit']}",
+            lambda: drf.render(data),
+            lambda: fast.render(data),
+            options["rounds"],
+        )
+        payload = drf.render(data)
+        assert JSONParser().parse(io.BytesIO(payload)) == (
+            FastJSONParser().parse(io.BytesIO(payload))
+        )
+        self.compare(
+            "parse it back",
+            lambda: JSONParser().parse(io.BytesIO(payload)),
+            lambda: FastJSONParser().parse(io.BytesIO(payload)),
+            options["rounds"],
+        )
+
+    def bench_similar(self, options):
+        """api.similar, building the neighbours & looking them up, vs all
+        the pairs compared & a lookup by shared ingredients in SQL."""
+        limit = SIMILAR_RECIPES
+        rounds = min(options["rounds"], 3)
+
+        def all_pairs():
+            sets = defaultdict(set)
+            for (
+                ingredient_id,
+                recipe_id,
+            ) in RecipeIngredient.objects.values_list(
+                "ingredient_id", "recipe_id"
+            ):
+                sets[recipe_id].add(ingredient_id)
+            return sum(
+                1
+                for first, second in combinations(sets.values(), 2)
+                if len(first & second) / len(first | second) > 0
+            )
+
+        self.compare(
+            f"{len(self.recipes)} recipes, all pairs vs MinHash/LSH",
+            all_pairs,
+            build_neighbors,
+            rounds,
+        )
+        self.stdout.write(
+            f"{RecipeNeighbor.objects.count()} neighbours stored\n"
+        )
+        recipe = self.recipes[0]
+
+        def by_shared_ingredients():
+            return list(
+                RecipeIngredient.objects.filter(
+                    ingredient__in=RecipeIngredient.objects.filter(
+                        recipe=recipe
+                    ).values("ingredient")
+                )
+                .exclude(recipe=recipe)
+                .values("recipe")
+                .annotate(shared=Count("id"))
+                .order_by("-shared", "-recipe")
+                .values_list("recipe", flat=True)[:limit]
+            )
+
+        def lookup():
+            return list(
+                RecipeNeighbor.objects.filter(recipe=recipe)
+                .order_by("-similarity", "-neighbor_id")
+                .values_list("neighbor_id", flat=True)[:limit]
+            )
+
+        self.compare(
+            "similar recipes lookup", by_shared_ingredients, lookup, rounds
+        )
+        client = Client()
+        url = f"/api/recipes/{recipe.id}/similar/"
+        self.report(
+            f"GET {url}",
+            self.timeit(lambda: client.get(url), options["rounds"]),
+        )
+
+    def bench_async(self, options):
+        """The sync views over WSGI, on --concurrency threads, vs the async
+        ones over ASGI, as many requests in flight on one event loop, each
+        making --rounds requests.
+
+        Each setup runs in a process forked off this one, for its memory to
+        be its peak RSS growth, off /proc, so Linux only, as in the docker
+        image. The sync views are then run again on as many threads as fit
+        in the memory the async ones took, pro rata, for their p99 to be
+        compared at equal memory."""
+        if not os.path.exists("/proc/self/clear_refs"):
+            raise CommandError("The async target measures memory off /proc.")
+        concurrency, rounds = options["concurrency"], options["rounds"]
+        subscriber = self.subscribe()
+        token = Token.objects.create(user=subscriber)
+        authorization = f"Token {token.key}"
+        paths = (
+            ("/api/recipes/", f"limit={options['limit']}"),
+            (f"/api/recipes/{self.recipes[0].id}/", ""),
+            ("/api/tags/", ""),
+            ("/api/ingredients/", "name=bench%20ingredient%201"),
+            ("/api/users/subscriptions/", "recipes_limit=3"),
+        )
+        client = Client(HTTP_AUTHORIZATION=authorization)
+        for path, query in paths:
+            # Builds the cards, as SQLite won't take concurrent writes
+            client.get(f"{path}?{query}")
+        application = get_asgi_application()
+
+        def memory(field):
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith(f"{field}:"):
+                        return int(line.split()[1]) * 1024
+            raise CommandError(f"No {field} in /proc/self/status.")
+
+        def measured(run):
+            """Run in a forked process, returning its timings, how long it
+            took & its peak RSS growth, in bytes."""
+            context = multiprocessing.get_context("fork")
+            results = context.SimpleQueue()
+
+            def child():
+                try:
+                    # The peak RSS reset to the current one
+                    with open("/proc/self/clear_refs", "w") as clear_refs:
+                        clear_refs.write("5")
+                    before = memory("VmRSS")
+                    start = time.perf_counter()
+                    timings = run()
+                    elapsed = time.perf_counter() - start
+                    results.put((timings, elapsed, memory("VmHWM") - before))
+                except BaseException as error:
+                    results.put(error)
+                    raise
+
+            # Not to be shared with the child
+            connections.close_all()
+            process = context.Process(target=child)
+            process.start()
+            result = results.get()
+            process.join()
+            if isinstance(result, BaseException):
+                raise result
+            return result
+
+        def over_wsgi(path, query, threads):
+            def worker():
+                client = Client(HTTP_AUTHORIZATION=authorization)
+                timings = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    assert client.get(f"{path}?{query}").status_code == 200
+                    timings.append(time.perf_counter() - start)
+                return timings
+
+            with ThreadPoolExecutor(threads) as pool:
+                futures = [pool.submit(worker) for _ in range(threads)]
+                return [t for future in futures for t in future.result()]
+
+        async def get(path, query):
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query.encode(),
+                "root_path": "",
+                "headers": [
+                    (b"host", b"testserver"),
+                    (b"authorization", authorization.encode()),
+                ],
+                "client": ("127.0.0.1", 0),
+                "server": ("testserver", 80),
+            }
+            body = [{"type": "http.request", "body": b""}]
+            status = []
+
+            async def receive():
+                if body:
+                    return body.pop()
+                # No disconnect, the listener being cancelled in the end
+                return await asyncio.get_running_loop().create_future()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+
+            await application(scope, receive, send)
+            assert status == [200], status
+
+        def over_asgi(path, query):
+            async def worker():
+                timings = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    await get(path, query)
+                    timings.append(time.perf_counter() - start)
+                return timings
+
+            async def run():
+                results = await asyncio.gather(
+                    *(worker() for _ in range(concurrency))
+                )
+                return [t for timings in results for t in timings]
+
+            return asyncio.run(run())
+
+        def p99(timings):
+            return sorted(timings)[int(len(timings) * 0.99)]
+
+        def report(label, run):
+            timings, elapsed, rss = measured(run)
+            self.report(label, timings)
+            throughput = len(timings) / elapsed
+            self.stdout.write(
+                f"  {throughput:.1f} requests/s, {rss / 2**20:.1f} MB\n"
+            )
+            return timings, throughput, rss
+
+        for path, query in paths:
+            asgi_path = path.replace("/api/", "/api/async/", 1)
+            _, base, wsgi_rss = report(
+                f"GET {path}, WSGI",
+                lambda: over_wsgi(path, query, concurrency),
+            )
+            timings, throughput, asgi_rss = report(
+                f"GET {asgi_path}, ASGI", lambda: over_asgi(asgi_path, query)
+            )
+            threads = max(1, round(concurrency * asgi_rss / max(wsgi_rss, 1)))
+            equal, _, _ = report(
+                f"GET {path}, WSGI on {threads} threads",
+                lambda: over_wsgi(path, query, threads),
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"  x{throughput / base:.2f} requests/s, "
+                    f"p99 x{p99(equal) / p99(timings):.2f} at equal memory\n"
+                )
+            )
+
+    def subscribe(self):
+        """A reader subscribed to the author & to 9 more, the recipes
+        shared out between them."""
+        authors = [self.author]
+        for i in range(1, 10):
+            authors.append(
+                User.objects.create_user(
+                    email=f"bench{i}@example.org",
+                    username=f"bench{i}",
+                    first_name="Bench",
+                    last_name=f"Mark {i}",
+                    password="bench-Mark_1",
+                )
+            )
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in self.recipes[i::10]]
+            ).update(author=authors[-1])
+        subscriber = User.objects.create_user(
+            email="bench-reader@example.org",
+            username="bench-reader",
+            first_name="Bench",
+            last_name="Reader",
+            password="bench-Mark_1",
+        )
+        self.users.extend((*authors[1:], subscriber))
+        for author in authors:
+            Subscription.objects.create(user=subscriber, author=author)
+        return subscriber
+
+    def bench_pdf(self, options):
+        """api.pdf vs the shopping list drawn from scratch, as it was, on
+        the rows of --limit recipes in the cart, & the download itself,
+        rendered anew vs as rendered for the cart version already, with the
+        most memory a rendering took at once, & the text formats."""
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=self.author, recipe=recipe)
+            for recipe in self.recipes[: options["limit"]]
+        )
+        rows = sorted(
+            RecipeIngredient.objects.filter(
+                recipe__shoppingcart__user=self.author
+            )
+            .values_list("ingredient__name", "ingredient__measurement_unit")
+            .annotate(quantity=Sum("amount"))
+            .values_list(
+                "ingredient__name", "quantity", "ingredient__measurement_unit"
+            )
+        )
+
+        def from_scratch():
+            TTFSearchPath.append(str(settings.BASE_DIR) + "/data/fonts/")
+            buffer = io.BytesIO()
+            p = canvas.Canvas(buffer, pagesize=A4)
+            p.drawImage(
+                str(settings.BASE_DIR / "fg_logo_for_shopping_list.png"),
+                30,
+                790,
+                width=20,
+                height=20,
+            )
+            pdfmetrics.registerFont(TTFont("DejaVuSans", "DejaVuSans.ttf"))
+            pdfmetrics.registerFont(
+                TTFont("DejaVuSansBold", "DejaVuSans-Bold.ttf")
+            )
+            p.setFont("DejaVuSans", 12)
+            p.drawRightString(550, 800, "Shopping list, Foodgram")
+            p.setFont("DejaVuSansBold", 10)
+            p.drawString(30, 750, "Item")
+            p.drawString(380, 750, "Qnty")
+            p.drawString(450, 750, "Units")
+            p.setFont("DejaVuSans", 12)
+            y = 730
+            for item, quantity, units in rows:
+                p.drawString(30, y, item)
+                p.drawString(380, y, str(quantity))
+                p.drawString(450, y, units)
+                y -= 15
+            p.showPage()
+            p.save()
+            return buffer.getvalue()
+
+        self.compare(
+            f"shopping list of {len(rows)} rows",
+            from_scratch,
+            lambda: shopping_list_pdf(rows).read(),
+            options["rounds"],
+        )
+        token, _ = Token.objects.get_or_create(user=self.author)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        url = "/api/recipes/download_shopping_cart/"
+
+        def download(**params):
+            for _ in client.get(url, params).streaming_content:
+                pass
+
+        def download_anew():
+            bump_flags("shopping_cart", self.author.id)
+            download()
+
+        with (
+            tempfile.TemporaryDirectory() as root,
+            override_settings(
+                SHOPPING_LISTS_ROOT=root, SHOPPING_LISTS_ACCEL_URL=""
+            ),
+        ):
+            self.compare(
+                "GET shopping list", download_anew, download, options["rounds"]
+            )
+            tracemalloc.start()
+            download_anew()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write(f"{'  peak memory':<44} {peak / 1024:>10.0f} KiB")
+        for fmt in ("txt", "csv", "json", "md"):
+            self.report(
+                f"GET shopping list .{fmt}",
+                self.timeit(
+                    lambda fmt=fmt: download(format=fmt),
+                    options["rounds"],
+                ),
+            )
@@ -0,0 +1,26 @@
+"""This file is used to rebuild the similar recipes, see `api.similar`. Run
+in your virtual env `python manage.py build_similar`, e.g. nightly from
+cron.
+
+The recipes written in between are re-scored as they are saved, so this
+mostly trims the lists those have grown & catches the admin edits.
+
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.similar import build_neighbors
+
+
+class Command(BaseCommand):
+    help = "Rebuild the similar recipes, off MinHash signatures & LSH."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = build_neighbors()
+        self.stdout.write(
+            f"{count} similar recipes stored in "
+            f"{time.perf_counter() - start:.1f} s.\n"
+        )
@@ -0,0 +1,50 @@
+"""This file is used to process the recipe images queued, see `recipes.jobs`.
+Run in your virtual env `python manage.py process_images` to drain the
+queue, or with `--forever` as the worker, as docker compose does.
+
+`--retry` queues the failed jobs again first, the jobs running for too long
+being requeued anyway, as by a worker gone. `--workers` decodes & encodes on
+a pool of processes, an image being CPU bound.
+
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from recipes.jobs import claim_jobs, requeue, run_jobs
+
+
+class Command(BaseCommand):
+    help = "Process the recipe images queued."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument("--retry", action="store_true")
+        parser.add_argument("--forever", action="store_true")
+        parser.add_argument("--sleep", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        requeued = requeue(failed=options["retry"])
+        if requeued:
+            self.stdout.write(f"{requeued} images requeued.\n")
+        executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        done = tried = 0
+        try:
+            while True:
+                jobs = claim_jobs(workers)
+                if jobs:
+                    tried += len(jobs)
+                    done += run_jobs(jobs, executor)
+                elif options["forever"]:
+                    time.sleep(options["sleep"])
+                    requeue()
+                else:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self.stdout.write(
+            f"{done} images processed, {tried - done} attempts failed.\n"
+        )
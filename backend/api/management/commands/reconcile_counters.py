@@ -0,0 +1,26 @@
+"""This file is used to reconcile the recipe popularity counters with the
+favourites & shopping carts they count. Run in your virtual env
+`python manage.py reconcile_counters`, e.g. nightly from cron.
+
+The counters are kept by the api views as the rows come & go, so this only
+catches the drift of the rows changed elsewhere, e.g. in the admin.
+
+"""
+
+from django.core.management.base import BaseCommand
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+from api.versions import bump_content
+
+
+class Command(BaseCommand):
+    help = "Reset the recipe popularity counters which have drifted."
+
+    def handle(self, *args, **options):
+        fixed = 0
+        for model in (Favorite, ShoppingCart):
+            count = Recipe.objects.reconcile_counters(model)
+            fixed += count
+            self.stdout.write(f"{model.counter_field}: {count} fixed.\n")
+        if fixed:
+            bump_content("popularity")
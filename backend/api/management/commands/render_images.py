@@ -0,0 +1,37 @@
+"""This file is used to make the recipe image renditions missing, see
+`recipes.renditions`. Run in your virtual env `python manage.py render_images`,
+e.g. after a deploy adding a width or a format.
+
+The images written through the api or the admin are rendered as they are
+saved, so this backfills the others. A rerun only makes what is missing.
+
+"""
+
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.renditions import is_rendered, update_renditions
+
+from api.cards import batch_invalidation
+
+
+class Command(BaseCommand):
+    help = "Make the missing renditions of the recipe images."
+
+    def handle(self, *args, **options):
+        rendered = failed = 0
+        recipes = (
+            # The others are left to process_images
+            Recipe.objects.filter(image_status="ready")
+            .exclude(image="")
+            .only("id", "image", "renditions")
+            .iterator(chunk_size=500)
+        )
+        with batch_invalidation():
+            for recipe in recipes:
+                if is_rendered(recipe):
+                    continue
+                if update_renditions(recipe):
+                    rendered += 1
+                else:
+                    failed += 1
+        self.stdout.write(f"{rendered} images rendered, {failed} failed.\n")
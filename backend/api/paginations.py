@@ -1,5 +1,283 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q, QuerySet
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Seek past the last seen row, with no COUNT(*) & no OFFSET scan.
+
+    The ordering must end on a unique column (e.g. the pk) for the keyset to
+    be total; a view may declare its own via the `cursor_ordering` attr, or a
+    `get_cursor_ordering()` for one that depends on the request.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_query_param = "page"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = None
+    ordering: tuple[str, ...] = ("-pk",)
+    invalid_cursor_message = _("Invalid cursor.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position = self.start(request, view)
+        return self.page(list(self.window(queryset, position)), position)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """As paginate_queryset(), for an async view."""
+        position = self.start(request, view)
+        window = self.window(queryset, position)
+        return self.page([obj async for obj in window], position)
+
+    def window(self, queryset, position):
+        """The page_size + 1 rows past the position, in seek order."""
+        ordering = self.directed(self.ordering)
+        queryset = self.past(queryset.order_by(*ordering), ordering, position)
+        return queryset[: self.page_size + 1]
+
+    def past(self, queryset, ordering, position):
+        """The rows past the position, a tampered one being not found."""
+        if position is None:
+            return queryset
+        try:
+            return queryset.filter(self.seek(ordering, position))
+        except (ValidationError, TypeError, ValueError):
+            # E.g. a date that won't parse, for a datetime column
+            raise NotFound(self.invalid_cursor_message)
+
+    def start(self, request, view):
+        """Read the page size & the cursor, returning its position."""
+        self.request = request
+        self.base_url = remove_query_param(
+            request.build_absolute_uri(), self.page_query_param
+        )
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.reverse, position = self.decode_cursor(request)
+        return position
+
+    def directed(self, ordering):
+        """The ordering to seek in, flipped for a previous page."""
+        if self.reverse:
+            return tuple(self.flip(field) for field in ordering)
+        return tuple(ordering)
+
+    def page(self, results, position):
+        """Cut the page off up to page_size + 1 results, in seek order."""
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first = results[0] if results else None
+        self.last = results[-1] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        if self.max_page_size:
+            return min(size, self.max_page_size)
+        return size
+
+    def get_ordering(self, view):
+        if hasattr(view, "get_cursor_ordering"):
+            return tuple(view.get_cursor_ordering())
+        return tuple(getattr(view, "cursor_ordering", self.ordering))
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(False, self.last)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(True, self.first)
+
+    def encode_cursor(self, reverse, obj):
+        position = [self.to_primitive(value) for value in self.position(obj)]
+        token = base64.urlsafe_b64encode(
+            json.dumps([int(reverse), *position]).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, token
+        )
+
+    def position(self, obj):
+        return [getattr(obj, field.lstrip("-")) for field in self.ordering]
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return False, None
+        try:
+            reverse, *position = json.loads(
+                base64.urlsafe_b64decode(token.encode())
+            )
+        except (binascii.Error, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            reverse not in (0, 1)
+            or len(position) != len(self.ordering)
+            or not all(
+                isinstance(value, (str, int, float)) for value in position
+            )
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def seek(ordering, position):
+        """(a, b) > (x, y) as `a > x OR (a = x AND b > y)`, per direction."""
+        branches = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            branch = {
+                prev.lstrip("-"): value
+                for prev, value in zip(ordering[:index], position)
+            }
+            branch[f"{name}__{lookup}"] = position[index]
+            branches.append(Q(**branch))
+        return reduce(or_, branches)
+
+    @staticmethod
+    def to_primitive(value):
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            return value.isoformat()
+        return value
+
+
+class MergedKeysetPagination(KeysetPagination):
+    """Keyset pages over a number of sources merged, e.g. for a feed.
+
+    The sources are (queryset, ordering) pairs, each ordering matching the
+    pagination's own column for column, & a page is of the tuples of their
+    values, with no duplicates. The ordering must go the one way on all the
+    columns, for the tuples to sort in it.
+    """
+
+    def paginate_queryset(self, sources, request, view=None):
+        position = self.start(request, view)
+        rows = set()
+        for queryset, ordering in sources:
+            ordering = self.directed(ordering)
+            queryset = self.past(
+                queryset.order_by(*ordering), ordering, position
+            )
+            rows.update(
+                queryset.values_list(
+                    *(field.lstrip("-") for field in ordering)
+                )[: self.page_size + 1]
+            )
+        descending = self.directed(self.ordering)[0].startswith("-")
+        return self.page(
+            sorted(rows, reverse=descending)[: self.page_size + 1], position
+        )
+
+    def get_ordering(self, view):
+        return self.ordering
+
+    def position(self, obj):
+        return obj
 
 
 class LimitPagination(PageNumberPagination):
+    """Page numbers by default; `?pagination=cursor` opts in a keyset."""
+
     page_size_query_param = "limit"
+    mode_query_param = "pagination"
+    cursor_class = KeysetPagination
+
+    keyset: KeysetPagination | None = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # A plain list, e.g. of ranked ids, pages by number
+        if isinstance(queryset, QuerySet) and self.wants_cursor(request):
+            self.keyset = self.cursor_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """As paginate_queryset(), for an async view: a queryset only."""
+        if self.wants_cursor(request):
+            self.keyset = self.cursor_class()
+            return await self.keyset.apaginate_queryset(
+                queryset, request, view
+            )
+        self.keyset = None
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # A cached_property, counted here rather than by the paginator
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return self.page.object_list
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def wants_cursor(self, request):
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == "cursor"
+            or self.cursor_class.cursor_query_param in params
+        )
@@ -0,0 +1,83 @@
+"""Rank the recipes by how much of them is in a user's pantry.
+
+The recipe x ingredient matrix is kept in memory as a scipy CSR matrix, one
+row per recipe & one column per ingredient id, so scoring the catalog for
+a pantry is a single sparse matrix-vector product: the ingredients at hand
+per recipe, over its row sizes, make the coverage.
+
+It's loaded & versioned as the other `api.ingredient_index` indexes. The
+recipes written since are kept aside & folded into a new matrix, built off
+the old one, on the next ranking, rather than reloaded from the db.
+"""
+
+import numpy as np
+from scipy import sparse
+
+from .ingredient_index import EMPTY, RecipeIndex
+
+
+def to_matrix(recipes: np.ndarray, ingredients: np.ndarray):
+    """Return the matrix, the recipe id per row & the row sizes."""
+    recipe_ids, rows = np.unique(recipes, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, ingredients)),
+        shape=(len(recipe_ids), int(ingredients.max(initial=0)) + 1),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, recipe_ids, np.diff(matrix.indptr)
+
+
+class PantryMatrix(RecipeIndex):
+    scope = "pantry"
+
+    def __init__(self):
+        super().__init__()
+        self.state = to_matrix(EMPTY, EMPTY)
+        self.changes: dict[int, frozenset[int]] = {}
+
+    def build(self, pairs):
+        self.state = to_matrix(pairs[:, 1], pairs[:, 0])
+        self.changes = {}
+
+    def change(self, recipe_id, ingredient_ids):
+        self.changes[recipe_id] = ingredient_ids
+
+    def fold(self):
+        with self.lock:
+            if not self.changes:
+                return
+            matrix, recipe_ids, _ = self.state
+            entries = matrix.tocoo()
+            recipes = recipe_ids[entries.row]
+            kept = ~np.isin(recipes, list(self.changes))
+            added = np.array(
+                [
+                    (recipe_id, ingredient_id)
+                    for recipe_id, ingredient_ids in self.changes.items()
+                    for ingredient_id in ingredient_ids
+                ],
+                dtype=np.int64,
+            ).reshape(-1, 2)
+            self.state = to_matrix(
+                np.concatenate((recipes[kept], added[:, 0])),
+                np.concatenate((entries.col[kept], added[:, 1])),
+            )
+            self.changes = {}
+
+    def rank(self, ingredient_ids) -> tuple[np.ndarray, np.ndarray]:
+        """Return the ids of the recipes with any of the ingredients, best
+        covered & then newest first, along with their coverage."""
+        self.load()
+        self.fold()
+        matrix, recipe_ids, sizes = self.state
+        pantry = np.zeros(matrix.shape[1], dtype=np.float32)
+        pantry[[pk for pk in ingredient_ids if pk < len(pantry)]] = 1
+        at_hand = matrix @ pantry
+        found = np.flatnonzero(at_hand)
+        coverage = at_hand[found] / sizes[found]
+        order = np.lexsort((-recipe_ids[found], -coverage))
+        return recipe_ids[found][order], coverage[order]
+
+
+pantry_matrix = PantryMatrix()
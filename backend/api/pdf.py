@@ -0,0 +1,111 @@
+"""The shopping list PDF, drawn with ReportLab.
+
+What is the same in every list is prepared once per process: the fonts are
+registered & the logo decoded on first use. The page header, the logo, the
+title & the column heads, is drawn into a form XObject, which every page
+refers to, so that a list only draws its own rows.
+
+A list runs over as many pages as its rows take, ROWS_PER_PAGE each, taking
+them off an iterable as it goes, e.g. a queryset's iterator(). The PDF is
+written to a file spooled to disk past PDF_SPOOL_MAX_SIZE, for a response to
+stream, rather than kept whole in memory.
+"""
+
+import functools
+import tempfile
+from collections.abc import Iterable
+from itertools import islice
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from backend.constants import PDF_SPOOL_MAX_SIZE
+
+FONTS_DIR = settings.BASE_DIR / "data" / "fonts"
+FONT = "DejaVuSans"
+BOLD_FONT = "DejaVuSansBold"
+LOGO = settings.BASE_DIR / "fg_logo_for_shopping_list.png"
+HEADER_FORM = "header"
+
+X_ITEM, X_QUANTITY, X_UNITS = 30, 380, 450
+Y_FIRST_ROW, ROW_HEIGHT = 730, 15
+Y_LAST_ROW, Y_FOOTER = 50, 25
+ROWS_PER_PAGE = (Y_FIRST_ROW - Y_LAST_ROW) // ROW_HEIGHT + 1
+
+
+def font_path(filename: str) -> str:
+    """The font shipped along, else the name for ReportLab to look up."""
+    path = FONTS_DIR / filename
+    return str(path) if path.exists() else filename
+
+
+@functools.cache
+def register_fonts() -> None:
+    pdfmetrics.registerFont(TTFont(FONT, font_path("DejaVuSans.ttf")))
+    pdfmetrics.registerFont(
+        TTFont(BOLD_FONT, font_path("DejaVuSans-Bold.ttf"))
+    )
+
+
+@functools.cache
+def logo() -> ImageReader:
+    return ImageReader(str(LOGO))
+
+
+def draw_header(pdf: canvas.Canvas) -> None:
+    """Define the page header form, the logo, the title & column heads."""
+    pdf.beginForm(HEADER_FORM)
+    pdf.drawImage(logo(), 30, 790, width=20, height=20)
+    pdf.setFont(FONT, 12)
+    pdf.drawRightString(550, 800, "Shopping list, Foodgram")
+    pdf.setFont(BOLD_FONT, 10)
+    pdf.drawString(X_ITEM, 750, "Item")
+    pdf.drawString(X_QUANTITY, 750, "Qnty")
+    pdf.drawString(X_UNITS, 750, "Units")
+    pdf.endForm()
+
+
+def draw_rows(pdf: canvas.Canvas, rows: Iterable[tuple[str, int, str]]):
+    text = pdf.beginText()
+    text.setFont(FONT, 12)
+    for n, (item, quantity, units) in enumerate(rows):
+        y = Y_FIRST_ROW - n * ROW_HEIGHT
+        for x, value in (
+            (X_ITEM, item),
+            (X_QUANTITY, str(quantity)),
+            (X_UNITS, units),
+        ):
+            text.setTextOrigin(x, y)
+            text.textOut(value)
+    pdf.drawText(text)
+
+
+def shopping_list_pdf(rows: Iterable[tuple[str, int, str]], file=None):
+    """Draw the (item, quantity, units) rows, ROWS_PER_PAGE a page, each
+    under the header, into the file given, else a spooled one. Return the
+    file, read from its start."""
+    register_fonts()
+    if file is None:
+        file = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    pdf = canvas.Canvas(file, pagesize=A4, pageCompression=1)
+    draw_header(pdf)
+    rows = iter(rows)
+    page = list(islice(rows, ROWS_PER_PAGE))
+    number = 1
+    while True:
+        pdf.doForm(HEADER_FORM)
+        draw_rows(pdf, page)
+        pdf.setFont(FONT, 9)
+        pdf.drawRightString(550, Y_FOOTER, str(number))
+        pdf.showPage()
+        page = list(islice(rows, ROWS_PER_PAGE))
+        if not page:
+            break
+        number += 1
+    pdf.save()
+    file.seek(0)
+    return file
@@ -0,0 +1,161 @@
+"""SQL query budgets per view, with an N+1 detector.
+
+A viewset declares `query_budget`, either an int or a dict of action names
+to ints; a function view gets one with the `@query_budget(n)` decorator.
+`QueryBudgetMiddleware` counts the queries a request runs, along with their
+shapes, i.e. the SQL with its literals & IN lists folded, and logs or raises
+when the budget is exceeded or a shape repeats more than MAX_REPEATS times,
+naming the serializer field the queries came from.
+
+Set `QUERY_BUDGET["MODE"]` to "off", "log" or "raise"; in tests use
+`assert_max_queries()` instead.
+"""
+
+import logging
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.fields import Field
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "log", "raise")
+SHAPE_SUBS = (
+    (re.compile(r"\bIN \((?:[^()]|\([^()]*\))*\)", re.I), "IN (...)"),
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+\b"), "?"),
+    (re.compile(r"%s"), "?"),
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(budget):
+    """Declare a query budget for a function view."""
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+
+    return decorator
+
+
+def get_budget(view_func, method):
+    """Find the budget a view declares for a request method, if any."""
+    budget = getattr(view_func, "query_budget", None)
+    view_class = getattr(view_func, "cls", None)
+    if budget is None and view_class is not None:
+        budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        action = (getattr(view_func, "actions", None) or {}).get(method)
+        return budget.get(action)
+    return budget
+
+
+def get_shape(sql):
+    for pattern, repl in SHAPE_SUBS:
+        sql = pattern.sub(repl, sql)
+    return sql
+
+
+def get_origin():
+    """Name the serializer field, else the project code, behind a query."""
+    frame = sys._getframe(2)
+    origin = None
+    while frame is not None:
+        obj = frame.f_locals.get("self")
+        if isinstance(obj, Field):
+            if frame.f_code.co_name.startswith("get_"):
+                return f"{type(obj).__name__}.{frame.f_code.co_name}"
+            if obj.parent is not None and obj.field_name:
+                return f"{type(obj.parent).__name__}.{obj.field_name}"
+        if origin is None and frame.f_code.co_filename.startswith(
+            str(settings.BASE_DIR)
+        ):
+            path = frame.f_code.co_filename[len(str(settings.BASE_DIR)) + 1 :]
+            if path != "api/querybudget.py":
+                origin = f"{path}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return origin or "unknown"
+
+
+@dataclass
+class QueryLog:
+    """Record the shape & origin of each query, as an execute wrapper."""
+
+    queries: list[tuple[str, str]] = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((get_shape(sql), get_origin()))
+        return execute(sql, params, many, context)
+
+    def problems(self, budget=None, max_repeats=None):
+        found = []
+        if budget is not None and len(self.queries) > budget:
+            found.append(
+                f"ran {len(self.queries)} queries, over its budget of {budget}"
+            )
+        if max_repeats is not None:
+            repeats = Counter(self.queries)
+            for (shape, origin), times in repeats.most_common():
+                if times <= max_repeats:
+                    break
+                found.append(f"ran {shape!r} {times} times from {origin}")
+        return found
+
+
+def get_config():
+    config = {"MODE": "off", "MAX_REPEATS": 10}
+    config.update(getattr(settings, "QUERY_BUDGET", {}))
+    return config
+
+
+@contextmanager
+def assert_max_queries(budget=None, max_repeats=None):
+    """Fail a test over the query budget or on an N+1 repeat."""
+    log = QueryLog()
+    with connection.execute_wrapper(log):
+        yield log
+    if max_repeats is None:
+        max_repeats = get_config()["MAX_REPEATS"]
+    problems = log.problems(budget, max_repeats)
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems))
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if get_config()["MODE"] == "off":
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.query_budget = None
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            response = self.get_response(request)
+        self.check(request, log)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_budget(view_func, request.method.lower())
+
+    def check(self, request, log):
+        if request.query_budget is None:
+            return
+        config = get_config()
+        problems = log.problems(request.query_budget, config["MAX_REPEATS"])
+        if not problems:
+            return
+        message = f"{request.method} {request.path} " + "; ".join(problems)
+        if config["MODE"] == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
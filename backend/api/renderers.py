@@ -0,0 +1,67 @@
+"""A JSON renderer & parser pair on orjson, for `settings.API_FAST_JSON`.
+
+They give the same JSON as DRF's stdlib ones: orjson does the dicts, lists,
+strs, numbers & datetimes natively, incl. the ReturnDict/ReturnList, &
+hands the rest, e.g. lazy translations & Decimals, to DRF's own encoder.
+They fall back on DRF's where orjson can't do the same, e.g. an indent of
+4 in the browsable API, or when orjson is not installed at all.
+
+But for a NaN or an infinity: orjson writes it as null, where DRF raises, or
+writes it as is with STRICT_JSON off. The api renders no floats of the sort,
+its numbers being ids, amounts & counts, so this is left as is rather than
+looked for in every response.
+"""
+
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional, the stdlib json does without
+    orjson = None
+
+LINE_SEPARATORS = (
+    (b"\xe2\x80\xa8", b"\\u2028"),
+    (b"\xe2\x80\xa9", b"\\u2029"),
+)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    default = staticmethod(JSONEncoder().default)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or data is None
+            or indent not in (None, 2)
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            ret = orjson.dumps(data, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            # E.g. an int over 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # As DRF does, for the JSON to be valid JavaScript as well
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
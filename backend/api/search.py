@@ -0,0 +1,98 @@
+"""Full-text recipe search over the name & text.
+
+Backed by the index the `recipes` 0018 migration maintains for the vendor:
+a generated, GIN-indexed tsvector on Postgres, stemmed both in Russian &
+English as per `settings.LANGUAGES`, or an FTS5 table on the SQLite dev db.
+The porter tokenizer there stems English only, so Russian words are cut
+down to a rough stem here & matched by prefix. Any other backend falls back
+to icontains.
+
+`search_recipes()` annotates a `search_rank`, the higher the better; on
+SQLite it's the FTS5 bm25() rank, names weighing 10 times the texts.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from recipes.models import Recipe, RecipeSearchEntry
+
+WORDS = re.compile(r"\w+")
+CYRILLIC = re.compile(r"[а-яё]", re.I)
+RUSSIAN_ENDINGS = (
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ом", "ем",
+    "ам", "ям", "ах", "ях", "ов", "ев", "ию", "ия",
+    "а", "я", "ы", "и", "о", "е", "у", "ю", "ь", "й",
+)  # fmt: skip
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    if CYRILLIC.search(word):
+        for ending in RUSSIAN_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                return word[: -len(ending)]
+    return word
+
+
+def fts5_query(terms: str) -> str:
+    """AND the prefixes of the words, quoted so as not to read as syntax."""
+    return " ".join(
+        '"{}"*'.format(stem(word.lower()).replace('"', '""'))
+        for word in WORDS.findall(terms)
+    )
+
+
+def search_postgres(queryset, terms):
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        SearchVectorExact,
+        SearchVectorField,
+    )
+
+    vector = RawSQL(
+        f'"{Recipe._meta.db_table}"."search_vector"',
+        (),
+        output_field=SearchVectorField(),
+    )
+    query = SearchQuery(
+        terms, config="russian", search_type="websearch"
+    ) | SearchQuery(terms, config="english", search_type="websearch")
+    return queryset.filter(SearchVectorExact(vector, query)).annotate(
+        search_rank=SearchRank(vector, query)
+    )
+
+
+def search_sqlite(queryset, terms):
+    table = RecipeSearchEntry._meta.db_table
+    # Joined rather than ranked in a subquery, which would MATCH per row
+    return queryset.filter(
+        RawSQL(
+            f'"{table}" MATCH %s',
+            (fts5_query(terms),),
+            output_field=BooleanField(),
+        ),
+        search_entry__isnull=False,
+    ).annotate(search_rank=-F("search_entry__rank"))
+
+
+def search_fallback(queryset, terms):
+    condition = Q()
+    for word in WORDS.findall(terms):
+        condition &= Q(name__icontains=word) | Q(text__icontains=word)
+    return queryset.filter(condition).annotate(
+        search_rank=RawSQL("0", (), output_field=FloatField())
+    )
+
+
+def search_recipes(queryset, terms: str):
+    if not WORDS.search(terms):
+        return queryset.none()
+    search = {
+        "postgresql": search_postgres,
+        "sqlite": search_sqlite,
+    }.get(connection.vendor, search_fallback)
+    return search(queryset, terms).order_by("-search_rank", "-pub_date", "-id")
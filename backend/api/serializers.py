@@ -1,3 +1,4 @@
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
@@ -9,10 +10,33 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.jobs import enqueue_image
+from recipes.renditions import absolute_srcset, image_srcset
 from rest_framework import serializers, status
 from users.models import Subscription, User
 
-from backend.constants import MAX_INGREDIENT_AMOUNT, MIN_INGREDIENT_AMOUNT
+from backend.constants import (
+    MAX_BATCH_RECIPES,
+    MAX_INGREDIENT_AMOUNT,
+    MAX_PANTRY_INGREDIENTS,
+    MIN_INGREDIENT_AMOUNT,
+)
+
+from .cards import CONTEXT_KEY as CARDS_CONTEXT_KEY
+from .cards import (
+    batch_invalidation,
+    load_cards,
+    overlay_card,
+    rebuild_cards,
+)
+from .fastpath import FastListSerializer
+from .feed import fan_out
+from .fieldsets import CONTEXT_KEY as FIELDSET_CONTEXT_KEY
+from .fieldsets import SparseFieldsetMixin
+from .flags import get_recipe_flags
+from .ingredient_index import indexed_write, update_indexes
+from .similar import refresh_neighbors
+from .uploads import UploadedImageField
 
 
 class UsersSerializer(UserSerializer):
@@ -30,25 +54,21 @@ class UsersSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        request = self.context.get("request")
-        if request is None or request.user.is_anonymous:
-            return False
-        return (
-            request.user.is_authenticated
-            and request.user.is_subscriber.all().exists()
-        )
+        return get_recipe_flags(self.context).is_subscribed(obj.id)
 
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = "__all__"
+        list_serializer_class = FastListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = "__all__"
+        list_serializer_class = FastListSerializer
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -84,6 +104,69 @@ class AbridgedRecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = ("id", "name", "image", "cooking_time")
         read_only_fields = fields
+        list_serializer_class = FastListSerializer
+
+
+class PantrySerializer(serializers.Serializer):
+    """Take the ids of the ingredients a user has at hand."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_PANTRY_INGREDIENTS,
+    )
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """Take the comma-separated ids of the recipes to read at once."""
+
+    ids = serializers.CharField()
+
+    def validate_ids(self, value):
+        try:
+            ids = [int(pk) for pk in value.split(",") if pk.strip()]
+        except ValueError:
+            raise serializers.ValidationError(_("Expected recipe ids."))
+        # Once each, in the order asked
+        ids = list(dict.fromkeys(ids))
+        if not ids or not all(
+            0 < pk <= models.BigIntegerField.MAX_BIGINT for pk in ids
+        ):
+            raise serializers.ValidationError(_("Expected recipe ids."))
+        if len(ids) > MAX_BATCH_RECIPES:
+            raise serializers.ValidationError(
+                _("No more than {} recipes at once.").format(MAX_BATCH_RECIPES)
+            )
+        return ids
+
+
+class PantryRecipeSerializer(AbridgedRecipeSerializer):
+    """Read a recipe matched to a pantry, with what it still lacks."""
+
+    coverage = serializers.SerializerMethodField()
+    missing = serializers.SerializerMethodField()
+
+    class Meta(AbridgedRecipeSerializer.Meta):
+        fields = (  # type: ignore[assignment]
+            *AbridgedRecipeSerializer.Meta.fields,
+            "coverage",
+            "missing",
+        )
+        read_only_fields = fields
+
+    def get_coverage(self, obj):
+        return round(self.context["coverage"][obj.id], 4)
+
+    def get_missing(self, obj):
+        pantry = self.context["pantry"]
+        return IngredientSerializer(
+            [
+                item.ingredient
+                for item in obj.recipe_ingredient.all()
+                if item.ingredient_id not in pantry
+            ],
+            many=True,
+        ).data
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -93,11 +176,12 @@ class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     image = Base64ImageField(required=True)
     # image = Base64ImageField(required=True, allow_null=False)
+    image_srcset = serializers.SerializerMethodField()
     ingredients = RecipeIngredientSerializer(
         read_only=True, many=True, source="recipe_ingredient"
     )
-    is_favorited = serializers.BooleanField(default=False)
-    is_in_shopping_cart = serializers.BooleanField(default=False)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -110,17 +194,68 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_srcset",
+            "image_status",
             "text",
             "cooking_time",
         )
+        list_serializer_class = FastListSerializer
 
-    def get_is_in_shopping_cart(self, obj):
+    def get_image_srcset(self, obj):
         request = self.context.get("request")
-        if request is None or request.user.is_anonymous:
-            return False
-        return ShoppingCart.objects.filter(
-            recipe=obj, user=self.request.user
-        ).exists()
+        if request is None:
+            return image_srcset(obj)
+        return absolute_srcset(image_srcset(obj), request.build_absolute_uri)
+
+    def get_is_favorited(self, obj):
+        return get_recipe_flags(self.context).is_favorited(obj.id)
+
+    def get_is_in_shopping_cart(self, obj):
+        return get_recipe_flags(self.context).is_in_shopping_cart(obj.id)
+
+
+class RecipeCardListSerializer(serializers.ListSerializer):
+    """Load the cards of a whole page at once, bar those loaded already."""
+
+    def to_representation(self, data):
+        recipes = list(data)
+        if self.child.uses_cards:
+            cards = self.context.setdefault(CARDS_CONTEXT_KEY, {})
+            cards.update(
+                load_cards(
+                    [recipe for recipe in recipes if recipe.id not in cards]
+                )
+            )
+        return [self.child.to_representation(recipe) for recipe in recipes]
+
+
+class RecipeCardSerializer(SparseFieldsetMixin, RecipeSerializer):
+    """Read a recipe off its card, see `api.cards`.
+
+    A fieldset with none of the related fields in it is read off the recipe
+    columns instead, with no card needed.
+    """
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = RecipeCardListSerializer
+
+    # Only the cards have these, with no queries to make
+    card_fields = frozenset(("author", "tags", "ingredients"))
+
+    @property
+    def uses_cards(self):
+        return not self.card_fields.isdisjoint(self.fields)
+
+    def to_representation(self, instance):
+        if not self.uses_cards:
+            return super().to_representation(instance)
+        cards = self.context.setdefault(CARDS_CONTEXT_KEY, {})
+        if instance.id not in cards:
+            cards.update(load_cards((instance,)))
+        data = overlay_card(cards[instance.id], self.context)
+        if self.context.get(FIELDSET_CONTEXT_KEY) is None:
+            return data
+        return {name: data[name] for name in self.fields}
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -130,7 +265,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     tags = serializers.PrimaryKeyRelatedField(
         many=True, required=True, queryset=Tag.objects.all()
     )
-    image = Base64ImageField(required=True)
+    image = UploadedImageField(required=True)
 
     class Meta:
         model = Recipe
@@ -153,26 +288,52 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             for ingredient in ingredients
         ]
         RecipeIngredient.objects.bulk_create(ingredients)
+        update_indexes(
+            recipe.id, [ingredient.ingredient_id for ingredient in ingredients]
+        )
 
     def create(self, validated_data):
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
-        recipe = Recipe.objects.create(
-            **validated_data, author=self.context.get("request").user
-        )
-        self.do_ingredients(recipe, ingredients)
-        recipe.tags.set(tags)
+        # The image saved & referred to at once, see recipes.storage
+        with transaction.atomic(), batch_invalidation():
+            recipe = Recipe.objects.create(
+                **validated_data, author=self.context.get("request").user
+            )
+            self.do_ingredients(recipe, ingredients)
+            recipe.tags.set(tags)
+            enqueue_image(recipe)
+        self.rebuild_card(recipe)
+        refresh_neighbors(recipe.id)
+        fan_out(recipe)
         return recipe
 
     def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        self.do_ingredients(instance, validated_data.pop("ingredients"))
-        instance.tags.clear()
-        instance.tags.set(validated_data.pop("tags"))
-        return super().update(instance, validated_data)
+        image = validated_data.pop("image", None)
+        with transaction.atomic(), batch_invalidation(), indexed_write():
+            instance.ingredients.clear()
+            self.do_ingredients(instance, validated_data.pop("ingredients"))
+            instance.tags.clear()
+            instance.tags.set(validated_data.pop("tags"))
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            # The image is written by recipes.jobs only, which may have
+            # swapped it in since the recipe was read
+            instance.save(update_fields=tuple(validated_data))
+            if image is not None:
+                instance.image = image
+                enqueue_image(instance)
+        self.rebuild_card(instance)
+        refresh_neighbors(instance.id)
+        return instance
+
+    def rebuild_card(self, recipe):
+        self.context.setdefault(CARDS_CONTEXT_KEY, {}).update(
+            rebuild_cards((recipe.id,))
+        )
 
     def to_representation(self, instance):
-        return RecipeSerializer(instance, context=self.context).data
+        return RecipeCardSerializer(instance, context=self.context).data
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -213,7 +374,7 @@ class SubscriptionSerializer(UsersSerializer):
     """Read a subscription."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source="recipes.count")
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UsersSerializer.Meta):
         fields = (  # type: ignore[assignment]
@@ -228,7 +389,12 @@ class SubscriptionSerializer(UsersSerializer):
         )
 
     def get_recipes(self, obj):
+        """Prefer the recipes prefetched by the view, limit applied."""
         request = self.context.get("request")
+        if hasattr(obj, "page_recipes"):
+            return AbridgedRecipeSerializer(
+                obj.page_recipes, many=True, context={"request": request}
+            ).data
         recipes_limit = request.query_params.get("recipes_limit")
         recipes = obj.recipes.all()
         if recipes_limit and recipes_limit.isdigit():
@@ -238,13 +404,6 @@ class SubscriptionSerializer(UsersSerializer):
         )
         return serializer.data
 
-    def get_is_subscribed(self, obj):
-        user = self.context.get("request").user
-        return (
-            user.is_authenticated
-            and user.is_subscriber.all().filter(author=obj.pk).exists()
-        )
-
 
 class SubscriptionWriteSerializer(serializers.ModelSerializer):
     """Add a subscription."""
@@ -0,0 +1,190 @@
+"""The shopping list documents, rendered once per cart version.
+
+A cart's version is made of the versions in the cache its list depends on:
+the user's cart, see `api.flags`, the content versions of the recipes in it
+& of the ingredients, see `api.versions`, all bumped by the signals in
+`api.signals`. The cart's recipe ids come off the cached flags, so telling
+whether the list has changed takes no query at all.
+
+A list is rendered, the totals aggregated off a cursor, to a file under
+settings.SHOPPING_LISTS_ROOT named after the user & the cart version. A
+repeat download is that file, sent by nginx when
+settings.SHOPPING_LISTS_ACCEL_URL is set, else by the backend. The user's
+previous lists are deleted as a new one is rendered, but for those sent in
+the last PREVIOUS_LIST_GRACE seconds, which a concurrent download may still
+be sending.
+
+The list is also given as text, CSV, JSON or Markdown, as negotiated by the
+renderers below, on `?format=` or the Accept header. These are cheap to
+make, so they are not stored: their lines are streamed off the cursor as
+the rows come.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+from recipes.models import RecipeIngredient
+from rest_framework import renderers
+
+from .flags import UserRecipeFlags, version_key
+from .pdf import ROWS_PER_PAGE, shopping_list_pdf
+from .versions import content_key, get_versions
+
+# In seconds, see above
+PREVIOUS_LIST_GRACE = 60
+
+
+def cart_version(user) -> str:
+    recipe_ids = sorted(UserRecipeFlags(user).shopping_cart)
+    versions = get_versions(
+        [
+            version_key("shopping_cart", user.id),
+            content_key("ingredients"),
+            *(content_key(f"recipe:{pk}") for pk in recipe_ids),
+        ]
+    )
+    fingerprint = "|".join(map(str, (*recipe_ids, *versions)))
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def shopping_totals(user):
+    """The (item, quantity, units) rows of a user's cart, by item."""
+    return (
+        RecipeIngredient.objects.filter(recipe__shoppingcart__user=user)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(quantity=Sum("amount"))
+        .order_by("ingredient__name", "ingredient__measurement_unit")
+        .values_list(
+            "ingredient__name", "quantity", "ingredient__measurement_unit"
+        )
+    )
+
+
+def shopping_list(user) -> Path:
+    """The user's shopping list PDF, rendered unless it is already."""
+    root = Path(settings.SHOPPING_LISTS_ROOT)
+    path = root / f"{user.id}-{cart_version(user)}.pdf"
+    try:
+        # Marked as sent, for a newer list to keep it for a while
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    root.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=root, prefix=".", suffix=".pdf", delete=False
+    ) as file:
+        try:
+            shopping_list_pdf(
+                shopping_totals(user).iterator(chunk_size=ROWS_PER_PAGE), file
+            )
+        except BaseException:
+            os.unlink(file.name)
+            raise
+    os.replace(file.name, path)
+    sent_before = time.time() - PREVIOUS_LIST_GRACE
+    for previous in root.glob(f"{user.id}-*.pdf"):
+        try:
+            if previous != path and previous.stat().st_mtime < sent_before:
+                previous.unlink()
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def open_shopping_list(user) -> io.BufferedReader:
+    """The user's shopping list PDF, opened, rendered again if deleted in
+    between by a newer one, past its grace."""
+    try:
+        return shopping_list(user).open("rb")
+    except FileNotFoundError:
+        return shopping_list(user).open("rb")
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """A format of the shopping list, for the view to negotiate. The list is
+    streamed by the view itself, rather than rendered as a Response."""
+
+    charset = "utf-8"
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+
+
+class LinesRenderer(ShoppingListRenderer, ABC):
+    """A text format, streamed by the view line by line."""
+
+    @abstractmethod
+    def lines(self, rows: Iterable[tuple[str, int, str]]) -> Iterator[str]:
+        """The lines of the (item, quantity, units) rows, as they come."""
+
+
+class TextRenderer(LinesRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def lines(self, rows):
+        for item, quantity, units in rows:
+            yield f"{item}: {quantity} {units}\n"
+
+
+class CSVRenderer(LinesRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def lines(self, rows):
+        line = io.StringIO()
+        writer = csv.writer(line)
+        for row in (("item", "quantity", "units"), *rows):
+            writer.writerow(row)
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+
+
+class JSONRenderer(LinesRenderer):
+    media_type = "application/json"
+    format = "json"
+
+    def lines(self, rows):
+        separator = "["
+        for item, quantity, units in rows:
+            yield separator + json.dumps(
+                {"name": item, "amount": quantity, "measurement_unit": units},
+                ensure_ascii=False,
+            )
+            separator = ",\n"
+        yield "[]\n" if separator == "[" else "]\n"
+
+
+class MarkdownRenderer(LinesRenderer):
+    media_type = "text/markdown"
+    format = "md"
+
+    def lines(self, rows):
+        yield "# Shopping list, Foodgram\n\n"
+        for item, quantity, units in rows:
+            yield f"- [ ] {item}, {quantity} {units}\n"
+
+
+# The first is the default, e.g. on Accept: */*
+SHOPPING_LIST_RENDERERS = (
+    PDFRenderer,
+    TextRenderer,
+    CSVRenderer,
+    JSONRenderer,
+    MarkdownRenderer,
+)
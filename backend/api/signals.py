@@ -0,0 +1,149 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from recipes.models import (
+    Favorite,
+    ImageJob,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Tag,
+)
+from recipes.renditions import release_image
+from users.models import Subscription
+
+from .cards import invalidate_cards
+from .feed import unfollow
+from .flags import bump_flags
+from .ingredient_index import invalidate_indexes, update_indexes
+from .versions import bump_content
+
+User = get_user_model()
+
+# Only these author fields end up on a recipe card
+CARD_AUTHOR_FIELDS = frozenset(
+    ("email", "username", "first_name", "last_name")
+)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(sender, instance, **kwargs):
+    bump_flags("favorite", instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    bump_flags("shopping_cart", instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def subscription_changed(sender, instance, **kwargs):
+    bump_flags("subscription", instance.user_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    # However it goes, e.g. in the admin or along with an author
+    unfollow(instance.user_id, instance.author_id)
+
+
+def recipes_changed(*recipe_ids):
+    bump_content("recipes", *(f"recipe:{pk}" for pk in recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_cards((instance.id,))
+    recipes_changed(instance.id)
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_replaced(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (
+        update_fields is not None and "image" not in update_fields
+    ):
+        return
+    old = (
+        Recipe.objects.filter(pk=instance.pk)
+        .values("image", "renditions")
+        .first()
+    )
+    if old is not None and old["image"] != instance.image.name:
+        transaction.on_commit(
+            partial(release_image, old["image"], old["renditions"])
+        )
+
+
+@receiver(post_delete, sender=ImageJob)
+def image_job_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(release_image, instance.source, {}))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    recipes_changed(instance.id)
+    update_indexes(instance.id, ())
+    transaction.on_commit(
+        partial(release_image, instance.image.name, instance.renditions)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_cards((instance.id,))
+            recipes_changed(instance.id)
+    elif action in ("post_add", "post_remove"):
+        invalidate_cards(pk_set)
+        recipes_changed(*pk_set)
+    elif action == "pre_clear":
+        invalidate_cards(Recipe.objects.filter(tags=instance))
+        bump_content("recipes", "tags")
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, origin=None, **kwargs):
+    invalidate_cards((instance.recipe_id,))
+    recipes_changed(instance.recipe_id)
+    # The index outlives deleted recipes, but not edits made elsewhere
+    if (
+        not isinstance(origin, Recipe)
+        and getattr(origin, "model", None) is not Recipe
+    ):
+        invalidate_indexes()
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    invalidate_cards(Recipe.objects.filter(tags=instance))
+    bump_content("tags")
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    if not kwargs.get("created", True):
+        invalidate_cards(Recipe.objects.filter(ingredients=instance))
+    bump_content("ingredients")
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (
+        update_fields is not None
+        and CARD_AUTHOR_FIELDS.isdisjoint(update_fields)
+    ):
+        return
+    invalidate_cards(Recipe.objects.filter(author=instance))
+    bump_content("authors")
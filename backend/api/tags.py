@@ -0,0 +1,26 @@
+"""A per-process registry of the tag slugs & their ids.
+
+Tags are few & hardly ever change, so the whole table is loaded once &
+reloaded only when the "tags" content version moves, i.e. on a Tag save or
+delete, see `api.signals`. Checking the version is a cache read, so the
+filter no longer queries for its choices on each request.
+"""
+
+from recipes.models import Tag
+
+from .versions import content_key, get_version
+
+_registry: tuple[int, dict[str, int]] | None = None
+
+
+def get_tag_ids() -> dict[str, int]:
+    """Return the {slug: id} of all the tags."""
+    global _registry
+    version = get_version(content_key("tags"))
+    if _registry is None or _registry[0] != version:
+        _registry = (version, dict(Tag.objects.values_list("slug", "id")))
+    return _registry[1]
+
+
+def tag_choices() -> list[tuple[str, str]]:
+    return [(slug, slug) for slug in get_tag_ids()]
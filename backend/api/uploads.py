@@ -0,0 +1,102 @@
+"""The recipe images uploaded as multipart/form-data files, streamed.
+
+A base64 image comes in a JSON body which is read whole, then decoded in
+memory & opened with Pillow before its size is ever checked. A multipart
+upload is instead refused by its Content-Length, or as soon as its files go
+past MAX_IMG_SIZE, is streamed to a temporary file meanwhile, & only has its
+image header read: the pixels are left to `recipes.jobs` to decode.
+"""
+
+import uuid
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.text import format_lazy
+from django.utils.translation import gettext_lazy as _
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers, status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+
+from backend.constants import MAX_IMG_SIZE, MAX_UPLOAD_FORM_SIZE
+
+MAX_IMG_BYTES = MAX_IMG_SIZE * 1024 * 1024
+TOO_LARGE_MESSAGE = format_lazy(
+    _("The image must be <={}Mb in size."), MAX_IMG_SIZE
+)
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = TOO_LARGE_MESSAGE
+    default_code = "payload_too_large"
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Stream the files to disk, refusing more than max_bytes of them."""
+
+    def __init__(self, request=None, max_bytes=MAX_IMG_BYTES):
+        super().__init__(request)
+        self.max_bytes = max_bytes
+        self.received = 0
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > self.max_bytes + MAX_UPLOAD_FORM_SIZE:
+            raise PayloadTooLarge
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.file.close()
+            raise PayloadTooLarge
+        return super().receive_data_chunk(raw_data, start)
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    """Parse multipart/form-data, the files limited & streamed to disk."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        request.upload_handlers = [LimitedUploadHandler(request)]
+        return super().parse(stream, media_type, parser_context)
+
+
+class UploadedImageField(Base64ImageField):
+    """Take an image as base64, as ever, or as a file upload, the latter
+    checked by its header alone."""
+
+    EXTENSIONS = {"jpeg": "jpg"}
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return self.check_upload(data)
+        # Refused before it is decoded, a base64 char being 3/4 of a byte
+        if isinstance(data, str) and (
+            len(data.partition(";base64,")[2] or data) * 3 // 4 > MAX_IMG_BYTES
+        ):
+            raise serializers.ValidationError(TOO_LARGE_MESSAGE)
+        return super().to_internal_value(data)
+
+    def check_upload(self, upload):
+        if upload.size > MAX_IMG_BYTES:
+            raise serializers.ValidationError(TOO_LARGE_MESSAGE)
+        try:
+            with Image.open(upload) as image:
+                fmt, (width, height) = image.format, image.size
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = fmt.lower()
+        if (
+            extension not in self.ALLOWED_TYPES
+            or width * height > Image.MAX_IMAGE_PIXELS
+        ):
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        upload.seek(0)
+        upload.name = (
+            f"{uuid.uuid4()}.{self.EXTENSIONS.get(extension, extension)}"
+        )
+        upload.content_type = Image.MIME[fmt]
+        return upload
@@ -1,6 +1,13 @@
 from django.urls import include, re_path
 from rest_framework import routers
 
+from api.async_views import (
+    AsyncIngredientList,
+    AsyncRecipeDetail,
+    AsyncRecipeList,
+    AsyncSubscriptionList,
+    AsyncTagList,
+)
 from api.views import (
     IngredientViewSet,
     RecipeViewSet,
@@ -19,7 +26,29 @@ router_v1.register(r"recipes", RecipeViewSet, basename="recipes")
 router_v1.register(r"users", UsersViewSet, basename="users")
 
 
+# The hot read views, for an ASGI server, see api.async_views
+async_urlpatterns = [
+    re_path(r"^recipes/$", AsyncRecipeList.as_view(), name="recipes-list"),
+    re_path(
+        r"^recipes/(?P<pk>\d+)/$",
+        AsyncRecipeDetail.as_view(),
+        name="recipes-detail",
+    ),
+    re_path(r"^tags/$", AsyncTagList.as_view(), name="tags-list"),
+    re_path(
+        r"^ingredients/$",
+        AsyncIngredientList.as_view(),
+        name="ingredients-list",
+    ),
+    re_path(
+        r"^users/subscriptions/$",
+        AsyncSubscriptionList.as_view(),
+        name="users-subscriptions",
+    ),
+]
+
 urlpatterns = [
+    re_path(r"^async/", include((async_urlpatterns, "async"))),
     re_path(r"auth/", include("djoser.urls")),
     re_path(r"auth/", include("djoser.urls.authtoken")),
     re_path(
@@ -0,0 +1,52 @@
+"""Version counters kept in the cache, to key cached data & ETags on.
+
+A version is the time of the last change in ns, so that it doubles as a
+Last-Modified, & an evicted counter never comes back as a version some
+stale entry was already stored under.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def get_versions(keys: list[str]) -> list[int]:
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            version = time.time_ns()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+            found[key] = version
+    return [found[key] for key in keys]
+
+
+def get_version(key: str) -> int:
+    return get_versions([key])[0]
+
+
+async def aget_versions(keys: list[str]) -> list[int]:
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            version = time.time_ns()
+            if not await cache.aadd(key, version, timeout=None):
+                version = await cache.aget(key, version)
+            found[key] = version
+    return [found[key] for key in keys]
+
+
+def bump_version(key: str) -> int:
+    version = max(time.time_ns(), (cache.get(key) or 0) + 1)
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def content_key(scope: str) -> str:
+    """A scope is a table, e.g. "tags", or a row, e.g. "recipe:1"."""
+    return f"content:{scope}:version"
+
+
+def bump_content(*scopes: str) -> None:
+    now = time.time_ns()
+    cache.set_many({content_key(scope): now for scope in scopes}, timeout=None)
@@ -1,10 +1,17 @@
-import io
-
+import numpy as np
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import FileResponse, Http404
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, Prefetch
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import content_disposition_header
 from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
@@ -12,29 +19,38 @@ from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
-    RecipeIngredient,
+    RecipeNeighbor,
     ShoppingCart,
     Tag,
 )
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
-from reportlab.rl_config import TTFSearchPath  # type: ignore[import-untyped]
 from rest_framework import permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from users.models import Subscription
 
-from .filters import IngredientFilter, RecipeFilter
+from backend.constants import SIMILAR_RECIPES
+
+from .cards import batch_invalidation
+from .conditional import ConditionalGetMixin
+from .feed import FeedPagination, backfill, feed_sources
+from .fieldsets import CONTEXT_KEY as FIELDSET_CONTEXT_KEY
+from .fieldsets import get_fieldset
+from .filters import ORDERINGS, IngredientFilter, RecipeFilter
 from .paginations import LimitPagination
+from .pantry import pantry_matrix
 from .permissions import IsAuthorOrReadOnly, ReadOnly
+from .querybudget import query_budget
 from .serializers import (
     AbridgedRecipeSerializer,
     FavoriteSerializer,
     IngredientSerializer,
-    RecipeSerializer,
+    PantryRecipeSerializer,
+    PantrySerializer,
+    RecipeBatchSerializer,
+    RecipeCardSerializer,
     RecipeWriteSerializer,
     ShoppingCartSerializer,
     SubscriptionSerializer,
@@ -42,16 +58,59 @@ from .serializers import (
     TagSerializer,
     UsersSerializer,
 )
+from .shopping_lists import (
+    SHOPPING_LIST_RENDERERS,
+    PDFRenderer,
+    open_shopping_list,
+    shopping_list,
+    shopping_totals,
+)
+from .uploads import StreamingMultiPartParser
+from .versions import bump_content
 
 User = get_user_model()
 
 
-class RecipeViewSet(ModelViewSet):
+def count_on(model, recipe_id, delta):
+    """Keep the recipe's count of the model's rows, e.g. favourites."""
+    Recipe.objects.filter(pk=recipe_id).count_on(model.counter_field, delta)
+    bump_content("popularity")
+
+
+class RecipeViewSet(ConditionalGetMixin, ModelViewSet):
     http_method_names = ("get", "post", "patch", "delete")
-    serializer_class = RecipeSerializer
+    serializer_class = RecipeCardSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     filterset_class = RecipeFilter
     pagination_class = LimitPagination
+    # The images uploaded as files streamed, see api.uploads
+    parser_classes = [
+        StreamingMultiPartParser
+        if issubclass(parser, MultiPartParser)
+        else parser
+        for parser in api_settings.DEFAULT_PARSER_CLASSES
+    ]
+    cursor_ordering = ("-pub_date", "-id")
+    query_budget = {
+        "list": 12,
+        "retrieve": 10,
+        "create": 24,
+        "partial_update": 24,
+        "destroy": 14,
+        "favorite": 8,
+        "delete_favorite": 6,
+        "shopping_cart": 8,
+        "delete_shopping_cart": 6,
+        "download_shopping_cart": 4,
+        "pantry": 4,
+        "batch": 4,
+        "feed": 6,
+        "similar": 4,
+    }
+    # Served off the recipe cards
+    read_actions = ("list", "retrieve", "batch", "feed", "similar")
+    conditional_scopes = ("recipes", "tags", "ingredients", "authors")
+    conditional_user_flags = True
 
     def get_permissions(self):
         if self.action == "patch" or self.action == "delete":
@@ -61,58 +120,84 @@ class RecipeViewSet(ModelViewSet):
             return (ReadOnly(),)
         return super().get_permissions()
 
-    def get_queryset(self):
-        """Use the prefetch_related() to rid of duplicate requests."""
-        queryset = Recipe.objects.prefetch_related(
-            "author",
-            "tags",
-            "ingredients",
-            "recipe_ingredient__ingredient",
+    def finalize_response(self, request, response, *args, **kwargs):
+        # A Response from the shopping list is an error, given as JSON
+        if (
+            isinstance(response, Response)
+            and self.action == "download_shopping_cart"
+        ):
+            renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+            request.accepted_renderer = renderer
+            request.accepted_media_type = renderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_conditional_scopes(self):
+        if self.action == "retrieve":
+            return (
+                f"recipe:{self.kwargs['pk']}",
+                "tags",
+                "ingredients",
+                "authors",
+            )
+        if self.request.query_params.get("ordering") == "popular":
+            return (*self.conditional_scopes, "popularity")
+        return self.conditional_scopes
+
+    def get_cursor_ordering(self):
+        return ORDERINGS.get(
+            self.request.query_params.get("ordering"), self.cursor_ordering
         )
-        if self.request.user.is_authenticated:
-            queryset = queryset.add_user_annotations(self.request.user.id)
-        return queryset
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = get_fieldset(
+                self.request, RecipeCardSerializer.Meta.fields
+            )
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.read_actions:
+            context[FIELDSET_CONTEXT_KEY] = self.get_fieldset()
+        return context
+
+    def get_queryset(self):
+        """Read the recipes off their cards, see `api.cards`, loading just
+        the columns a page needs, e.g. only some for a sparse fieldset.
+
+        The per-user flags come from `api.flags`, so that this query is the
+        same for everyone.
+        """
+        if self.action not in self.read_actions:
+            return Recipe.objects.all()
+        # The keyset pages on these
+        columns = {
+            field.lstrip("-")
+            for ordering in (self.cursor_ordering, *ORDERINGS.values())
+            for field in ordering
+        }
+        fieldset = self.get_fieldset()
+        if fieldset is None or not RecipeCardSerializer.card_fields.isdisjoint(
+            fieldset
+        ):
+            return Recipe.objects.select_related("card").only(
+                *columns, "card__data"
+            )
+        model_fields = {field.name for field in Recipe._meta.concrete_fields}
+        columns.update(model_fields.intersection(fieldset))
+        if "image_srcset" in fieldset:
+            columns.update(("image", "renditions"))
+        return Recipe.objects.only(*columns)
 
     def get_serializer_class(self):
         """Choose a serializer given the method."""
-        if self.action in ("list", "retrieve"):
-            return RecipeSerializer
+        if self.action in self.read_actions:
+            return RecipeCardSerializer
         return RecipeWriteSerializer
 
-    def create_shopping_list_pdf(self, shoppings):
-        """Draw the FG icon & then the shopping list strings."""
-        x_item = 30
-        x_qnty = 380
-        x_units = 450
-
-        TTFSearchPath.append(str(settings.BASE_DIR) + "/data/fonts/")
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=A4)
-        p.drawImage(
-            "fg_logo_for_shopping_list.png", 30, 790, width=20, height=20
-        )
-        pdfmetrics.registerFont(TTFont("DejaVuSans", "DejaVuSans.ttf"))
-        pdfmetrics.registerFont(
-            TTFont("DejaVuSansBold", "DejaVuSans-Bold.ttf")
-        )
-        p.setFont("DejaVuSans", 12)
-        p.drawRightString(550, 800, "Shopping list, Foodgram")
-        p.setFont("DejaVuSansBold", 10)
-        p.drawString(x_item, 750, "Item")
-        p.drawString(x_qnty, 750, "Qnty")
-        p.drawString(x_units, 750, "Units")
-        p.setFont("DejaVuSans", 12)
-        i = 15
-        y = 730
-        for item, details in sorted(shoppings.items()):
-            p.drawString(x_item, y, item)
-            p.drawString(x_qnty, y, str(details[0]))
-            p.drawString(x_units, y, details[1])
-            y -= i
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        return buffer
+    def perform_destroy(self, instance):
+        with batch_invalidation():
+            instance.delete()
 
     @action(
         methods=["post"],
@@ -151,33 +236,141 @@ class RecipeViewSet(ModelViewSet):
         detail=False,
         url_path="download_shopping_cart",
         permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
     )
     def download_shopping_cart(self, request):
-        """Download as an attachment, with opening it too in the browser."""
-        try:
-            shopping_totals = (
-                RecipeIngredient.objects.filter(
-                    recipe__shoppingcart__user=self.request.user
-                )
-                .values("ingredient__name", "ingredient__measurement_unit")
-                .annotate(quantity=Sum("amount"))
+        """Download as an attachment, with opening it too in the browser.
+
+        The PDF is rendered once per cart version, the other formats are
+        streamed off the cursor, see `api.shopping_lists`.
+        """
+        renderer = request.accepted_renderer
+        filename = f"my-Foodgram_shopping-list.{renderer.format}"
+        if not isinstance(renderer, PDFRenderer):
+            response = StreamingHttpResponse(
+                renderer.lines(
+                    shopping_totals(request.user).iterator(chunk_size=2000)
+                ),
+                content_type=f"{renderer.media_type}; "
+                f"charset={renderer.charset}",
             )
-            shoppings = {
-                item["ingredient__name"]: [
-                    item["quantity"],
-                    item["ingredient__measurement_unit"],
-                ]
-                for item in shopping_totals
+        else:
+            try:
+                if not settings.SHOPPING_LISTS_ACCEL_URL:
+                    file = open_shopping_list(request.user)
+                else:
+                    path = shopping_list(request.user)
+            except Exception as e:
+                return Response(
+                    "Some error occurred in extracting your shopping data: "
+                    f"{e}",
+                    status=status.HTTP_204_NO_CONTENT,
+                )
+            if not settings.SHOPPING_LISTS_ACCEL_URL:
+                response = FileResponse(file)
+            else:
+                # Sent by nginx, from its internal location
+                response = HttpResponse()
+                response["X-Accel-Redirect"] = (
+                    settings.SHOPPING_LISTS_ACCEL_URL + path.name
+                )
+            response["Content-Type"] = renderer.media_type
+        response["Content-Disposition"] = content_disposition_header(
+            True, filename
+        )
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    @action(methods=["get"], detail=False)
+    def batch(self, request):
+        """Read a number of recipes at once, `?ids=3,1,2`, in that order.
+
+        The ids of no recipe are listed as missing, rather than failing all.
+        """
+        return self.conditional(self.read_batch, request)
+
+    def read_batch(self, request):
+        serializer = RecipeBatchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        recipes = self.get_queryset().in_bulk(ids)
+        return Response(
+            {
+                "results": self.get_serializer(
+                    [recipes[pk] for pk in ids if pk in recipes], many=True
+                ).data,
+                "missing": [pk for pk in ids if pk not in recipes],
             }
-        except Exception as e:
-            return Response(
-                f"Some error occurred in extracting your shopping data: {e}",
-                status=status.HTTP_204_NO_CONTENT,
-            )
-        return FileResponse(
-            self.create_shopping_list_pdf(shoppings),
-            as_attachment=True,
-            filename="my-Foodgram_shopping-list.pdf",
+        )
+
+    @action(methods=["get"], detail=True)
+    def similar(self, request, pk):
+        """The recipes most alike this one, see `api.similar`."""
+        if not pk.isdecimal() or not 0 < int(pk) <= BigIntegerField.MAX_BIGINT:
+            raise Http404
+        ids = list(
+            RecipeNeighbor.objects.filter(recipe_id=pk)
+            .order_by("-similarity", "-neighbor_id")
+            .values_list("neighbor_id", flat=True)[:SIMILAR_RECIPES]
+        )
+        if not ids and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        recipes = self.get_queryset().in_bulk(ids)
+        return Response(
+            self.get_serializer(
+                [recipes[pk] for pk in ids if pk in recipes], many=True
+            ).data
+        )
+
+    @action(
+        methods=["get"],
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def feed(self, request):
+        """The recipes of the authors subscribed to, newest first, see
+        `api.feed`; paged by a cursor only."""
+        paginator = FeedPagination()
+        rows = paginator.paginate_queryset(
+            feed_sources(request.user), request, self
+        )
+        ids = [recipe_id for _, recipe_id in rows]
+        recipes = self.get_queryset().in_bulk(ids)
+        return paginator.get_paginated_response(
+            self.get_serializer(
+                [recipes[pk] for pk in ids if pk in recipes], many=True
+            ).data
+        )
+
+    @action(
+        methods=["post"],
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def pantry(self, request):
+        """Rank the recipes by the share of their ingredients at hand."""
+        serializer = PantrySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pantry = frozenset(serializer.validated_data["ingredients"])
+        recipe_ids, coverage = pantry_matrix.rank(pantry)
+        page = self.paginate_queryset(recipe_ids.tolist())
+        recipes = Recipe.objects.prefetch_related(
+            "recipe_ingredient__ingredient"
+        ).in_bulk(page)
+        on_page = np.isin(recipe_ids, page)
+        coverage = dict(
+            zip(recipe_ids[on_page].tolist(), coverage[on_page].tolist())
+        )
+        return self.get_paginated_response(
+            PantryRecipeSerializer(
+                [recipes[pk] for pk in page if pk in recipes],
+                many=True,
+                context={
+                    **self.get_serializer_context(),
+                    "pantry": pantry,
+                    "coverage": coverage,
+                },
+            ).data
         )
 
     @staticmethod
@@ -187,12 +380,17 @@ class RecipeViewSet(ModelViewSet):
             context={"request": request},
         )
         srlzr.is_valid(raise_exception=True)
-        srlzr.save()
+        with transaction.atomic():
+            srlzr.save()
+            count_on(serializer.Meta.model, recipe.id, 1)
         return Response(srlzr.data, status=status.HTTP_201_CREATED)
 
     @staticmethod
     def remove_recipe(model, user, recipe):
-        get_object_or_404(model, user=user, recipe=recipe).delete()
+        item = get_object_or_404(model, user=user, recipe=recipe)
+        with transaction.atomic():
+            item.delete()
+            count_on(model, recipe.id, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -211,7 +409,9 @@ class BaseFavoriteShoppingCartViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         new_item = self.model(user=request.user, recipe=item)
-        new_item.save()
+        with transaction.atomic():
+            new_item.save()
+            count_on(self.model, item.id, 1)
         serializer = self.serializer_class(
             new_item, context={"request": request}
         )
@@ -227,7 +427,9 @@ class BaseFavoriteShoppingCartViewSet(ModelViewSet):
                 _("No recipe to delete."),
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        self.model.objects.get(user=request.user, recipe=item).delete()
+        with transaction.atomic():
+            self.model.objects.get(user=request.user, recipe=item).delete()
+            count_on(self.model, item.id, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -238,21 +440,25 @@ class ShoppingCartViewSet(BaseFavoriteShoppingCartViewSet):
     permission_classes = (permissions.AllowAny,)
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     permission_classes = (permissions.AllowAny,)
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ("slug",)
     pagination_class = None
+    query_budget = 2
+    conditional_scopes = ("tags",)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     pagination_class = None
     filterset_class = IngredientFilter
     permission_classes = (permissions.AllowAny,)
+    query_budget = 2
+    conditional_scopes = ("ingredients",)
 
 
 class UsersViewSet(UserViewSet):
@@ -261,28 +467,48 @@ class UsersViewSet(UserViewSet):
     serializer_class = UsersSerializer
     queryset = User.objects.all()
     pagination_class = LimitPagination
+    cursor_ordering = ("email", "id")
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    query_budget = {
+        "list": 4,
+        "retrieve": 4,
+        "me": 4,
+        "subscriptions": 6,
+    }
 
     def get_permissions(self):
         if self.action == "me":
             self.permission_classes = [permissions.IsAuthenticated]
         return super().get_permissions()
 
+    def get_subscriptions(self):
+        """The authors the user subscribes to, with their recipes."""
+        recipes = Recipe.objects.all()
+        recipes_limit = self.request.query_params.get("recipes_limit")
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes[: int(recipes_limit)]
+        return (
+            User.objects.filter(is_subscribed__user=self.request.user)
+            .annotate(recipes_count=Count("recipes", distinct=True))
+            .prefetch_related(
+                Prefetch("recipes", queryset=recipes, to_attr="page_recipes")
+            )
+        )
+
     @action(
         methods=["get"],
         detail=False,
         permission_classes=[permissions.IsAuthenticated],
     )
     def subscriptions(self, request):
-        curr_user = request.user
-        subscriptions = User.objects.filter(is_subscribed__user=curr_user)
-        paginator = self.paginate_queryset(subscriptions)
+        paginator = self.paginate_queryset(self.get_subscriptions())
         serializer = SubscriptionSerializer(
             paginator, many=True, context={"request": request}
         )
         return self.get_paginated_response(serializer.data)
 
 
+@query_budget(10)
 @api_view(["POST", "DELETE"])
 @permission_classes([permissions.IsAuthenticated])
 def subscribe_user(request, i_d):
@@ -309,7 +535,9 @@ def subscribe_user(request, i_d):
         context={"request": request},
     )
     serializer.is_valid(raise_exception=True)
-    serializer.save()
+    with transaction.atomic():
+        serializer.save()
+        backfill(user.id, author.id)
     recipes = Recipe.objects.filter(author=author)
     if recipes_limit:
         recipes = recipes[: int(recipes_limit)]
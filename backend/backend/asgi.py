@@ -1,7 +1,9 @@
 """
 ASGI config for backend project.
 
-It exposes the ASGI callable as a module-level variable named ``application``.
+It exposes the ASGI callable as a module-level variable named ``application``,
+served by gunicorn's uvicorn worker, see the Dockerfile, for the async read
+views under /api/async/ to run on its event loop.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -14,6 +14,7 @@ TEST_USERS_PER_PAGE_URL = TEST_USERS_PAGE_URL + (
     f"?limit={TEST_USERS_PER_PAGE_INT}"
 )
 TEST_USER_PAGE_PAGENUM = TEST_USERS_PAGE_URL + "?page=1"
+TEST_USERS_CURSOR_URL = TEST_USERS_PAGE_URL + "?pagination=cursor"
 
 TEST_USER_TOKEN_ON_URL = TEST_USERS_TOKEN_URL + "login/"
 TEST_USER_TOKEN_OFF_URL = TEST_USERS_TOKEN_URL + "logout/"
@@ -40,6 +41,11 @@ TEST_USER_CONTENT_ITEMS = {
     "previous": None,
     "results": None,
 }
+TEST_USER_CURSOR_CONTENT_ITEMS = {
+    "next": None,
+    "previous": None,
+    "results": None,
+}
 TEST_USER_CONTENT_RESULTS_ITEMS = {
     "email": None,
     "id": 0,
@@ -56,6 +62,7 @@ TEST_USER_CONTENT_RESULTS_ITEMS = {
 # Test recipe routes
 TEST_RECIPE_PAGE_URL = "/api/recipes/"
 TEST_TAG_PAGE_URL = "/api/tags/"
+TEST_INGREDIENT_PAGE_URL = "/api/ingredients/"
 
 # Test recipe data: END
 
@@ -82,6 +89,28 @@ MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 1000
 
 MAX_IMG_SIZE = 1  # Mb
+# The fields of a multipart recipe upload but the image, in bytes
+MAX_UPLOAD_FORM_SIZE = 64 * 1024
+
+MAX_PANTRY_INGREDIENTS = 500
+MAX_BATCH_RECIPES = 100
+
+# More followers than this, & an author's recipes are pulled into the feeds
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_BACKFILL_RECIPES = 100  # per author subscribed to
+
+SIMILAR_RECIPES = 10  # kept per recipe
+
+# The recipe image renditions, in px wide: the admin preview, card & detail
+IMAGE_THUMB_WIDTH = 80
+IMAGE_RENDITION_WIDTHS = (IMAGE_THUMB_WIDTH, 480, 1200)
+IMAGE_JOB_MAX_ATTEMPTS = 3
+IMAGE_JOB_STALE_AFTER = 10 * 60  # s running, before it is retried
+
+# A shopping list PDF larger than this, in bytes, is written to disk
+PDF_SPOOL_MAX_SIZE = 512 * 1024
+
+USER_FLAGS_CACHE_TIMEOUT = 60 * 60  # s
 
 
 TEST_SERVER_URL = "http://testserver"
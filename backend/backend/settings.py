@@ -52,7 +52,6 @@ INSTALLED_APPS = [
     "api.apps.ApiConfig",
     "rosetta",
     # "debug_toolbar",
-    "django_cleanup.apps.CleanupConfig",
 ]
 
 MIDDLEWARE = [
@@ -65,9 +64,16 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.querybudget.QueryBudgetMiddleware",
     # "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# Per-view SQL query budgets, see api.querybudget: "off", "log" or "raise"
+QUERY_BUDGET = {
+    "MODE": os.getenv("QUERY_BUDGET_MODE", "log" if DEBUG else "off"),
+    "MAX_REPEATS": int(os.getenv("QUERY_BUDGET_MAX_REPEATS", 10)),
+}
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -102,6 +108,14 @@ WSGI_APPLICATION = "backend.wsgi.application"
 
 MEDIA_URL = "/media/"
 
+STORAGES = {
+    # The files named by their content, see recipes.storage
+    "default": {"BACKEND": "recipes.storage.ContentAddressedStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+    },
+}
+
 if DEBUG:
     # Local dev case
     DATABASES = {
@@ -111,6 +125,8 @@ if DEBUG:
         }
     }
     MEDIA_ROOT = BASE_DIR / "media"
+    SHOPPING_LISTS_ROOT = BASE_DIR / "shopping_lists"
+    SHOPPING_LISTS_ACCEL_URL = ""
     STATIC_URL = "static/"
     STATIC_ROOT = BASE_DIR / "collected_static"
 else:
@@ -132,10 +148,28 @@ else:
         }
     }
     MEDIA_ROOT = "/app/media/"  # type: ignore[assignment]
+    SHOPPING_LISTS_ROOT = "/app/shopping_lists/"  # type: ignore[assignment]
+    # Nginx's internal location of the shopping lists, see api.shopping_lists
+    SHOPPING_LISTS_ACCEL_URL = os.getenv(
+        "SHOPPING_LISTS_ACCEL_URL", "/shopping_lists/"
+    )
     STATIC_URL = "/static/django/"
     STATIC_ROOT = "/app/static_django/"  # type: ignore[assignment]
 
 
+# Per-user flags & versions live here, so share it (e.g. Redis, Memcached)
+# between the gunicorn workers in production via the env.
+# Shared by the web & the worker processes, see api.checks
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttribute"
@@ -179,6 +213,24 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": PAGINATOR_NUM,
 }
 
+# Render & parse the api JSON with orjson, if installed, see api.renderers
+API_FAST_JSON = os.getenv("API_FAST_JSON", "False").lower() == "true"
+if API_FAST_JSON:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = (
+        "api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    )
+
+# Render the read-only list serializers via the compiled api.fastpath
+API_FAST_SERIALIZERS = (
+    os.getenv("API_FAST_SERIALIZERS", "False").lower() == "true"
+)
+
 LANGUAGES = (
     ("ru", _("Russian")),
     ("en", _("English")),
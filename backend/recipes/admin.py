@@ -11,6 +11,8 @@ from .models import (
     ShoppingCart,
     Tag,
 )
+from .jobs import enqueue_image
+from .renditions import thumbnail_url
 
 
 class RecipeIngredientsShowInLine(admin.TabularInline):
@@ -44,10 +46,27 @@ class Recipes(admin.ModelAdmin):
     def pic_preview(self, obj):
         if obj.image:
             return format_html(
-                f'<img src="{obj.image.url}" width=40 height=40 />'
+                '<img src="{}" width=40 height=40 />', thumbnail_url(obj)
             )
         return format_html("")
 
+    def save_model(self, request, obj, form, change):
+        if not change:
+            super().save_model(request, obj, form, change)
+        else:
+            # The image is written by recipes.jobs only, which may have
+            # swapped it in since the recipe was read, see enqueue_image
+            obj.save(
+                update_fields=[
+                    field.name
+                    for field in obj._meta.concrete_fields
+                    if field.name in form.changed_data
+                    and field.name != "image"
+                ]
+            )
+        if "image" in form.changed_data:
+            enqueue_image(obj)
+
 
 @admin.register(ShoppingCart)
 class ShoppingCarts(admin.ModelAdmin):
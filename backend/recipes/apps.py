@@ -1,7 +1,22 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
 from django.utils.translation import gettext_lazy as _
 
 
 class RecipesConfig(AppConfig):
     name = "recipes"
     verbose_name = _("recipes")
+
+    def ready(self):
+        post_migrate.connect(restore_search_triggers, sender=self)
+
+
+def restore_search_triggers(using, **kwargs):
+    """SQLite drops the FTS triggers along with a table it alters."""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        from .fts import ensure_sqlite_fts
+
+        with connection.cursor() as cursor:
+            ensure_sqlite_fts(cursor)
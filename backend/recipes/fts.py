@@ -0,0 +1,74 @@
+"""The FTS5 table the SQLite dev db searches recipes in, see api.search.
+
+An external content table over recipes_recipe, kept in step by triggers.
+SQLite alters a table by making it anew, which drops its triggers along,
+so `ensure_sqlite_fts()` makes any missing ones again after each migrate.
+"""
+
+TABLE = "recipes_recipe_fts"
+CREATE_TABLE = (
+    f"""
+    CREATE VIRTUAL TABLE {TABLE} USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    # bm25() weighing names 10 times the texts
+    f"INSERT INTO {TABLE} ({TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+)
+TRIGGERS = {
+    f"{TABLE}_insert": f"""
+    CREATE TRIGGER {TABLE}_insert AFTER INSERT ON recipes_recipe
+    BEGIN
+        INSERT INTO {TABLE} (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+    f"{TABLE}_delete": f"""
+    CREATE TRIGGER {TABLE}_delete AFTER DELETE ON recipes_recipe
+    BEGIN
+        INSERT INTO {TABLE} ({TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+    END
+    """,
+    f"{TABLE}_update": f"""
+    CREATE TRIGGER {TABLE}_update
+    AFTER UPDATE OF name, text ON recipes_recipe
+    BEGIN
+        INSERT INTO {TABLE} ({TABLE}, rowid, name, text)
+        VALUES ('delete', old.id, old.name, old.text);
+        INSERT INTO {TABLE} (rowid, name, text)
+        VALUES (new.id, new.name, new.text);
+    END
+    """,
+}
+REBUILD = f"INSERT INTO {TABLE} ({TABLE}) VALUES ('rebuild')"
+
+
+def get_names(cursor, kind):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = %s", (kind,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_sqlite_fts(cursor):
+    for sql in CREATE_TABLE:
+        cursor.execute(sql)
+    ensure_sqlite_fts(cursor)
+
+
+def ensure_sqlite_fts(cursor):
+    """Make the missing triggers & re-index, if the table is there."""
+    if TABLE not in get_names(cursor, "table"):
+        return
+    missing = TRIGGERS.keys() - get_names(cursor, "trigger")
+    for name in sorted(missing):
+        cursor.execute(TRIGGERS[name])
+    if missing:
+        cursor.execute(REBUILD)
+
+
+def drop_sqlite_fts(cursor):
+    for name in TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
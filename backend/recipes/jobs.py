@@ -0,0 +1,228 @@
+"""The recipe image uploads, processed off the request by a worker.
+
+An image written is stored as uploaded & queued as an ImageJob, the recipe
+showing a placeholder meanwhile, with an image_status of "pending". The
+`process_images` command then takes the jobs on: an image is decoded, turned
+upright, stripped of its metadata, EXIF & all, re-encoded & its renditions
+made, all in `process()`, off the db & the storage, for a process pool to
+run, & the result is swapped in for the placeholder.
+
+A job that fails is retried, up to IMAGE_JOB_MAX_ATTEMPTS times, & then
+left failed, along with its recipe's image_status, until requeued.
+"""
+
+import functools
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image
+
+from backend.constants import IMAGE_JOB_MAX_ATTEMPTS, IMAGE_JOB_STALE_AFTER
+
+from .models import ImageJob, Recipe
+from .renditions import (
+    FORMATS,
+    encode,
+    release_image,
+    rendition_name,
+    scaled,
+    upright,
+)
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_SIZE = (480, 320)
+PLACEHOLDER_COLOR = "#e0e0e0"
+# The Pillow format an upload is re-encoded to, & its extension
+NORMALIZED = {
+    "JPEG": ("JPEG", "jpg"),
+    "PNG": ("PNG", "png"),
+    "WEBP": ("WEBP", "webp"),
+    "GIF": ("PNG", "png"),
+}
+NORMALIZE_OPTIONS = {
+    "JPEG": {"quality": 90, "optimize": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"quality": 90},
+}
+
+
+@functools.cache
+def placeholder() -> bytes:
+    buffer = BytesIO()
+    Image.new("RGB", PLACEHOLDER_SIZE, PLACEHOLDER_COLOR).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def enqueue_image(recipe) -> None:
+    """Queue the image just written to a recipe, the placeholder shown in
+    its place meanwhile."""
+    if not recipe.image._committed:
+        # Stored as uploaded, the recipe's other columns left as they are
+        recipe.image.save(recipe.image.name, recipe.image.file, save=False)
+    source, storage = recipe.image.name, recipe.image.storage
+    previous = (
+        ImageJob.objects.filter(recipe=recipe)
+        .values_list("source", flat=True)
+        .first()
+    )
+    ImageJob.objects.update_or_create(
+        recipe=recipe,
+        defaults={
+            "source": source,
+            "status": "pending",
+            "attempts": 0,
+            "error": "",
+        },
+    )
+    if previous and previous != source:
+        # Replaced before it was processed
+        transaction.on_commit(functools.partial(release_image, previous, {}))
+    recipe.image = storage.save(
+        "recipes/placeholder.png", ContentFile(placeholder())
+    )
+    recipe.renditions = {}
+    recipe.image_status = "pending"
+    recipe.save(update_fields=("image", "renditions", "image_status"))
+
+
+def process(data: bytes) -> tuple[bytes, str, dict[tuple[int, str], bytes]]:
+    """Normalize an upload & make its renditions. Return the image
+    re-encoded, its extension, & the renditions by (width, media type)."""
+    upload = Image.open(BytesIO(data))
+    fmt, extension = NORMALIZED.get(upload.format, ("PNG", "png"))
+    options = dict(NORMALIZE_OPTIONS[fmt])
+    if upload.info.get("icc_profile"):
+        options["icc_profile"] = upload.info["icc_profile"]
+    image = upright(upload)
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    renditions = {
+        (width, media_type): encode(rendition, rendition_fmt)
+        for width, rendition in scaled(image)
+        for media_type, rendition_fmt in FORMATS
+    }
+    return buffer.getvalue(), extension, renditions
+
+
+def claim_jobs(limit: int) -> list[ImageJob]:
+    """Take on the oldest pending jobs, which no other worker has."""
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("recipe")
+            .filter(status="pending")
+            .order_by("updated_at")[:limit]
+        )
+        ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status="running",
+            attempts=F("attempts") + 1,
+            updated_at=timezone.now(),
+        )
+    for job in jobs:
+        job.status = "running"
+        job.attempts += 1
+    return jobs
+
+
+def still_running(job):
+    """The job, unless requeued meanwhile, e.g. on a new upload."""
+    return ImageJob.objects.filter(
+        pk=job.pk, source=job.source, status="running"
+    )
+
+
+def finish(job, processed) -> None:
+    """Store what a job made & swap it in for the placeholder."""
+    data, extension, made = processed
+    recipe = job.recipe
+    storage = recipe.image.storage
+    with transaction.atomic():
+        # The image saved & referred to at once, see recipes.storage
+        name = storage.save(
+            f"recipes/{recipe.pk}.{extension}", ContentFile(data)
+        )
+        formats: dict[str, list[int]] = {}
+        for (width, media_type), content in made.items():
+            rendition = rendition_name(name, width, media_type)
+            if not storage.exists(rendition):
+                storage.save(rendition, ContentFile(content))
+            formats.setdefault(media_type, []).append(width)
+        renditions = {"source": name, "formats": formats}
+        if not still_running(job).update(
+            source="", status="done", error="", updated_at=timezone.now()
+        ):
+            transaction.on_commit(
+                functools.partial(release_image, name, renditions)
+            )
+            return
+        recipe.image, recipe.renditions = name, renditions
+        recipe.image_status = "ready"
+        recipe.save(update_fields=("image", "renditions", "image_status"))
+        transaction.on_commit(functools.partial(release_image, job.source, {}))
+
+
+def fail(job, error: str) -> None:
+    status = "failed" if job.attempts >= IMAGE_JOB_MAX_ATTEMPTS else "pending"
+    with transaction.atomic():
+        if (
+            still_running(job).update(
+                status=status, error=error, updated_at=timezone.now()
+            )
+            and status == "failed"
+        ):
+            job.recipe.image_status = "failed"
+            job.recipe.save(update_fields=("image_status",))
+
+
+def run_jobs(jobs: list[ImageJob], executor=None) -> int:
+    """Process the jobs claimed, on the executor given if any, e.g. a
+    process pool. Return how many were done."""
+    claimed = []
+    for job in jobs:
+        try:
+            with job.recipe.image.storage.open(job.source, "rb") as file:
+                data = file.read()
+        except OSError as error:
+            fail(job, repr(error))
+            continue
+        future = executor.submit(process, data) if executor else None
+        claimed.append((job, future, data))
+    done = 0
+    for job, future, data in claimed:
+        try:
+            finish(job, future.result() if future else process(data))
+        except Exception as error:
+            logger.exception("Image job %s failed", job.pk)
+            fail(job, repr(error))
+        else:
+            done += 1
+    return done
+
+
+def requeue(failed: bool = False) -> int:
+    """Queue again the jobs left running for IMAGE_JOB_STALE_AFTER, as by
+    a worker gone, & the failed ones if asked. Return how many there were."""
+    stale = Q(
+        status="running",
+        updated_at__lt=timezone.now()
+        - timedelta(seconds=IMAGE_JOB_STALE_AFTER),
+    )
+    jobs = ImageJob.objects.filter(
+        stale | Q(status="failed") if failed else stale
+    )
+    recipe_ids = list(jobs.values_list("recipe_id", flat=True))
+    count = jobs.update(
+        status="pending", attempts=0, error="", updated_at=timezone.now()
+    )
+    for recipe in Recipe.objects.filter(
+        pk__in=recipe_ids, image_status="failed"
+    ):
+        recipe.image_status = "pending"
+        recipe.save(update_fields=("image_status",))
+    return count
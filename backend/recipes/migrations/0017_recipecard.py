@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0016_alter_recipe_image"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeCard",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="card",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="recipe",
+                    ),
+                ),
+                ("data", models.TextField(verbose_name="card data")),
+            ],
+            options={
+                "verbose_name": "recipe card",
+                "verbose_name_plural": "recipe cards",
+            },
+        ),
+    ]
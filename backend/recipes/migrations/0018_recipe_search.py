@@ -0,0 +1,80 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from recipes.fts import create_sqlite_fts, drop_sqlite_fts
+
+# Postgres: a generated tsvector, Russian & English stemmed, names weighing
+# more than texts, under a GIN index. See api.search for the queries.
+POSTGRES_FORWARD = (
+    """
+    ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX recipes_recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector)
+    """,
+)
+POSTGRES_BACKWARD = (
+    "DROP INDEX IF EXISTS recipes_recipe_search_vector_idx",
+    "ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector",
+)
+
+
+def forward(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for sql in POSTGRES_FORWARD:
+            schema_editor.execute(sql)
+    elif vendor == "sqlite":
+        # An FTS5 table, see recipes.fts
+        with schema_editor.connection.cursor() as cursor:
+            create_sqlite_fts(cursor)
+
+
+def backward(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for sql in POSTGRES_BACKWARD:
+            schema_editor.execute(sql)
+    elif vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            drop_sqlite_fts(cursor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0017_recipecard"),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+        migrations.CreateModel(
+            name="RecipeSearchEntry",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="recipes.recipe",
+                    ),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "recipes_recipe_fts",
+                "managed": False,
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    for model_name, field in (
+        ("Favorite", "favorites_count"),
+        ("ShoppingCart", "in_carts_count"),
+    ):
+        model = apps.get_model("recipes", model_name)
+        Recipe.objects.update(
+            **{
+                field: Coalesce(
+                    Subquery(
+                        model.objects.filter(recipe=OuterRef("pk"))
+                        .order_by()
+                        .values("recipe")
+                        .annotate(count=Count("pk"))
+                        .values("count")
+                    ),
+                    0,
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0018_recipe_search"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="favourited times"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="in_carts_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="added to carts times"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favorites_count", "-pub_date", "-id"],
+                name="recipe_popular_idx",
+            ),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
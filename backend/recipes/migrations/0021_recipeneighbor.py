@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0020_feedentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeNeighbor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("similarity", models.FloatField(verbose_name="similarity")),
+                (
+                    "neighbor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="recipes.recipe",
+                        verbose_name="similar recipe",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbors",
+                        to="recipes.recipe",
+                        verbose_name="recipe",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "similar recipe",
+                "verbose_name_plural": "similar recipes",
+                "indexes": [
+                    models.Index(
+                        fields=["recipe", "-similarity"],
+                        name="recipe_neighbor_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("recipe", "neighbor"),
+                        name="unique_recipe_neighbor",
+                    )
+                ],
+            },
+        ),
+    ]
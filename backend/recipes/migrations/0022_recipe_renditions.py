@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+def drop_cards(apps, schema_editor):
+    # Rebuilt on the next read, with the image_srcset they lack
+    apps.get_model("recipes", "RecipeCard").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0021_recipeneighbor"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="renditions",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="image renditions",
+            ),
+        ),
+        migrations.RunPython(drop_cards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_cards(apps, schema_editor):
+    # Rebuilt on the next read, with the image_status they lack
+    apps.get_model("recipes", "RecipeCard").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0022_recipe_renditions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "being processed"),
+                    ("ready", "ready"),
+                    ("failed", "failed to process"),
+                ],
+                default="ready",
+                editable=False,
+                max_length=16,
+                verbose_name="image status",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ImageJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        verbose_name="uploaded image",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("running", "running"),
+                            ("done", "done"),
+                            ("failed", "failed"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="attempts"
+                    ),
+                ),
+                (
+                    "error",
+                    models.TextField(blank=True, verbose_name="last error"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="updated at"
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_job",
+                        to="recipes.recipe",
+                        verbose_name="recipe",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "image job",
+                "verbose_name_plural": "image jobs",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "updated_at"],
+                        name="image_job_queue_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(drop_cards, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.translation import gettext_lazy as _
 
 from backend.constants import (
@@ -23,25 +25,34 @@ User = get_user_model()
 
 
 class RecipeQuerySet(models.QuerySet):
-    def add_user_annotations(self, user_id: str | int):
-        return self.annotate(
-            is_favorited=models.Exists(
-                Favorite.objects.filter(
-                    user_id=user_id, recipe__pk=models.OuterRef("pk")
-                )
-            ),
-            is_in_shopping_cart=models.Exists(
-                ShoppingCart.objects.filter(
-                    user_id=user_id, recipe__pk=models.OuterRef("pk")
-                )
-            ),
-        )
-
     def filter_on_tags(self, tags):
         if tags:
             return self.filter(tags__slug__in=tags).distinct()
         return self
 
+    def count_on(self, counter_field, delta):
+        """Move a counter in the db, e.g. a favourite being added, as in
+        `recipe.favorites_count += 1` with no race between the requests."""
+        return self.update(
+            **{counter_field: Greatest(F(counter_field) + delta, 0)}
+        )
+
+    def reconcile_counters(self, model):
+        """Reset the counter of the model's rows where it has drifted."""
+        actual = Coalesce(
+            Subquery(
+                model.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+        return self.exclude(**{model.counter_field: actual}).update(
+            **{model.counter_field: actual}
+        )
+
 
 class Ingredient(models.Model):
     name = models.CharField(
@@ -154,12 +165,17 @@ class BaseFavoriteShoppingCart(models.Model):
 
 
 class Favorite(BaseFavoriteShoppingCart):
+    # The Recipe column keeping count of these
+    counter_field = "favorites_count"
+
     class Meta(BaseFavoriteShoppingCart.Meta):
         verbose_name = _("favourite")
         verbose_name_plural = _("favourites")
 
 
 class ShoppingCart(BaseFavoriteShoppingCart):
+    counter_field = "in_carts_count"
+
     class Meta(BaseFavoriteShoppingCart.Meta):
         verbose_name = _("shopping_cart")
         verbose_name_plural = _("shopping_carts")
@@ -182,6 +198,22 @@ class Recipe(models.Model):
         verbose_name=_("recipe image"),
         help_text=_("Upload an image<=1MB for your recipe"),
     )
+    # See recipes.renditions
+    renditions = models.JSONField(
+        _("image renditions"), default=dict, blank=True, editable=False
+    )
+    # See recipes.jobs
+    image_status = models.CharField(
+        _("image status"),
+        max_length=16,
+        choices=(
+            ("pending", _("being processed")),
+            ("ready", _("ready")),
+            ("failed", _("failed to process")),
+        ),
+        default="ready",
+        editable=False,
+    )
     text = models.TextField(
         verbose_name=_("recipe description"),
         help_text=_("Describe how to cook"),
@@ -210,6 +242,12 @@ class Recipe(models.Model):
         verbose_name=_("ingredients"),
     )
     pub_date = models.DateTimeField(_("published on"), auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        _("favourited times"), default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        _("added to carts times"), default=0, editable=False
+    )
 
     objects = RecipeQuerySet.as_manager()
 
@@ -218,6 +256,193 @@ class Recipe(models.Model):
         verbose_name = _("recipe")
         verbose_name_plural = _("recipes")
         default_related_name = "recipes"
+        indexes = (
+            models.Index(
+                fields=("-favorites_count", "-pub_date", "-id"),
+                name="recipe_popular_idx",
+            ),
+        )
 
     def __str__(self):
         return self.name
+
+    def save(self, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # The counters as read would undo the moves made since, see
+            # RecipeQuerySet.count_on
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name
+                not in (Favorite.counter_field, ShoppingCart.counter_field)
+            ]
+        super().save(**kwargs)
+
+
+class RecipeCard(models.Model):
+    """The user-independent JSON of a recipe, rebuilt on write.
+
+    Stored as text, since a jsonb column would not keep the key order the
+    API renders the recipe in.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="card",
+        verbose_name=_("recipe"),
+    )
+    data = models.TextField(verbose_name=_("card data"))
+
+    class Meta:
+        verbose_name = _("recipe card")
+        verbose_name_plural = _("recipe cards")
+
+    def __str__(self):
+        return f"{self.recipe_id}"
+
+
+class RecipeSearchEntry(models.Model):
+    """A row of the FTS5 table searched on the SQLite dev db.
+
+    The table is made & kept in step by the 0018 migration, see api.search.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_entry",
+    )
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "recipes_recipe_fts"
+
+
+class FeedEntry(models.Model):
+    """A recipe on a subscriber's timeline, written as the author publishes.
+
+    The pub_date is the recipe's, copied over for the timeline to be read
+    off its own index, newest first.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name=_("subscriber"),
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name=_("recipe"),
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("author"),
+    )
+    pub_date = models.DateTimeField(_("published on"))
+
+    class Meta:
+        verbose_name = _("feed entry")
+        verbose_name_plural = _("feed entries")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_user_recipe"
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date", "-recipe"),
+                name="feed_timeline_idx",
+            ),
+            models.Index(fields=("user", "author"), name="feed_author_idx"),
+        )
+
+    def __str__(self):
+        return f"{self.user}:{self.recipe_id}"
+
+
+class RecipeNeighbor(models.Model):
+    """A recipe like another one, by their ingredients & tags.
+
+    Precomputed by `api.similar`, so reading the similar recipes is a lookup.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="neighbors",
+        verbose_name=_("recipe"),
+    )
+    neighbor = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("similar recipe"),
+    )
+    similarity = models.FloatField(_("similarity"))
+
+    class Meta:
+        verbose_name = _("similar recipe")
+        verbose_name_plural = _("similar recipes")
+        constraints = (
+            models.UniqueConstraint(
+                fields=("recipe", "neighbor"), name="unique_recipe_neighbor"
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("recipe", "-similarity"), name="recipe_neighbor_idx"
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipe_id}~{self.neighbor_id}"
+
+
+class ImageJob(models.Model):
+    """A recipe image upload to process, see `recipes.jobs`."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="image_job",
+        verbose_name=_("recipe"),
+    )
+    # The storage name of the image as uploaded
+    source = models.CharField(_("uploaded image"), max_length=255, blank=True)
+    status = models.CharField(
+        _("status"),
+        max_length=16,
+        choices=(
+            ("pending", _("pending")),
+            ("running", _("running")),
+            ("done", _("done")),
+            ("failed", _("failed")),
+        ),
+        default="pending",
+    )
+    attempts = models.PositiveSmallIntegerField(_("attempts"), default=0)
+    error = models.TextField(_("last error"), blank=True)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("image job")
+        verbose_name_plural = _("image jobs")
+        indexes = (
+            models.Index(
+                fields=("status", "updated_at"), name="image_job_queue_idx"
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.recipe_id}: {self.status}"
@@ -0,0 +1,198 @@
+"""The recipe image renditions: smaller copies of Recipe.image, one per
+IMAGE_RENDITION_WIDTHS & per format, AVIF where Pillow has it, WebP, & JPEG
+for whatever takes neither.
+
+They are stored next to the image, as recipes/renditions/<name>-<width>w.<ext>,
+& listed on Recipe.renditions along with the image they were made of, so that
+no rendition is made twice, & their urls are known with no storage lookup.
+An image narrower than a width is not scaled up: its rendition is as wide as
+the image itself.
+"""
+
+import logging
+import posixpath
+from collections.abc import Iterator
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from backend.constants import IMAGE_RENDITION_WIDTHS, IMAGE_THUMB_WIDTH
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"image/avif": "avif", "image/webp": "webp", "image/jpeg": "jpg"}
+# The media types made, best first, with their Pillow format
+FORMATS = tuple(
+    (media_type, fmt)
+    for media_type, fmt in (
+        ("image/avif", "AVIF"),
+        ("image/webp", "WEBP"),
+        ("image/jpeg", "JPEG"),
+    )
+    if fmt == "JPEG" or features.check(fmt.lower())
+)
+# About alike in quality; AVIF at its default speed takes seconds a photo
+ENCODER_OPTIONS = {
+    "AVIF": {"quality": 60, "speed": 8},
+    "WEBP": {"quality": 80},
+    "JPEG": {"quality": 80, "optimize": True, "progressive": True},
+}
+
+
+def rendition_name(name: str, width: int, media_type: str) -> str:
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory,
+        "renditions",
+        f"{stem}-{width}w.{EXTENSIONS[media_type]}",
+    )
+
+
+def is_rendered(recipe) -> bool:
+    renditions = recipe.renditions
+    return renditions.get("source") == recipe.image.name and all(
+        media_type in renditions.get("formats", ())
+        for media_type, _ in FORMATS
+    )
+
+
+def encode(image: Image.Image, fmt: str) -> bytes:
+    if fmt == "JPEG" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, fmt, **ENCODER_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+def upright(source: Image.Image) -> Image.Image:
+    """Turn an image upright, as RGB, or as RGBA if it has transparency."""
+    source = ImageOps.exif_transpose(source)
+    has_alpha = source.mode in ("RGBA", "LA", "PA") or (
+        "transparency" in source.info
+    )
+    return source.convert("RGBA" if has_alpha else "RGB")
+
+
+def scaled(source: Image.Image) -> Iterator[tuple[int, Image.Image]]:
+    """Yield the image at each rendition width, but no wider than it is."""
+    for width in sorted(
+        {min(w, source.width) for w in IMAGE_RENDITION_WIDTHS}
+    ):
+        if width == source.width:
+            yield width, source
+            continue
+        height = max(1, round(source.height * width / source.width))
+        yield (
+            width,
+            source.resize(
+                (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+            ),
+        )
+
+
+def render(recipe) -> bool:
+    """Make whatever renditions of a recipe's image are missing, & list them
+    on the recipe, unsaved. Return whether there were any to list.
+
+    Raise OSError if the image can't be read.
+    """
+    if not recipe.image or is_rendered(recipe):
+        return False
+    name, storage = recipe.image.name, recipe.image.storage
+    with storage.open(name, "rb") as file:
+        source = upright(Image.open(file))
+    formats: dict[str, list[int]] = {}
+    for width, image in scaled(source):
+        for media_type, fmt in FORMATS:
+            rendition = rendition_name(name, width, media_type)
+            # Made already, e.g. by a run cut short
+            if not storage.exists(rendition):
+                storage.save(rendition, ContentFile(encode(image, fmt)))
+            formats.setdefault(media_type, []).append(width)
+    recipe.renditions = {"source": name, "formats": formats}
+    return True
+
+
+def update_renditions(recipe) -> bool:
+    """render() & save the recipe, logging an image that can't be read
+    rather than raising, for `render_images` to go on."""
+    try:
+        if not render(recipe):
+            return False
+    except OSError:
+        logger.exception("The image of recipe %s won't render", recipe.pk)
+        return False
+    recipe.save(update_fields=("renditions",))
+    return True
+
+
+def image_srcset(recipe) -> dict[str, str]:
+    """Map the media types rendered to a srcset of their renditions, e.g.
+    {"image/webp": "/media/recipes/renditions/a-80w.webp 80w, ..."}."""
+    renditions = recipe.renditions
+    if not recipe.image or renditions.get("source") != recipe.image.name:
+        return {}
+    name, storage = recipe.image.name, recipe.image.storage
+    return {
+        media_type: ", ".join(
+            f"{storage.url(rendition_name(name, width, media_type))} {width}w"
+            for width in widths
+        )
+        for media_type, widths in renditions["formats"].items()
+    }
+
+
+def absolute_srcset(srcset: dict[str, str], build_absolute_uri) -> dict:
+    """Make the urls of an image_srcset() absolute, e.g. with a request's
+    build_absolute_uri()."""
+    return {
+        media_type: ", ".join(
+            f"{build_absolute_uri(url)} {descriptor}"
+            for url, descriptor in (
+                candidate.rsplit(" ", 1) for candidate in value.split(", ")
+            )
+        )
+        for media_type, value in srcset.items()
+    }
+
+
+def release_image(name: str, renditions: dict) -> None:
+    """Delete an image & its renditions, unless a recipe, or an image job,
+    still refers to it, the files being shared by the same images."""
+    from .models import ImageJob, Recipe
+    from .storage import lock_name
+
+    if not name:
+        return
+    with transaction.atomic():
+        # Waits for a transaction saving the same file to commit, if any
+        lock_name(name)
+        if (
+            Recipe.objects.filter(image=name).exists()
+            or ImageJob.objects.filter(source=name).exists()
+        ):
+            return
+        storage = Recipe._meta.get_field("image").storage
+        storage.delete(name)
+        if renditions.get("source") == name:
+            for media_type, widths in renditions["formats"].items():
+                for width in widths:
+                    storage.delete(rendition_name(name, width, media_type))
+
+
+def thumbnail_url(recipe) -> str:
+    """The url of the WebP rendition nearest IMAGE_THUMB_WIDTH wide, else
+    of the image itself."""
+    renditions = recipe.renditions
+    widths = renditions.get("formats", {}).get("image/webp")
+    if widths and renditions.get("source") == recipe.image.name:
+        width = min(widths, key=lambda w: abs(w - IMAGE_THUMB_WIDTH))
+        return recipe.image.storage.url(
+            rendition_name(recipe.image.name, width, "image/webp")
+        )
+    return recipe.image.url
@@ -0,0 +1,65 @@
+"""The media storage, naming the files it saves by their content.
+
+A file is saved as <dir>/ab/cd/<sha256 of it>.<ext>, so that the same image
+uploaded twice is stored once, for both recipes to share, & a name never has
+other bytes put behind it, for the browsers to cache it for good. The files
+made out of another, such as the image renditions, are saved in a directory
+named in `DERIVED_DIRS`, under the name given: theirs derives from their
+source's already.
+
+A file shared is only deleted once no recipe refers to it any more, see
+`recipes.renditions.release_image()`. A save finding the file there already
+& a release both lock its name till their transaction ends, for no file to
+be deleted while a recipe is coming to refer to it.
+"""
+
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+
+DERIVED_DIRS = frozenset(("renditions",))
+
+
+def content_name(name: str, content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, filename = posixpath.split(name)
+    extension = posixpath.splitext(filename)[1].lower()
+    key = digest.hexdigest()
+    return posixpath.join(directory, key[:2], key[2:4], key + extension)
+
+
+def lock_name(name: str) -> None:
+    """Lock a stored name till the end of the transaction, so to be taken
+    in the one committing the reference to it."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            key = hashlib.sha256(name.encode()).digest()[:8]
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s)",
+                [int.from_bytes(key, "big", signed=True)],
+            )
+        elif connection.vendor == "sqlite":
+            # A write, if of no row, takes the database lock till the commit
+            cursor.execute(
+                "UPDATE django_content_type SET id = id WHERE 0 = 1"
+            )
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        if DERIVED_DIRS.isdisjoint(posixpath.dirname(name).split("/")):
+            name = content_name(name, content)
+            lock_name(name)
+            if self.exists(name):
+                return name
+        return super().save(name, content, max_length)
@@ -1,14 +1,18 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
 
 from backend.constants import (
+    MIN_COOKING_TIME_MINS,
     PAGINATOR_NUM,
     TEST_LIMIT_LIST_USERS,
     TEST_NUM_TAGS,
     TEST_NUM_USERS,
     TEST_SERVER_URL,
+    TEST_USER_DATA,
+    TEST_USER_DATA_2,
 )
-from recipes.models import Tag
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 
 
 @pytest.fixture(scope="function")
@@ -91,3 +95,83 @@ def create_test_tags():
         test_tags.append(tag)
     Tag.objects.bulk_create(test_tags)
     return Tag.objects.all()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """The ids in the cached flags & versions get reused from test to test."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(**TEST_USER_DATA)
+
+
+@pytest.fixture
+def reader(django_user_model):
+    return django_user_model.objects.create_user(**TEST_USER_DATA_2)
+
+
+@pytest.fixture
+def reader_client(reader) -> APIClient:
+    client = APIClient()
+    client.force_authenticate(reader)
+    return client
+
+
+@pytest.fixture
+def create_test_ingredients():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"Ingredient{index}", measurement_unit="g")
+        for index in range(1, TEST_NUM_TAGS * 2 + 1)
+    )
+    return Ingredient.objects.all()
+
+
+@pytest.fixture
+def create_test_recipes(author, create_test_tags, create_test_ingredients):
+    recipes = []
+    for index in range(1, TEST_NUM_TAGS + 1):
+        recipe = Recipe.objects.create(
+            name=f"Recipe{index}",
+            image="recipes/test.png",
+            text=f"Cook it {index} times.",
+            cooking_time=MIN_COOKING_TIME_MINS + index,
+            author=author,
+        )
+        recipe.tags.set(create_test_tags[:index])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in create_test_ingredients[index : index * 2]
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def recipe_payload(create_test_tags, create_test_ingredients) -> dict:
+    return {
+        "name": "TestMe recipe",
+        "image": (
+            "data:image/png;base64,"
+            "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///"
+            "9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggC"
+            "ByxOyYQAAAABJRU5ErkJggg=="
+        ),
+        "cooking_time": MIN_COOKING_TIME_MINS,
+        "text": "Instructions to cook go here.",
+        "tags": [tag.id for tag in create_test_tags[:2]],
+        "ingredients": [
+            {"id": ingredient.id, "amount": 5}
+            for ingredient in create_test_ingredients[:2]
+        ],
+    }
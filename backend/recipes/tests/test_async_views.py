@@ -0,0 +1,123 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from backend.constants import (
+    TEST_INGREDIENT_PAGE_URL,
+    TEST_RECIPE_PAGE_URL,
+    TEST_TAG_PAGE_URL,
+    TEST_USERS_PAGE_URL,
+)
+from recipes.models import Favorite
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+def as_async(url):
+    return url.replace("/api/", "/api/async/", 1)
+
+
+def assert_same(client, url, **params):
+    """The async view answers as the sync one does, bar the page links."""
+    expected = client.get(url, params)
+    response = client.get(as_async(url), params)
+    assert response.status_code == expected.status_code
+    assert response["Content-Type"] == expected["Content-Type"]
+    assert response.get("ETag") == expected.get("ETag")
+    assert response.get("Last-Modified") == expected.get("Last-Modified")
+    data, expected = response.json(), expected.json()
+    if isinstance(data, dict):
+        for link in ("next", "previous"):
+            assert (data.pop(link, None) is None) == (
+                expected.pop(link, None) is None
+            )
+    assert data == expected
+    return response
+
+
+@pytest.fixture
+def token_client(reader):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=reader).key}"
+    )
+    return client
+
+
+def test_recipes_are_read_alike(
+    client, token_client, reader, author, create_test_recipes, create_test_tags
+):
+    first, second, _ = create_test_recipes
+    Favorite.objects.create(user=reader, recipe=second)
+    Subscription.objects.create(user=reader, author=author)
+    for params in (
+        {},
+        {"limit": 2, "page": 2},
+        {"tags": create_test_tags[1].slug, "is_favorited": 1},
+        {"fields": "id,name"},
+    ):
+        assert_same(client, TEST_RECIPE_PAGE_URL, **params)
+        assert_same(token_client, TEST_RECIPE_PAGE_URL, **params)
+    assert_same(token_client, f"{TEST_RECIPE_PAGE_URL}{second.id}/")
+    assert_same(client, f"{TEST_RECIPE_PAGE_URL}0/")
+    assert_same(client, TEST_RECIPE_PAGE_URL, page=9)
+
+
+def test_conditional_gets_are_answered_alike(
+    client, token_client, create_test_recipes
+):
+    recipe = create_test_recipes[0]
+    for test_client, url in (
+        (client, TEST_RECIPE_PAGE_URL),
+        (token_client, TEST_RECIPE_PAGE_URL),
+        (token_client, f"{TEST_RECIPE_PAGE_URL}{recipe.id}/"),
+        (client, TEST_TAG_PAGE_URL),
+        (client, TEST_INGREDIENT_PAGE_URL),
+    ):
+        etag = assert_same(test_client, url)["ETag"]
+        response = test_client.get(as_async(url), HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response["ETag"] == etag
+
+
+def test_recipes_page_by_cursor(token_client, create_test_recipes):
+    third, second, first = reversed(create_test_recipes)
+    url = as_async(TEST_RECIPE_PAGE_URL)
+    response = token_client.get(url, {"pagination": "cursor", "limit": 2})
+    assert [recipe["id"] for recipe in response.json()["results"]] == [
+        third.id,
+        second.id,
+    ]
+    next_page = token_client.get(response.json()["next"]).json()
+    assert [recipe["id"] for recipe in next_page["results"]] == [first.id]
+    assert next_page["next"] is None
+
+
+def test_tags_and_ingredients_are_read_alike(
+    client, create_test_tags, create_test_ingredients
+):
+    assert_same(client, TEST_TAG_PAGE_URL)
+    assert_same(client, TEST_TAG_PAGE_URL, slug=create_test_tags[0].slug)
+    assert_same(client, TEST_INGREDIENT_PAGE_URL)
+    assert_same(client, TEST_INGREDIENT_PAGE_URL, name="Ingredient1")
+
+
+def test_subscriptions_are_read_alike(
+    client, token_client, reader, author, create_test_recipes
+):
+    Subscription.objects.create(user=reader, author=author)
+    url = f"{TEST_USERS_PAGE_URL}subscriptions/"
+    assert_same(token_client, url)
+    assert_same(token_client, url, recipes_limit=1)
+    assert assert_same(client, url).status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_a_bad_token_is_refused(create_test_recipes):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Token nonsense")
+    assert_same(client, TEST_RECIPE_PAGE_URL)
+    response = client.get(as_async(TEST_RECIPE_PAGE_URL))
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
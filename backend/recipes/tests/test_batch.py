@@ -0,0 +1,53 @@
+from http import HTTPStatus
+
+import pytest
+
+from backend.constants import MAX_BATCH_RECIPES, TEST_RECIPE_PAGE_URL
+
+BATCH_URL = f"{TEST_RECIPE_PAGE_URL}batch/"
+
+
+@pytest.mark.django_db
+def test_batch_keeps_the_order_and_lists_the_missing(
+    reader_client, create_test_recipes, django_assert_num_queries
+):
+    first, second, third = create_test_recipes
+    reader_client.post(f"{TEST_RECIPE_PAGE_URL}{second.id}/favorite/")
+    gone = max(recipe.id for recipe in create_test_recipes) + 1
+    ids = f"{third.id},{gone},{first.id},{second.id},{first.id}"
+
+    response = reader_client.get(BATCH_URL, {"ids": ids})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert [recipe["id"] for recipe in data["results"]] == [
+        third.id,
+        first.id,
+        second.id,
+    ]
+    assert [recipe["is_favorited"] for recipe in data["results"]] == [
+        False,
+        False,
+        True,
+    ]
+    assert data["missing"] == [gone]
+    assert data["results"][0] == (
+        reader_client.get(f"{TEST_RECIPE_PAGE_URL}{third.id}/").json()
+    )
+
+    # Just the cards, however many recipes
+    with django_assert_num_queries(1):
+        reader_client.get(BATCH_URL, {"ids": ids})
+
+
+@pytest.mark.django_db
+def test_batch_validates_the_ids(client):
+    for ids in (
+        "",
+        "1,two",
+        "1,0",
+        "-1",
+        str(2**63),
+        ",".join(map(str, range(1, MAX_BATCH_RECIPES + 2))),
+    ):
+        response = client.get(BATCH_URL, {"ids": ids})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, ids
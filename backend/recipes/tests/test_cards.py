@@ -0,0 +1,72 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.serializers import RecipeSerializer
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Recipe, RecipeCard
+
+
+@pytest.mark.django_db
+def test_cards_render_as_the_serializer(client, create_test_recipes):
+    response = client.get(TEST_RECIPE_PAGE_URL)
+    assert response.status_code == HTTPStatus.OK
+    assert RecipeCard.objects.count() == len(create_test_recipes)
+
+    request = APIRequestFactory().get(TEST_RECIPE_PAGE_URL)
+    expected = RecipeSerializer(
+        Recipe.objects.all(), many=True, context={"request": request}
+    ).data
+    assert response.json()["results"] == expected
+
+
+@pytest.mark.django_db
+def test_cards_list_is_one_select(
+    client, create_test_recipes, django_assert_num_queries
+):
+    client.get(TEST_RECIPE_PAGE_URL)
+    # COUNT(*) & the cards
+    with django_assert_num_queries(2):
+        client.get(TEST_RECIPE_PAGE_URL)
+
+
+@pytest.mark.django_db
+def test_cards_follow_tag_and_author_edits(
+    client, author, create_test_recipes, create_test_tags
+):
+    client.get(TEST_RECIPE_PAGE_URL)
+    tag = create_test_tags[0]
+    tag.name = "Renamed"
+    tag.save()
+    author.first_name = "Renamed"
+    author.save()
+
+    for recipe in client.get(TEST_RECIPE_PAGE_URL).json()["results"]:
+        assert recipe["author"]["first_name"] == "Renamed"
+        assert recipe["tags"][0]["name"] == "Renamed"
+
+
+@pytest.mark.django_db
+def test_card_rebuilt_on_write(
+    media_root, author, recipe_payload, create_test_tags
+):
+    client = APIClient()
+    client.force_authenticate(author)
+    response = client.post(TEST_RECIPE_PAGE_URL, recipe_payload, format="json")
+    assert response.status_code == HTTPStatus.CREATED
+    recipe_id = response.json()["id"]
+    assert RecipeCard.objects.filter(recipe_id=recipe_id).exists()
+
+    recipe_payload["tags"] = [create_test_tags[2].id]
+    response = client.patch(
+        f"{TEST_RECIPE_PAGE_URL}{recipe_id}/", recipe_payload, format="json"
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert [tag["id"] for tag in response.json()["tags"]] == [
+        create_test_tags[2].id
+    ]
+    assert (
+        client.get(f"{TEST_RECIPE_PAGE_URL}{recipe_id}/").json()
+        == response.json()
+    )
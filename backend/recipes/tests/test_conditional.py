@@ -0,0 +1,65 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+
+from api.querybudget import assert_max_queries
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Tag
+
+
+@pytest.mark.django_db
+def test_recipe_list_revalidates_without_queries(client, create_test_recipes):
+    response = client.get(TEST_RECIPE_PAGE_URL)
+    assert response.status_code == HTTPStatus.OK
+    etag = response["ETag"]
+    assert response["Last-Modified"]
+    assert "no-cache" in response["Cache-Control"]
+
+    with assert_max_queries(0):
+        response = client.get(TEST_RECIPE_PAGE_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response["ETag"] == etag
+
+    tag = Tag.objects.first()
+    tag.name = "renamed"
+    tag.save()
+    response = client.get(TEST_RECIPE_PAGE_URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_recipe_etag_follows_user_flags(reader_client, create_test_recipes):
+    recipe = create_test_recipes[0]
+    url = f"{TEST_RECIPE_PAGE_URL}{recipe.id}/"
+    response = reader_client.get(url)
+    etag = response["ETag"]
+    assert "private" in response["Cache-Control"]
+    assert "Authorization" in response["Vary"]
+    assert (
+        reader_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+        == HTTPStatus.NOT_MODIFIED
+    )
+
+    reader_client.post(f"{url}favorite/")
+    response = reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["is_favorited"] is True
+
+
+@pytest.mark.django_db
+def test_versions_are_kept_in_a_shared_cache(settings):
+    settings.DEBUG = False
+    with pytest.raises(SystemCheckError, match="api.E001"):
+        call_command("check", tags=["caches"], stdout=StringIO())
+
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://redis:6379/1",
+        }
+    }
+    call_command("check", tags=["caches"], stdout=StringIO())
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from api import fastpath
+from api.serializers import (
+    AbridgedRecipeSerializer,
+    IngredientSerializer,
+    RecipeSerializer,
+    TagSerializer,
+)
+from backend.constants import (
+    TEST_INGREDIENT_PAGE_URL,
+    TEST_RECIPE_PAGE_URL,
+    TEST_TAG_PAGE_URL,
+)
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+
+
+def as_json(data):
+    return json.dumps(data, ensure_ascii=False).encode()
+
+
+@pytest.mark.parametrize(
+    "serializer_class, queryset",
+    (
+        (TagSerializer, Tag.objects.all()),
+        (IngredientSerializer, Ingredient.objects.all()),
+        (AbridgedRecipeSerializer, Recipe.objects.all()),
+        (
+            RecipeSerializer,
+            Recipe.objects.select_related("author").prefetch_related(
+                "tags", "recipe_ingredient__ingredient"
+            ),
+        ),
+    ),
+)
+@pytest.mark.django_db
+def test_fast_render_is_byte_identical(
+    serializer_class, queryset, reader, create_test_recipes
+):
+    ShoppingCart.objects.create(user=reader, recipe=create_test_recipes[0])
+    request = APIRequestFactory().get(TEST_RECIPE_PAGE_URL)
+    request.user = reader
+    context = {"request": request}
+
+    expected = serializer_class(
+        queryset.all(), many=True, context=dict(context)
+    ).data
+    fast = fastpath.render(
+        serializer_class, queryset.all(), dict(context), many=True
+    )
+    assert as_json(fast) == as_json(expected)
+    assert as_json(
+        fastpath.render(serializer_class, queryset.first(), dict(context))
+    ) == as_json(serializer_class(queryset.first(), context=context).data)
+
+
+@pytest.mark.django_db
+def test_fast_list_serializer_is_opt_in(settings, client, create_test_recipes):
+    urls = (TEST_TAG_PAGE_URL, TEST_INGREDIENT_PAGE_URL)
+    settings.API_FAST_SERIALIZERS = False
+    expected = [client.get(url).content for url in urls]
+    settings.API_FAST_SERIALIZERS = True
+    assert [client.get(url).content for url in urls] == expected
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from backend.constants import TEST_RECIPE_PAGE_URL, TEST_USERS_PAGE_URL
+from recipes.models import FeedEntry
+from users.models import Subscription
+
+FEED_URL = f"{TEST_RECIPE_PAGE_URL}feed/"
+
+
+def feed_ids(client, url=FEED_URL, **params):
+    response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK
+    return [recipe["id"] for recipe in response.json()["results"]]
+
+
+def subscribe_url(author):
+    return f"{TEST_USERS_PAGE_URL}{author.id}/subscribe/"
+
+
+@pytest.mark.django_db
+def test_feed_is_written_on_subscribe_and_publish(
+    reader,
+    reader_client,
+    author,
+    create_test_recipes,
+    recipe_payload,
+    media_root,
+):
+    first, second, third = create_test_recipes
+    assert feed_ids(reader_client) == []
+
+    reader_client.post(subscribe_url(author))
+    assert feed_ids(reader_client) == [third.id, second.id, first.id]
+
+    author_client = APIClient()
+    author_client.force_authenticate(author)
+    response = author_client.post(
+        TEST_RECIPE_PAGE_URL, recipe_payload, format="json"
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    latest = response.json()["id"]
+    assert FeedEntry.objects.filter(user=reader, recipe_id=latest).exists()
+    feed = reader_client.get(FEED_URL).json()["results"]
+    assert [recipe["id"] for recipe in feed][:2] == [latest, third.id]
+    assert (
+        feed[1]
+        == reader_client.get(f"{TEST_RECIPE_PAGE_URL}{third.id}/").json()
+    )
+
+    reader_client.delete(subscribe_url(author))
+    assert feed_ids(reader_client) == []
+    assert not FeedEntry.objects.filter(user=reader).exists()
+
+
+@pytest.mark.django_db
+def test_feed_is_cleared_however_a_subscription_goes(
+    reader, reader_client, author, create_test_recipes
+):
+    reader_client.post(subscribe_url(author))
+    assert FeedEntry.objects.filter(user=reader).exists()
+
+    # As in the admin
+    Subscription.objects.filter(user=reader, author=author).delete()
+    assert not FeedEntry.objects.filter(user=reader).exists()
+    assert feed_ids(reader_client) == []
+
+
+@pytest.mark.django_db
+def test_feed_pulls_in_authors_of_many_followers(
+    monkeypatch, reader_client, author, create_test_recipes
+):
+    monkeypatch.setattr("api.feed.FEED_FANOUT_MAX_FOLLOWERS", 0)
+    first, second, third = create_test_recipes
+    reader_client.post(subscribe_url(author))
+    assert not FeedEntry.objects.exists()
+
+    response = reader_client.get(FEED_URL, {"limit": 2}).json()
+    assert [recipe["id"] for recipe in response["results"]] == [
+        third.id,
+        second.id,
+    ]
+    assert feed_ids(reader_client, response["next"]) == [first.id]
+
+
+@pytest.mark.django_db
+def test_feed_merges_timeline_and_pulled_recipes(
+    monkeypatch,
+    reader_client,
+    author,
+    create_test_recipes,
+    django_assert_max_num_queries,
+):
+    first, second, third = create_test_recipes
+    reader_client.post(subscribe_url(author))
+    # Gone past the limit since, with the timeline written already
+    monkeypatch.setattr("api.feed.FEED_FANOUT_MAX_FOLLOWERS", 0)
+
+    response = reader_client.get(FEED_URL, {"limit": 2}).json()
+    assert feed_ids(reader_client, response["next"]) == [first.id]
+    previous = reader_client.get(response["next"]).json()["previous"]
+    assert feed_ids(reader_client, previous) == [third.id, second.id]
+
+    with django_assert_max_num_queries(3):
+        reader_client.get(FEED_URL)
+
+
+@pytest.mark.django_db
+def test_feed_is_for_users_only(client):
+    assert client.get(FEED_URL).status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,45 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+
+
+@pytest.mark.django_db
+def test_fields_trim_the_json_and_the_query(client, create_test_recipes):
+    full = client.get(TEST_RECIPE_PAGE_URL).json()["results"]
+    fields = ("id", "name", "image", "cooking_time", "is_favorited")
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            TEST_RECIPE_PAGE_URL, {"fields": ",".join(reversed(fields))}
+        )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["results"] == [
+        {name: recipe[name] for name in fields} for recipe in full
+    ]
+    # COUNT(*) & the recipes, with no card & no text
+    assert len(queries) == 2
+    assert "recipecard" not in queries[1]["sql"]
+    assert '"text"' not in queries[1]["sql"]
+
+
+@pytest.mark.django_db
+def test_omit_keeps_the_rest_off_the_cards(client, create_test_recipes):
+    recipe = create_test_recipes[0]
+    url = f"{TEST_RECIPE_PAGE_URL}{recipe.id}/"
+    full = client.get(url).json()
+    response = client.get(url, {"omit": "text,ingredients"})
+    assert response.json() == {
+        name: value
+        for name, value in full.items()
+        if name not in ("text", "ingredients")
+    }
+
+
+@pytest.mark.django_db
+def test_unknown_fields_are_rejected(client, create_test_recipes):
+    response = client.get(TEST_RECIPE_PAGE_URL, {"fields": "id,calories"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert "calories" in response.json()["fields"][0]
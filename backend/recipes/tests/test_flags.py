@@ -0,0 +1,45 @@
+from http import HTTPStatus
+
+import pytest
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Favorite, ShoppingCart
+
+
+def flags_by_id(response):
+    return {
+        recipe["id"]: (recipe["is_favorited"], recipe["is_in_shopping_cart"])
+        for recipe in response.json()["results"]
+    }
+
+
+@pytest.mark.django_db
+def test_anonymous_flags_are_false(client, create_test_recipes):
+    response = client.get(TEST_RECIPE_PAGE_URL)
+    assert response.status_code == HTTPStatus.OK
+    assert set(flags_by_id(response).values()) == {(False, False)}
+
+
+@pytest.mark.django_db
+def test_flags_follow_favorite_and_cart_writes(
+    reader, reader_client, create_test_recipes
+):
+    first, second, _ = create_test_recipes
+    assert set(
+        flags_by_id(reader_client.get(TEST_RECIPE_PAGE_URL)).values()
+    ) == {(False, False)}
+
+    reader_client.post(f"{TEST_RECIPE_PAGE_URL}{first.id}/favorite/")
+    ShoppingCart.objects.create(user=reader, recipe=second)
+    flags = flags_by_id(reader_client.get(TEST_RECIPE_PAGE_URL))
+    assert flags[first.id] == (True, False)
+    assert flags[second.id] == (False, True)
+
+    Favorite.objects.filter(user=reader).delete()
+    flags = flags_by_id(reader_client.get(TEST_RECIPE_PAGE_URL))
+    assert flags[first.id] == (False, False)
+
+    response = reader_client.get(
+        TEST_RECIPE_PAGE_URL + "?is_in_shopping_cart=1"
+    )
+    assert list(flags_by_id(response)) == [second.id]
@@ -0,0 +1,148 @@
+import base64
+from http import HTTPStatus
+from io import BytesIO, StringIO
+
+import pytest
+from django.contrib import admin
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+
+from api.serializers import RecipeWriteSerializer
+from backend.constants import IMAGE_JOB_MAX_ATTEMPTS, TEST_RECIPE_PAGE_URL
+from recipes.jobs import PLACEHOLDER_SIZE
+from recipes.models import ImageJob, Recipe
+
+pytestmark = pytest.mark.django_db
+
+ORIENTATION, ARTIST = 0x0112, 0x013B
+
+
+def process_images(*args):
+    out = StringIO()
+    call_command("process_images", *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.fixture
+def photo_payload(recipe_payload):
+    """A JPEG taken on its side, as the EXIF says, & signed."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[ARTIST] = "Somebody"
+    buffer = BytesIO()
+    Image.new("RGB", (40, 20), "orange").save(buffer, "JPEG", exif=exif)
+    recipe_payload["image"] = "data:image/jpeg;base64," + (
+        base64.b64encode(buffer.getvalue()).decode()
+    )
+    return recipe_payload
+
+
+@pytest.fixture
+def posted_recipe(author, reader_client, media_root, photo_payload):
+    reader_client.force_authenticate(author)
+    response = reader_client.post(
+        TEST_RECIPE_PAGE_URL, photo_payload, format="json"
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()["image_status"] == "pending"
+    return Recipe.objects.get(id=response.json()["id"])
+
+
+def test_an_image_is_processed_off_the_request(reader_client, posted_recipe):
+    with Image.open(posted_recipe.image) as image:
+        assert image.size == PLACEHOLDER_SIZE
+    assert ImageJob.objects.get(recipe=posted_recipe).status == "pending"
+
+    assert process_images("--workers", "2") == (
+        "1 images processed, 0 attempts failed.\n"
+    )
+    posted_recipe.refresh_from_db()
+    assert posted_recipe.image_status == "ready"
+    assert posted_recipe.image.name.endswith(".jpg")
+    with Image.open(posted_recipe.image) as image:
+        # Turned upright, & no EXIF left
+        assert image.size == (20, 40)
+        assert not image.getexif()
+    job = ImageJob.objects.get(recipe=posted_recipe)
+    assert (job.status, job.source, job.attempts) == ("done", "", 1)
+    data = reader_client.get(
+        f"{TEST_RECIPE_PAGE_URL}{posted_recipe.id}/"
+    ).json()
+    assert data["image_status"] == "ready"
+    assert data["image"].endswith(posted_recipe.image.url)
+
+
+def test_a_failing_job_is_retried(monkeypatch, posted_recipe):
+    def broken(data):
+        raise OSError("broken")
+
+    monkeypatch.setattr("recipes.jobs.process", broken)
+    assert process_images() == (
+        f"0 images processed, {IMAGE_JOB_MAX_ATTEMPTS} attempts failed.\n"
+    )
+    job = ImageJob.objects.get(recipe=posted_recipe)
+    assert (job.status, job.attempts) == ("failed", IMAGE_JOB_MAX_ATTEMPTS)
+    assert "broken" in job.error
+    posted_recipe.refresh_from_db()
+    assert posted_recipe.image_status == "failed"
+    assert process_images() == "0 images processed, 0 attempts failed.\n"
+
+    monkeypatch.undo()
+    assert process_images("--retry") == (
+        "1 images requeued.\n1 images processed, 0 attempts failed.\n"
+    )
+    posted_recipe.refresh_from_db()
+    assert posted_recipe.image_status == "ready"
+
+
+def test_an_edit_keeps_the_image_swapped_in_meanwhile(
+    rf,
+    admin_user,
+    photo_payload,
+    posted_recipe,
+    django_capture_on_commit_callbacks,
+):
+    # Read as an edit starts, before the job is done
+    read_by_api, read_by_admin = (
+        Recipe.objects.get(pk=posted_recipe.pk) for _ in range(2)
+    )
+    process_images()
+    done = Recipe.objects.get(pk=posted_recipe.pk)
+
+    del photo_payload["image"]
+    serializer = RecipeWriteSerializer(
+        read_by_api,
+        data={**photo_payload, "text": "Edited"},
+        partial=True,
+        context={"request": None},
+    )
+    serializer.is_valid(raise_exception=True)
+    with django_capture_on_commit_callbacks(execute=True):
+        serializer.save()
+
+    model_admin = admin.site._registry[Recipe]
+    request = rf.post("/")
+    request.user = admin_user
+    form = model_admin.get_form(request, read_by_admin, change=True)(
+        {
+            "name": done.name,
+            "text": "Edited in the admin",
+            "cooking_time": done.cooking_time,
+            "author": done.author_id,
+            "tags": photo_payload["tags"],
+        },
+        instance=read_by_admin,
+    )
+    assert form.is_valid(), form.errors
+    with django_capture_on_commit_callbacks(execute=True):
+        model_admin.save_model(request, form.save(commit=False), form, True)
+
+    recipe = Recipe.objects.get(pk=posted_recipe.pk)
+    assert recipe.text == "Edited in the admin"
+    assert (recipe.image, recipe.renditions, recipe.image_status) == (
+        done.image,
+        done.renditions,
+        "ready",
+    )
+    assert default_storage.exists(recipe.image.name)
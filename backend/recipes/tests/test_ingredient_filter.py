@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.ingredient_index import INDEXES, ingredient_index
+from api.versions import get_version
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import RecipeIngredient
+
+
+def found_ids(client, **params):
+    response = client.get(
+        TEST_RECIPE_PAGE_URL,
+        {name: ",".join(map(str, ids)) for name, ids in params.items()},
+    )
+    assert response.status_code == HTTPStatus.OK
+    return {recipe["id"] for recipe in response.json()["results"]}
+
+
+@pytest.mark.django_db
+def test_include_and_exclude_ingredients(
+    client, create_test_ingredients, create_test_recipes
+):
+    first, second, third = create_test_recipes
+    ingredients = [ingredient.id for ingredient in create_test_ingredients]
+    # The recipes have ingredients [1], [2, 3] & [3, 4, 5]
+    assert found_ids(client, ingredients=[ingredients[3]]) == {
+        second.id,
+        third.id,
+    }
+    assert found_ids(client, ingredients=ingredients[3:5]) == {third.id}
+    assert found_ids(client, exclude_ingredients=[ingredients[3]]) == {
+        first.id
+    }
+    assert found_ids(
+        client,
+        ingredients=[ingredients[3]],
+        exclude_ingredients=[ingredients[4]],
+    ) == {second.id}
+    assert found_ids(client, ingredients=[ingredients[0]]) == set()
+    # An empty include is no include
+    assert found_ids(
+        client, ingredients=[], exclude_ingredients=[ingredients[3]]
+    ) == {first.id}
+
+
+@pytest.mark.django_db
+def test_index_follows_recipe_writes(
+    author,
+    media_root,
+    recipe_payload,
+    create_test_recipes,
+    django_capture_on_commit_callbacks,
+):
+    client = APIClient()
+    client.force_authenticate(author)
+    ingredient_id = recipe_payload["ingredients"][0]["id"]
+    assert found_ids(client, ingredients=[ingredient_id]) == set()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            TEST_RECIPE_PAGE_URL, recipe_payload, format="json"
+        )
+    recipe_id = response.json()["id"]
+    # Updated in place, rather than left to reload
+    assert ingredient_index.version == get_version(
+        ingredient_index.version_key
+    )
+    assert recipe_id in ingredient_index.recipes_with(ingredient_id)
+    assert found_ids(client, ingredients=[ingredient_id]) == {recipe_id}
+
+    RecipeIngredient.objects.filter(recipe_id=recipe_id).delete()
+    assert found_ids(client, ingredients=[ingredient_id]) == set()
+
+
+@pytest.mark.django_db
+def test_a_recipe_edit_reindexes_it_in_place(
+    author,
+    media_root,
+    recipe_payload,
+    create_test_recipes,
+    django_capture_on_commit_callbacks,
+):
+    client = APIClient()
+    client.force_authenticate(author)
+    recipe = create_test_recipes[0]
+    ingredient_id = recipe_payload["ingredients"][0]["id"]
+    for index in INDEXES:
+        index.load()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.patch(
+            f"{TEST_RECIPE_PAGE_URL}{recipe.id}/",
+            recipe_payload,
+            format="json",
+        )
+    assert response.status_code == HTTPStatus.OK
+    # The ingredients cleared on the way didn't make every index reload
+    for index in INDEXES:
+        assert index.version == get_version(index.version_key)
+    assert recipe.id in ingredient_index.recipes_with(ingredient_id)
+    assert found_ids(client, ingredients=[ingredient_id]) == {recipe.id}
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+import pytest
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import RecipeIngredient
+
+PANTRY_URL = f"{TEST_RECIPE_PAGE_URL}pantry/"
+
+
+@pytest.mark.django_db
+def test_pantry_ranks_by_coverage(
+    reader_client, create_test_ingredients, create_test_recipes
+):
+    first, second, third = create_test_recipes
+    ingredients = list(create_test_ingredients)
+    # The recipes have ingredients [1], [2, 3] & [3, 4, 5]
+    response = reader_client.post(
+        PANTRY_URL,
+        {"ingredients": [ingredients[3].id, ingredients[4].id]},
+        format="json",
+    )
+    assert response.status_code == HTTPStatus.OK
+    results = response.json()["results"]
+    assert [(item["id"], item["coverage"]) for item in results] == [
+        (third.id, 0.6667),
+        (second.id, 0.5),
+    ]
+    assert [item["name"] for item in results[0]["missing"]] == [
+        ingredients[5].name
+    ]
+    assert [item["name"] for item in results[1]["missing"]] == [
+        ingredients[2].name
+    ]
+
+
+@pytest.mark.django_db
+def test_pantry_follows_recipe_writes(
+    reader_client, create_test_ingredients, create_test_recipes
+):
+    first = create_test_recipes[0]
+    salt = create_test_ingredients[0]
+    pantry = {"ingredients": [salt.id]}
+    assert reader_client.post(PANTRY_URL, pantry).json()["count"] == 0
+
+    RecipeIngredient.objects.create(recipe=first, ingredient=salt, amount=1)
+    results = reader_client.post(PANTRY_URL, pantry).json()["results"]
+    assert [(item["id"], item["coverage"]) for item in results] == [
+        (first.id, 0.5)
+    ]
+
+
+@pytest.mark.django_db
+def test_pantry_leaves_deleted_recipes_out(
+    reader_client,
+    create_test_ingredients,
+    create_test_recipes,
+    django_capture_on_commit_callbacks,
+):
+    first, second, third = create_test_recipes
+    url = f"{PANTRY_URL}?limit=1"
+    pantry = {"ingredients": [create_test_ingredients[3].id]}
+    assert reader_client.post(url, pantry).json()["count"] == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        third.delete()
+    # Counted & paged with no room left for the one deleted
+    response = reader_client.post(url, pantry).json()
+    assert response["count"] == 1
+    assert [item["id"] for item in response["results"]] == [second.id]
+
+
+@pytest.mark.django_db
+def test_pantry_wants_ingredients(reader_client, client):
+    assert (
+        reader_client.post(
+            PANTRY_URL, {"ingredients": []}, format="json"
+        ).status_code
+        == HTTPStatus.BAD_REQUEST
+    )
+    assert client.post(PANTRY_URL).status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_pantry_folds_in_new_recipes(
+    author,
+    reader_client,
+    media_root,
+    recipe_payload,
+    create_test_recipes,
+    django_capture_on_commit_callbacks,
+    django_assert_num_queries,
+):
+    pantry = {
+        "ingredients": [item["id"] for item in recipe_payload["ingredients"]]
+    }
+    reader_client.post(PANTRY_URL, pantry, format="json")
+    reader_client.force_authenticate(author)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe_id = reader_client.post(
+            TEST_RECIPE_PAGE_URL, recipe_payload, format="json"
+        ).json()["id"]
+
+    # The recipes, their ingredients & those ingredients, with no reload
+    with django_assert_num_queries(3):
+        results = reader_client.post(PANTRY_URL, pantry, format="json")
+    assert results.json()["results"][0] == {
+        **results.json()["results"][0],
+        "id": recipe_id,
+        "coverage": 1.0,
+        "missing": [],
+    }
@@ -0,0 +1,99 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.serializers import RecipeWriteSerializer
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+def popular_ids(client, **params):
+    response = client.get(
+        TEST_RECIPE_PAGE_URL, {"ordering": "popular", **params}
+    )
+    assert response.status_code == HTTPStatus.OK
+    return [recipe["id"] for recipe in response.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_counters_follow_favorites_and_carts(
+    reader, reader_client, author, create_test_recipes
+):
+    first, second, third = create_test_recipes
+    url = f"{TEST_RECIPE_PAGE_URL}{second.id}/"
+    reader_client.post(f"{url}favorite/")
+    reader_client.post(f"{url}shopping_cart/")
+    Favorite.objects.create(user=author, recipe=first)
+    Recipe.objects.filter(pk=first.pk).count_on("favorites_count", 1)
+    second.refresh_from_db()
+    assert (second.favorites_count, second.in_carts_count) == (1, 1)
+
+    reader_client.post(f"{TEST_RECIPE_PAGE_URL}{first.id}/favorite/")
+    assert popular_ids(reader_client) == [first.id, second.id, third.id]
+
+    reader_client.delete(f"{url}shopping_cart/")
+    reader_client.delete(f"{TEST_RECIPE_PAGE_URL}{first.id}/favorite/")
+    reader_client.delete(f"{TEST_RECIPE_PAGE_URL}{first.id}/favorite/")
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.favorites_count, second.in_carts_count) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_popular_ordering_pages_by_cursor(client, create_test_recipes):
+    first, second, third = create_test_recipes
+    Recipe.objects.filter(pk=second.pk).update(favorites_count=5)
+    response = client.get(
+        TEST_RECIPE_PAGE_URL, {"ordering": "popular", "pagination": "cursor"}
+    ).json()
+    assert [recipe["id"] for recipe in response["results"]][0] == second.id
+    assert response["next"] is None
+
+
+@pytest.mark.django_db
+def test_reconcile_counters(reader, create_test_recipes):
+    first, second, _ = create_test_recipes
+    Favorite.objects.create(user=reader, recipe=first)
+    ShoppingCart.objects.create(user=reader, recipe=first)
+    Recipe.objects.filter(pk=second.pk).update(favorites_count=7)
+
+    call_command("reconcile_counters", stdout=StringIO())
+    assert list(
+        Recipe.objects.order_by("id").values_list(
+            "favorites_count", "in_carts_count"
+        )
+    ) == [(1, 1), (0, 0), (0, 0)]
+
+
+@pytest.mark.django_db
+def test_an_edit_keeps_the_counts_moved_meanwhile(
+    reader, author, create_test_recipes, recipe_payload
+):
+    recipe = create_test_recipes[0]
+    # Read as an edit starts, before the counters move
+    read_by_api, read_by_shell = (
+        Recipe.objects.get(pk=recipe.pk) for _ in range(2)
+    )
+    Recipe.objects.filter(pk=recipe.pk).count_on("favorites_count", 1)
+    Recipe.objects.filter(pk=recipe.pk).count_on("in_carts_count", 1)
+
+    del recipe_payload["image"]
+    serializer = RecipeWriteSerializer(
+        read_by_api,
+        data={**recipe_payload, "text": "Edited"},
+        partial=True,
+        context={"request": None},
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    recipe.refresh_from_db()
+    assert recipe.text == "Edited"
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+
+    read_by_shell.name = "Renamed"
+    read_by_shell.save()
+    recipe.refresh_from_db()
+    assert recipe.name == "Renamed"
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
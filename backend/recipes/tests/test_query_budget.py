@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import serializers
+
+from api.querybudget import QueryBudgetExceeded, assert_max_queries
+from backend.constants import (
+    TEST_INGREDIENT_PAGE_URL,
+    TEST_RECIPE_PAGE_URL,
+    TEST_TAG_PAGE_URL,
+    TEST_USERS_PAGE_URL,
+)
+from recipes.models import Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@pytest.fixture
+def raise_over_budget(settings):
+    settings.QUERY_BUDGET = {"MODE": "raise", "MAX_REPEATS": 2}
+
+
+@pytest.fixture
+def subscriptions(reader, create_test_recipes):
+    authors = []
+    for index in range(3):
+        author = User.objects.create_user(
+            email=f"author{index}@example.org",
+            username=f"author{index}",
+            first_name="Author",
+            last_name=f"{index}",
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                name=f"{author.username} recipe {number}",
+                image="recipes/test.png",
+                text="Cook it.",
+                cooking_time=number + 1,
+                author=author,
+            )
+            for number in range(3)
+        )
+        Subscription.objects.create(user=reader, author=author)
+        authors.append(author)
+    return authors
+
+
+@pytest.mark.django_db
+def test_views_stay_within_budget(
+    raise_over_budget, reader_client, subscriptions, create_test_recipes
+):
+    recipe_id = create_test_recipes[0].id
+    urls = (
+        TEST_RECIPE_PAGE_URL,
+        TEST_RECIPE_PAGE_URL,
+        f"{TEST_RECIPE_PAGE_URL}{recipe_id}/",
+        TEST_TAG_PAGE_URL,
+        TEST_INGREDIENT_PAGE_URL,
+        TEST_USERS_PAGE_URL,
+        f"{TEST_USERS_PAGE_URL}subscriptions/?recipes_limit=2",
+    )
+    for url in urls:
+        response = reader_client.get(url)
+        assert response.status_code == HTTPStatus.OK, url
+
+    results = response.json()["results"]
+    assert [user["recipes_count"] for user in results] == [3, 3, 3]
+    assert {len(user["recipes"]) for user in results} == {2}
+    assert {user["is_subscribed"] for user in results} == {True}
+
+
+@pytest.mark.django_db
+def test_repeated_queries_name_the_field(subscriptions):
+    class ProbeSerializer(serializers.Serializer):
+        recipes_count = serializers.SerializerMethodField()
+
+        def get_recipes_count(self, obj):
+            return obj.recipes.count()
+
+    with pytest.raises(QueryBudgetExceeded, match="get_recipes_count"):
+        with assert_max_queries(max_repeats=2):
+            ProbeSerializer(subscriptions, many=True).data
+
+    with pytest.raises(QueryBudgetExceeded, match="budget of 1"):
+        with assert_max_queries(budget=1):
+            list(User.objects.all())
+            list(Recipe.objects.all())
@@ -0,0 +1,73 @@
+import datetime
+import decimal
+import io
+
+import pytest
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from api import renderers
+from api.renderers import FastJSONParser, FastJSONRenderer
+
+# For the autouse tag fixture
+pytestmark = pytest.mark.django_db
+
+DATA = ReturnList(
+    [
+        ReturnDict(
+            {
+                "detail": _("Not found."),
+                "price": decimal.Decimal("1.50"),
+                "at": datetime.datetime(
+                    2024,
+                    5,
+                    1,
+                    12,
+                    30,
+                    15,
+                    250000,
+                    tzinfo=datetime.timezone.utc,
+                ),
+                "on": datetime.date(2024, 5, 1),
+                "name": "Борщ ",
+                1: ["int key"],
+            },
+            serializer=None,
+        )
+    ],
+    serializer=None,
+)
+
+
+@pytest.mark.parametrize("media_type", (None, "application/json; indent=2"))
+def test_renders_as_drf_does(media_type):
+    assert FastJSONRenderer().render(DATA, media_type) == (
+        JSONRenderer().render(DATA, media_type)
+    )
+
+
+def test_renders_a_nan_as_null_where_drf_raises():
+    data = {"score": float("nan")}
+    assert FastJSONRenderer().render(data) == b'{"score":null}'
+    with pytest.raises(ValueError):
+        JSONRenderer().render(data)
+
+
+def test_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(renderers, "orjson", None)
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+    stream = io.BytesIO(b'{"ingredients": [1, 2]}')
+    assert FastJSONParser().parse(stream) == {"ingredients": [1, 2]}
+
+
+def test_parses_as_drf_does():
+    payload = '{"name": "Борщ", "amount": 1.5, "tags": [1, 2]}'.encode()
+    assert FastJSONParser().parse(io.BytesIO(payload)) == (
+        JSONParser().parse(io.BytesIO(payload))
+    )
+    for malformed in (b"{", b'{"amount": NaN}'):
+        with pytest.raises(ParseError):
+            FastJSONParser().parse(io.BytesIO(malformed))
@@ -0,0 +1,68 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.contrib import admin
+from django.core.management import call_command
+from PIL import Image
+
+from backend.constants import TEST_RECIPE_PAGE_URL, TEST_SERVER_URL
+from recipes.models import Recipe
+from recipes.renditions import FORMATS
+
+pytestmark = pytest.mark.django_db
+
+
+def render_images():
+    out = StringIO()
+    call_command("render_images", stdout=out)
+    return out.getvalue()
+
+
+def test_renditions_are_made_once_processed(
+    author, reader_client, media_root, recipe_payload
+):
+    reader_client.force_authenticate(author)
+    response = reader_client.post(
+        TEST_RECIPE_PAGE_URL, recipe_payload, format="json"
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()["image_srcset"] == {}
+    recipe_id = response.json()["id"]
+    call_command("process_images", stdout=StringIO())
+
+    detail = reader_client.get(f"{TEST_RECIPE_PAGE_URL}{recipe_id}/").json()
+    srcset = detail["image_srcset"]
+    assert list(srcset) == [media_type for media_type, _ in FORMATS]
+    # The 1 px wide image is not scaled up
+    url, width = srcset["image/webp"].split(" ")
+    assert url.startswith(f"{TEST_SERVER_URL}/media/recipes/")
+    assert "/renditions/" in url
+    assert width == "1w"
+    assert (media_root / url.split("/media/")[1]).exists()
+
+
+def test_renditions_are_backfilled_once(
+    client, media_root, create_test_recipes
+):
+    assert render_images() == "0 images rendered, 3 failed.\n"
+    (media_root / "recipes").mkdir()
+    Image.new("RGB", (1600, 900), "red").save(media_root / "recipes/test.png")
+
+    assert render_images() == "3 images rendered, 0 failed.\n"
+    recipe = create_test_recipes[0]
+    recipe.refresh_from_db()
+    assert recipe.renditions["formats"]["image/jpeg"] == [80, 480, 1200]
+    with Image.open(media_root / "recipes/renditions/test-480w.webp") as image:
+        assert image.size == (480, 270)
+    srcset = client.get(f"{TEST_RECIPE_PAGE_URL}{recipe.id}/").json()[
+        "image_srcset"
+    ]
+    assert srcset["image/jpeg"] == ", ".join(
+        f"{TEST_SERVER_URL}/media/recipes/renditions/test-{width}w.jpg {width}w"
+        for width in (80, 480, 1200)
+    )
+    assert render_images() == "0 images rendered, 0 failed.\n"
+
+    preview = admin.site._registry[Recipe].pic_preview(recipe)
+    assert "/media/recipes/renditions/test-80w.webp" in preview
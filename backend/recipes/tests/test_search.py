@@ -0,0 +1,41 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.search import fts5_query, stem
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Recipe
+
+
+def found_names(client, terms):
+    response = client.get(TEST_RECIPE_PAGE_URL, {"search": terms})
+    assert response.status_code == HTTPStatus.OK
+    return [recipe["name"] for recipe in response.json()["results"]]
+
+
+@pytest.mark.django_db
+def test_russian_words_are_cut_down_to_a_stem():
+    assert stem("борщи") == "борщ"
+    assert stem("пирогами") == "пирог"
+    assert stem("cooking") == "cooking"
+    assert fts5_query('Пироги "с" мясом') == '"пирог"* "с"* "мяс"*'
+
+
+@pytest.mark.django_db
+def test_search_ranks_names_over_texts(client, create_test_recipes):
+    first, second, _ = create_test_recipes
+    first.name = "Борщ по-домашнему"
+    first.save()
+    second.text = "Подавать к борщу, с пампушками."
+    second.save()
+
+    assert found_names(client, "борщи") == [first.name, second.name]
+    assert found_names(client, "пампушки") == [second.name]
+    assert set(found_names(client, "cooking")) == {first.name, "Recipe3"}
+
+
+@pytest.mark.django_db
+def test_search_index_follows_deletes(client, create_test_recipes):
+    Recipe.objects.filter(name="Recipe1").delete()
+    assert found_names(client, "recipe1") == []
+    assert len(found_names(client, "cook")) == 2
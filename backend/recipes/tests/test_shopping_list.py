@@ -0,0 +1,224 @@
+import csv
+import json
+import os
+import time
+from http import HTTPStatus
+
+import pytest
+from reportlab import rl_config
+from rest_framework.test import APIClient
+
+from api import pdf, shopping_lists
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Ingredient, RecipeIngredient, ShoppingCart
+
+DOWNLOAD_URL = f"{TEST_RECIPE_PAGE_URL}download_shopping_cart/"
+
+
+@pytest.fixture(autouse=True)
+def shopping_lists_root(settings, tmp_path):
+    settings.SHOPPING_LISTS_ROOT = tmp_path
+    settings.SHOPPING_LISTS_ACCEL_URL = ""
+    return tmp_path
+
+
+def download(client):
+    response = client.get(DOWNLOAD_URL)
+    assert response.status_code == HTTPStatus.OK
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_the_shopping_list_is_drawn_off_cached_parts(
+    reader, reader_client, create_test_recipes
+):
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=reader, recipe=recipe)
+        for recipe in create_test_recipes
+    )
+    search_path = list(rl_config.TTFSearchPath)
+    pdf.logo.cache_clear()
+
+    for _ in range(2):
+        response = reader_client.get(DOWNLOAD_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response["Content-Type"] == "application/pdf"
+        content = b"".join(response.streaming_content)
+        assert content.startswith(b"%PDF")
+        assert content.count(b"/Subtype /Form") == 1
+    assert pdf.logo.cache_info().misses == 1
+    assert rl_config.TTFSearchPath == search_path
+
+
+@pytest.mark.django_db
+def test_a_long_shopping_list_runs_over_pages(
+    reader, reader_client, create_test_recipes
+):
+    recipe = create_test_recipes[0]
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in Ingredient.objects.bulk_create(
+            Ingredient(name=f"Extra{index:03}", measurement_unit="g")
+            for index in range(2 * pdf.ROWS_PER_PAGE)
+        )
+    )
+    ShoppingCart.objects.create(user=reader, recipe=recipe)
+
+    response = reader_client.get(DOWNLOAD_URL)
+    assert response.status_code == HTTPStatus.OK
+    content = b"".join(response.streaming_content)
+    assert content.count(b"/Type /Page\n") == 3
+    # The header is defined once & drawn on each page
+    assert content.count(b"/Subtype /Form") == 1
+
+
+@pytest.mark.django_db
+def test_the_shopping_list_is_rendered_once_per_cart_version(
+    reader,
+    reader_client,
+    create_test_recipes,
+    shopping_lists_root,
+    django_assert_num_queries,
+):
+    first, second, _ = create_test_recipes
+    reader_client.post(f"{TEST_RECIPE_PAGE_URL}{first.id}/shopping_cart/")
+    content = download(reader_client)
+    with django_assert_num_queries(0):
+        assert download(reader_client) == content
+
+    (rendered,) = shopping_lists_root.iterdir()
+    for change in (
+        lambda: reader_client.post(
+            f"{TEST_RECIPE_PAGE_URL}{second.id}/shopping_cart/"
+        ),
+        lambda: RecipeIngredient.objects.filter(recipe=second).first().save(),
+        lambda: Ingredient.objects.filter(recipes=second).first().save(),
+        lambda: reader_client.delete(
+            f"{TEST_RECIPE_PAGE_URL}{first.id}/shopping_cart/"
+        ),
+    ):
+        # Sent long enough ago for no download to be sending it still
+        past = time.time() - shopping_lists.PREVIOUS_LIST_GRACE - 1
+        os.utime(rendered, (past, past))
+        change()
+        download(reader_client)
+        # Rendered anew, the previous list gone
+        (path,) = shopping_lists_root.iterdir()
+        assert path != rendered
+        rendered = path
+
+
+@pytest.mark.django_db
+def test_a_list_just_sent_is_kept_for_a_while(
+    monkeypatch,
+    reader,
+    reader_client,
+    create_test_recipes,
+    shopping_lists_root,
+):
+    first, second, _ = create_test_recipes
+    ShoppingCart.objects.create(user=reader, recipe=first)
+    download(reader_client)
+    (sent,) = shopping_lists_root.iterdir()
+
+    reader_client.post(f"{TEST_RECIPE_PAGE_URL}{second.id}/shopping_cart/")
+    download(reader_client)
+    # Kept for a download of it to go on
+    assert len(list(shopping_lists_root.iterdir())) == 2
+    assert sent.exists()
+
+    # Deleted by a newer list between its lookup & its opening
+    found = shopping_lists.shopping_list
+    deleted = []
+
+    def deleted_meanwhile(user):
+        path = found(user)
+        if not deleted:
+            path.unlink()
+            deleted.append(path)
+        return path
+
+    monkeypatch.setattr(shopping_lists, "shopping_list", deleted_meanwhile)
+    assert download(reader_client).startswith(b"%PDF")
+    assert deleted[0].exists()
+
+
+@pytest.mark.django_db
+def test_nginx_sends_the_shopping_list_when_set_to(
+    settings, reader, reader_client, create_test_recipes, shopping_lists_root
+):
+    settings.SHOPPING_LISTS_ACCEL_URL = "/shopping_lists/"
+    ShoppingCart.objects.create(user=reader, recipe=create_test_recipes[0])
+
+    response = reader_client.get(DOWNLOAD_URL)
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == b""
+    (path,) = shopping_lists_root.iterdir()
+    assert response["X-Accel-Redirect"] == f"/shopping_lists/{path.name}"
+    assert response["Content-Disposition"].startswith("attachment;")
+
+
+@pytest.mark.django_db
+def test_the_shopping_list_is_given_in_text_formats(
+    reader, reader_client, create_test_recipes
+):
+    _, second, third = create_test_recipes
+    ShoppingCart.objects.create(user=reader, recipe=second)
+    ShoppingCart.objects.create(user=reader, recipe=third)
+    # Ingredient4 is in both
+    expected = [
+        ("Ingredient3", 10, "g"),
+        ("Ingredient4", 20, "g"),
+        ("Ingredient5", 10, "g"),
+        ("Ingredient6", 10, "g"),
+    ]
+
+    def download_as(media_type, **params):
+        response = reader_client.get(DOWNLOAD_URL, params)
+        assert response.status_code == HTTPStatus.OK
+        assert response["Content-Type"] == f"{media_type}; charset=utf-8"
+        assert "Accept" in response["Vary"]
+        return b"".join(response.streaming_content).decode()
+
+    assert download_as("text/plain", format="txt").splitlines() == [
+        f"{item}: {quantity} {units}" for item, quantity, units in expected
+    ]
+    assert list(
+        csv.reader(download_as("text/csv", format="csv").splitlines())
+    ) == [
+        ["item", "quantity", "units"],
+        *([item, str(quantity), units] for item, quantity, units in expected),
+    ]
+    assert json.loads(download_as("application/json", format="json")) == [
+        {"name": item, "amount": quantity, "measurement_unit": units}
+        for item, quantity, units in expected
+    ]
+    assert download_as("text/markdown", format="md").splitlines()[2:] == [
+        f"- [ ] {item}, {quantity} {units}"
+        for item, quantity, units in expected
+    ]
+
+    response = reader_client.get(DOWNLOAD_URL, HTTP_ACCEPT="text/csv")
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert response["Content-Disposition"] == (
+        'attachment; filename="my-Foodgram_shopping-list.csv"'
+    )
+    response = reader_client.get(DOWNLOAD_URL, HTTP_ACCEPT="*/*")
+    assert response["Content-Type"] == "application/pdf"
+    assert reader_client.get(DOWNLOAD_URL, {"format": "doc"}).status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+@pytest.mark.django_db
+def test_an_empty_cart_is_an_empty_json_list(reader_client):
+    response = reader_client.get(DOWNLOAD_URL, {"format": "json"})
+    assert json.loads(b"".join(response.streaming_content)) == []
+
+
+@pytest.mark.django_db
+def test_the_shopping_list_errors_are_json():
+    response = APIClient().get(DOWNLOAD_URL, {"format": "csv"})
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response["Content-Type"] == "application/json"
+    assert "detail" in response.json()
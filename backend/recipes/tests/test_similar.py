@@ -0,0 +1,74 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import RecipeIngredient, RecipeNeighbor
+
+
+def similar(client, recipe_id):
+    response = client.get(f"{TEST_RECIPE_PAGE_URL}{recipe_id}/similar/")
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+@pytest.mark.django_db
+def test_similar_recipes_are_built_and_looked_up(
+    client, create_test_recipes, django_assert_num_queries
+):
+    first, second, third = create_test_recipes
+    assert similar(client, second.id) == []
+    # The same ingredients as the second, [2, 3], & the same tags but one
+    RecipeIngredient.objects.filter(recipe=third).delete()
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=third, ingredient=item.ingredient, amount=1)
+        for item in second.recipe_ingredient.all()
+    )
+
+    call_command("build_similar", stdout=StringIO())
+    neighbor = RecipeNeighbor.objects.get(recipe=second, neighbor=third)
+    assert neighbor.similarity == pytest.approx(0.8 + 0.2 * 2 / 3)
+    results = similar(client, second.id)
+    assert (
+        results[0] == client.get(f"{TEST_RECIPE_PAGE_URL}{third.id}/").json()
+    )
+    assert similar(client, third.id)[0]["id"] == second.id
+
+    # The neighbours, then their cards
+    with django_assert_num_queries(2):
+        client.get(f"{TEST_RECIPE_PAGE_URL}{second.id}/similar/")
+    for pk in (0, "abc", 2**64):
+        assert (
+            client.get(f"{TEST_RECIPE_PAGE_URL}{pk}/similar/").status_code
+            == HTTPStatus.NOT_FOUND
+        )
+
+
+@pytest.mark.django_db
+def test_similar_recipes_follow_recipe_writes(
+    author,
+    reader_client,
+    media_root,
+    recipe_payload,
+    create_test_recipes,
+    django_capture_on_commit_callbacks,
+):
+    first = create_test_recipes[0]
+    call_command("build_similar", stdout=StringIO())
+    recipe_payload["ingredients"] = [
+        {"id": item.ingredient_id, "amount": 5}
+        for item in first.recipe_ingredient.all()
+    ]
+    reader_client.force_authenticate(author)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe_id = reader_client.post(
+            TEST_RECIPE_PAGE_URL, recipe_payload, format="json"
+        ).json()["id"]
+
+    ids = [recipe["id"] for recipe in similar(reader_client, recipe_id)]
+    assert ids[0] == first.id
+    assert recipe_id in [
+        recipe["id"] for recipe in similar(reader_client, first.id)
+    ]
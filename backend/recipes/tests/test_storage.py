@@ -0,0 +1,124 @@
+import base64
+import re
+from http import HTTPStatus
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from PIL import Image
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes import storage
+from recipes.models import Recipe
+from recipes.renditions import release_image
+
+pytestmark = pytest.mark.django_db
+
+ADDRESSED = re.compile(r"^recipes/(\w\w)/(\w\w)/(\1\2\w{60})\.png$")
+
+
+@pytest.fixture
+def author_client(author, reader_client):
+    reader_client.force_authenticate(author)
+    return reader_client
+
+
+def post_recipe(client, payload, capture):
+    with capture(execute=True):
+        response = client.post(TEST_RECIPE_PAGE_URL, payload, format="json")
+    assert response.status_code == HTTPStatus.CREATED
+    return Recipe.objects.get(id=response.json()["id"])
+
+
+def process_images(capture):
+    with capture(execute=True):
+        call_command("process_images", stdout=StringIO())
+
+
+def test_the_same_image_is_stored_once(
+    author_client,
+    media_root,
+    recipe_payload,
+    django_capture_on_commit_callbacks,
+):
+    first = post_recipe(
+        author_client, recipe_payload, django_capture_on_commit_callbacks
+    )
+    second = post_recipe(
+        author_client, recipe_payload, django_capture_on_commit_callbacks
+    )
+    process_images(django_capture_on_commit_callbacks)
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert ADDRESSED.match(first.image.name)
+    assert second.image.name == first.image.name
+    assert len(list(media_root.rglob("*.png"))) == 1
+    renditions = list(media_root.rglob("renditions/*"))
+    assert renditions
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.delete(f"{TEST_RECIPE_PAGE_URL}{first.id}/")
+    assert default_storage.exists(second.image.name)
+    assert all(path.exists() for path in renditions)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.delete(f"{TEST_RECIPE_PAGE_URL}{second.id}/")
+    assert not default_storage.exists(second.image.name)
+    assert not any(path.exists() for path in renditions)
+
+
+def test_a_replaced_image_is_deleted(
+    author_client,
+    media_root,
+    recipe_payload,
+    django_capture_on_commit_callbacks,
+):
+    recipe = post_recipe(
+        author_client, recipe_payload, django_capture_on_commit_callbacks
+    )
+    process_images(django_capture_on_commit_callbacks)
+    recipe.refresh_from_db()
+    old = recipe.image.name
+    buffer = BytesIO()
+    Image.new("RGB", (2, 2), "blue").save(buffer, "PNG")
+    recipe_payload["image"] = "data:image/png;base64," + (
+        base64.b64encode(buffer.getvalue()).decode()
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        response = author_client.patch(
+            f"{TEST_RECIPE_PAGE_URL}{recipe.id}/",
+            recipe_payload,
+            format="json",
+        )
+    assert response.status_code == HTTPStatus.OK
+    process_images(django_capture_on_commit_callbacks)
+    recipe.refresh_from_db()
+    assert recipe.image.name != old
+    assert default_storage.exists(recipe.image.name)
+    assert not default_storage.exists(old)
+
+
+def test_a_file_saved_again_is_locked_against_its_release(
+    media_root, monkeypatch
+):
+    name = default_storage.save("recipes/a.png", ContentFile(b"image"))
+    locked = []
+    lock_name = storage.lock_name
+    monkeypatch.setattr(
+        storage,
+        "lock_name",
+        lambda name: locked.append(name) or lock_name(name),
+    )
+
+    with transaction.atomic():
+        # Found there already, & so locked till the reference is committed
+        assert default_storage.save(
+            "recipes/b.png", ContentFile(b"image")
+        ) == (name)
+        assert locked == [name]
+    release_image(name, {})
+    assert locked == [name, name]
+    assert not default_storage.exists(name)
@@ -0,0 +1,38 @@
+from http import HTTPStatus
+
+import pytest
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Tag
+
+
+def filter_by_tags(client, *slugs):
+    return client.get(TEST_RECIPE_PAGE_URL, {"tags": slugs})
+
+
+@pytest.mark.django_db
+def test_tags_filter_is_a_union_without_duplicates(
+    client, create_test_tags, create_test_recipes, django_assert_num_queries
+):
+    first, second, third = create_test_recipes
+    slugs = [tag.slug for tag in create_test_tags]
+    response = filter_by_tags(client, slugs[1], slugs[2])
+    assert [recipe["id"] for recipe in response.json()["results"]] == [
+        third.id,
+        second.id,
+    ]
+    filter_by_tags(client, slugs[0], slugs[1])
+    # COUNT(*) & the cards, the slugs come off the registry
+    with django_assert_num_queries(2):
+        filter_by_tags(client, slugs[0], slugs[1])
+
+
+@pytest.mark.django_db
+def test_tags_registry_follows_tag_writes(client, create_test_recipes):
+    response = filter_by_tags(client, "brunch")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    Tag.objects.create(name="Brunch", color="#ABCDEF", slug="brunch")
+    response = filter_by_tags(client, "brunch")
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["count"] == 0
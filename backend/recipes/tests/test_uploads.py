@@ -0,0 +1,113 @@
+from http import HTTPStatus
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from PIL import Image
+
+from backend.constants import TEST_RECIPE_PAGE_URL
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db
+
+MEGABYTE = 1024 * 1024
+
+
+def png(width=20, height=10, padding=0):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), "green").save(buffer, "PNG")
+    # Past the image end, where a header check won't look
+    return buffer.getvalue() + b"\0" * padding
+
+
+@pytest.fixture
+def author_client(author, reader_client):
+    reader_client.force_authenticate(author)
+    return reader_client
+
+
+@pytest.fixture
+def multipart_payload(recipe_payload):
+    """The recipe payload, its ingredients as form fields, & a file."""
+    data = {
+        key: value
+        for key, value in recipe_payload.items()
+        if key != "ingredients"
+    }
+    for index, ingredient in enumerate(recipe_payload["ingredients"]):
+        for key, value in ingredient.items():
+            data[f"ingredients[{index}]{key}"] = value
+    data["image"] = SimpleUploadedFile("photo.png", png(), "image/png")
+    return data
+
+
+def test_an_image_is_uploaded_as_a_file(
+    author_client, media_root, multipart_payload
+):
+    response = author_client.post(
+        TEST_RECIPE_PAGE_URL, multipart_payload, format="multipart"
+    )
+    assert response.status_code == HTTPStatus.CREATED, response.json()
+    data = response.json()
+    assert data["image_status"] == "pending"
+    assert len(data["ingredients"]) == 2
+    call_command("process_images", stdout=StringIO())
+
+    recipe = Recipe.objects.get(id=data["id"])
+    assert recipe.image.name.endswith(".png")
+    assert (recipe.image.width, recipe.image.height) == (20, 10)
+    assert recipe.renditions["formats"]["image/webp"] == [20]
+
+
+def test_a_large_upload_is_refused_by_its_length(
+    author_client, media_root, multipart_payload
+):
+    multipart_payload["image"] = SimpleUploadedFile(
+        "photo.png", png(padding=MEGABYTE), "image/png"
+    )
+    response = author_client.post(
+        TEST_RECIPE_PAGE_URL, multipart_payload, format="multipart"
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert not Recipe.objects.exists()
+
+
+def test_a_large_upload_is_refused_as_it_streams(
+    monkeypatch, author_client, media_root, multipart_payload
+):
+    monkeypatch.setattr("api.uploads.MAX_UPLOAD_FORM_SIZE", 2 * MEGABYTE)
+    multipart_payload["image"] = SimpleUploadedFile(
+        "photo.png", png(padding=MEGABYTE), "image/png"
+    )
+    response = author_client.post(
+        TEST_RECIPE_PAGE_URL, multipart_payload, format="multipart"
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert not list(media_root.rglob("*.png"))
+
+
+def test_an_upload_must_be_an_image(
+    author_client, media_root, multipart_payload
+):
+    multipart_payload["image"] = SimpleUploadedFile(
+        "photo.png", b"not an image", "image/png"
+    )
+    response = author_client.post(
+        TEST_RECIPE_PAGE_URL, multipart_payload, format="multipart"
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert "image" in response.json()
+
+
+def test_a_large_base64_image_is_refused_undecoded(
+    author_client, media_root, recipe_payload
+):
+    recipe_payload["image"] = "data:image/png;base64," + "A" * (
+        MEGABYTE * 4 // 3 + 8
+    )
+    response = author_client.post(
+        TEST_RECIPE_PAGE_URL, recipe_payload, format="json"
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()["image"] == ["The image must be <=1Mb in size."]
@@ -1,3 +1,4 @@
+import base64
 import json
 import math
 import random
@@ -237,6 +238,60 @@ class TestContent(UserAuthTestMixin):
                         len(u_d["email"]) <= constants.NUM_CHARS_EMAIL
                     )
 
+    def test_users_cursor_pagination(self):
+        limit = constants.TEST_USERS_PER_PAGE_INT
+        url = constants.TEST_USERS_CURSOR_URL + f"&limit={limit}"
+        seen = []
+        pages = 0
+        while url:
+            response = self.client.get(url, format="json")
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(
+                (users_d := response.data).keys(),
+                constants.TEST_USER_CURSOR_CONTENT_ITEMS.keys(),
+            )
+            self.assertLessEqual(len(users_d["results"]), limit)
+            if pages:
+                self.assertIsNotNone(users_d["previous"])
+            else:
+                self.assertIsNone(users_d["previous"])
+            seen.extend(u_d["email"] for u_d in users_d["results"])
+            url = users_d["next"]
+            pages += 1
+        self.assertEqual(pages, math.ceil(self.TOTAL / limit))
+        self.assertEqual(
+            seen, list(User.objects.values_list("email", flat=True))
+        )
+
+        response = self.client.get(users_d["previous"])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        last_len = len(users_d["results"])
+        self.assertEqual(
+            [u_d["email"] for u_d in response.data["results"]],
+            seen[-limit - last_len : -last_len],
+        )
+
+        response = self.client.get(
+            constants.TEST_USERS_PAGE_URL + "?cursor=not-a-cursor"
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_users_tampered_cursor(self):
+        for position in (
+            [0, "bulkuser1@example.org", "not an id"],
+            [0, {"email": None}, 1],
+            [[0], "bulkuser1@example.org", 1],
+            [0, "bulkuser1@example.org"],
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode())
+            response = self.client.get(
+                constants.TEST_USERS_PAGE_URL,
+                {"cursor": cursor.decode()},
+            )
+            self.assertEqual(
+                response.status_code, HTTPStatus.NOT_FOUND, position
+            )
+
     def test_fail_signup_user(self):
         failers = {
             "email": 123,